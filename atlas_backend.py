@@ -1,22 +1,29 @@
 from __future__ import annotations
 
-import os, json, hashlib, pathlib, secrets
-from datetime import datetime, timezone
+import time
+_IMPORT_T0 = time.perf_counter()
+
+import os, io, re, gzip, json, zlib, uuid, bisect, collections, select, shutil, struct, asyncio, hashlib, pathlib, secrets, mimetypes, zipfile, threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
 from typing import Any, Dict
+from urllib.parse import quote
 
 import bcrypt
 from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Form, Query
-from fastapi.responses import FileResponse, RedirectResponse
+from fastapi.responses import FileResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.datastructures import Headers
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.middleware.trustedhost import TrustedHostMiddleware
 from starlette.middleware.cors import CORSMiddleware
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.lib import colors
+from sqlalchemy.exc import DBAPIError
+# reportlab is imported lazily in _write_exec_pdf (only approvals render PDFs)
 
 
 # ----------------------------
@@ -27,32 +34,253 @@ def _env(name: str, default: str = "") -> str:
     v = os.getenv(name)
     return v if v is not None else default
 
+# ----------------------------
+# Startup profiler (ATLAS_STARTUP_PROFILE=1)
+# ----------------------------
+
+STARTUP_PROFILE = _env("ATLAS_STARTUP_PROFILE", "0") == "1"
+STARTUP_TARGET_MS = float(_env("ATLAS_STARTUP_TARGET_MS", "300"))
+_PHASES: list[tuple[str, float]] = [("imports", (time.perf_counter() - _IMPORT_T0) * 1000.0)]
+
+@contextmanager
+def _phase(name: str):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        _PHASES.append((name, (time.perf_counter() - t) * 1000.0))
+
+def _report_startup():
+    if not STARTUP_PROFILE:
+        return
+    total = (time.perf_counter() - _IMPORT_T0) * 1000.0
+    print("[startup] phase timings (ms):")
+    for name, ms in _PHASES:
+        print(f"[startup]   {name:<14} {ms:8.1f}")
+    verdict = "OK" if total <= STARTUP_TARGET_MS else "OVER TARGET"
+    print(f"[startup]   {'total':<14} {total:8.1f}  (target {STARTUP_TARGET_MS:.0f} ms: {verdict})")
+
+_ENGINE: Engine | None = None
+
 def get_engine() -> Engine:
-    dsn = _env("ATLAS_DATABASE_URL")
-    if not dsn:
-        raise RuntimeError("ATLAS_DATABASE_URL not set")
-    return create_engine(dsn, pool_pre_ping=True)
+    # one pooled engine per worker; creating it per call paid connect cost every request
+    global _ENGINE
+    if _ENGINE is None:
+        dsn = _env("ATLAS_DATABASE_URL")
+        if not dsn:
+            raise RuntimeError("ATLAS_DATABASE_URL not set")
+        _ENGINE = create_engine(dsn, pool_pre_ping=True)
+    return _ENGINE
+
+# ----------------------------
+# Read replicas: optional, for read-only handlers (see read_conn)
+# ----------------------------
+
+REPLICA_URLS = [u.strip() for u in _env("ATLAS_REPLICA_URLS", "").split(",") if u.strip()]
+REPLICA_MAX_LAG_S = float(_env("ATLAS_REPLICA_MAX_LAG_S", "5"))
+REPLICA_CHECK_S = float(_env("ATLAS_REPLICA_CHECK_S", "5"))
+# after a client writes, its reads stay on the primary this long (should exceed REPLICA_MAX_LAG_S)
+READ_YOUR_WRITES_S = int(_env("ATLAS_READ_YOUR_WRITES_S", "30"))
+_RW_COOKIE = "atlas_rw"
+
+class _ReplicaRouter:
+    """
+    Tracks health and replay lag of each replica (refreshed by check() on a
+    background thread) and hands out healthy, caught-up ones round-robin.
+    Replicas start out unhealthy until their first check passes.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.replicas = [{"name": f"replica{i}", "url": u, "engine": None, "healthy": False,
+                          "lag_s": None, "error": None, "checked_at": None} for i, u in enumerate(urls)]
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _engine(self, r) -> Engine:
+        if r["engine"] is None:
+            r["engine"] = create_engine(r["url"], pool_pre_ping=True, connect_args={"connect_timeout": 3})
+        return r["engine"]
+
+    def check(self):
+        for r in self.replicas:
+            try:
+                with self._engine(r).connect() as conn:
+                    # receive = replay only means "caught up" while the WAL receiver is
+                    # streaming; a disconnected standby also stops receiving. No row means
+                    # no receiver; status is null for roles without pg_monitor.
+                    standby, receiver, lag = conn.execute(text("""
+                      select pg_is_in_recovery(),
+                             (select coalesce(status, 'unknown') from pg_stat_wal_receiver),
+                             case
+                               when not pg_is_in_recovery() then 0
+                               when pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() then 0
+                               else coalesce(extract(epoch from now() - pg_last_xact_replay_timestamp()), 1e9)
+                             end
+                    """)).one()
+                if standby and receiver not in ("streaming", "unknown"):
+                    r.update(lag_s=None, healthy=False, error=f"wal receiver {receiver or 'not running'}")
+                else:
+                    r.update(lag_s=float(lag), healthy=float(lag) <= REPLICA_MAX_LAG_S, error=None)
+            except Exception as e:
+                r.update(healthy=False, error=str(e).splitlines()[0][:200])
+            r["checked_at"] = utcnow()
+
+    def pick(self) -> dict | None:
+        with self._lock:
+            n = len(self.replicas)
+            for i in range(n):
+                r = self.replicas[(self._next + i) % n]
+                if r["healthy"]:
+                    self._next = (self._next + i + 1) % n
+                    return r
+        return None
+
+    def mark_down(self, r, err: Exception):
+        r.update(healthy=False, error=str(err).splitlines()[0][:200])
+
+    def status(self) -> list[dict]:
+        return [{k: r[k] for k in ("name", "healthy", "lag_s", "error", "checked_at")} for r in self.replicas]
+
+_REPLICAS = _ReplicaRouter(REPLICA_URLS)
+
+class _ReplicaConn:
+    """
+    Replica connection handed out by read_conn. If the replica fails
+    mid-handler (dropped connection, or a query cancelled by a recovery
+    conflict), the failed statement and everything after it run on the
+    primary instead; a dropped replica is also marked down.
+    """
+
+    def __init__(self, replica, conn):
+        self._replica = replica
+        self._conn = conn
+        self._primary = None       # begin() context on the primary, once failed over
+        self._primary_conn = None
+
+    def execute(self, *args, **kwargs):
+        if self._primary is None:
+            try:
+                return self._conn.execute(*args, **kwargs)
+            except DBAPIError as e:
+                conflict = getattr(e.orig, "pgcode", None) == "40001"  # canceled by recovery
+                if not (e.connection_invalidated or conflict):
+                    raise
+                if e.connection_invalidated:
+                    _REPLICAS.mark_down(self._replica, e)
+                self._conn.close()
+                self._primary = get_engine().begin()
+                self._primary_conn = self._primary.__enter__()
+        return self._primary_conn.execute(*args, **kwargs)
+
+    def __enter__(self):
+        self._conn.begin()
+        return self
+
+    def __exit__(self, *exc):
+        # read-only: nothing on the replica to commit
+        self._conn.close()
+        if self._primary is not None:
+            return self._primary.__exit__(*exc)
+        return False
+
+@contextmanager
+def read_conn(request: Request | None = None):
+    """
+    Transaction for a read-only handler: a healthy replica when one is
+    configured and caught up, else the primary. Clients that wrote within
+    READ_YOUR_WRITES_S (ReadYourWritesMiddleware) always read the primary.
+    A replica that fails mid-handler hands over to the primary (_ReplicaConn).
+    """
+    replica = None
+    if request is None or not getattr(request.state, "read_primary", False):
+        replica = _REPLICAS.pick()
+    conn = None
+    if replica is not None:
+        try:
+            conn = _REPLICAS._engine(replica).connect()
+        except Exception as e:
+            _REPLICAS.mark_down(replica, e)
+    if conn is None:
+        with get_engine().begin() as conn:
+            yield conn
+    else:
+        with _ReplicaConn(replica, conn) as rconn:
+            yield rconn
 
 def utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
+# Reverse proxies in front of the app that append to X-Forwarded-For (Render: 1).
+# Entries left of those were sent by the client and can say anything.
+TRUSTED_PROXY_HOPS = int(_env("ATLAS_TRUSTED_PROXY_HOPS", "1"))
+
 def client_ip(request: Request) -> str | None:
     """
     Proxy-safe client IP:
-    - Render / reverse proxies set X-Forwarded-For
-    - first IP is the original client
+    - each trusted proxy appends the address it saw to X-Forwarded-For
+    - so the client is the entry TRUSTED_PROXY_HOPS from the right, not the
+      first one (which the client controls); 0 hops = the socket peer
     """
     xff = request.headers.get("x-forwarded-for", "")
-    if xff:
-        return xff.split(",")[0].strip()
+    if xff and TRUSTED_PROXY_HOPS > 0:
+        hops = [h.strip() for h in xff.split(",") if h.strip()]
+        if hops:
+            return hops[-min(TRUSTED_PROXY_HOPS, len(hops))]
     return request.client.host if request.client else None
 
 
 VAULT_DIR = pathlib.Path(_env("ATLAS_VAULT_DIR", "./vault_storage")).resolve()
-VAULT_DIR.mkdir(parents=True, exist_ok=True)
-
 DOCS_DIR = (VAULT_DIR / "docs").resolve()
-DOCS_DIR.mkdir(parents=True, exist_ok=True)
+# directories are created in _startup(), not at import time
+
+# How stored files leave the worker:
+#   python    - stream from this process in 1 MiB reads (every byte passes through the worker)
+#   accel     - X-Accel-Redirect to an internal nginx location (see atlas-proxy/)
+#   xsendfile - X-Sendfile with the absolute path (Apache mod_xsendfile / lighttpd)
+# accel/xsendfile are the fast path for production: the worker only authorizes and
+# audit-logs, and the proxy sends the file with sendfile(2).
+FILE_SERVE_MODE = _env("ATLAS_FILE_SERVE_MODE", "python").lower().strip()
+ACCEL_PREFIX = "/" + _env("ATLAS_ACCEL_PREFIX", "/_vault/").strip("/") + "/"
+
+# Content-defined chunking for vault bundles (chunks are stored once, keyed by sha256)
+VAULT_CHUNKING = _env("ATLAS_VAULT_CHUNKING", "1") == "1"
+CHUNK_DIR = (VAULT_DIR / "chunks").resolve()
+# whole-file copies of chunked objects, so accel/xsendfile can hand them to the proxy
+ASSEMBLED_DIR = (VAULT_DIR / "assembled").resolve()
+# unreferenced chunks (and assembled copies) untouched this long are deleted by the daily GC
+CHUNK_GC_GRACE_HOURS = float(_env("ATLAS_CHUNK_GC_GRACE_HOURS", "24"))
+
+# Background integrity scrubber (re-hashes stored files against their sha256)
+SCRUB_ENABLED = _env("ATLAS_SCRUB_ENABLED", "0") == "1"
+SCRUB_THREADS = int(_env("ATLAS_SCRUB_THREADS", "4"))
+SCRUB_MBPS = float(_env("ATLAS_SCRUB_MBPS", "50"))          # total read rate across threads; 0 = unlimited
+SCRUB_INTERVAL_HOURS = float(_env("ATLAS_SCRUB_INTERVAL_HOURS", "168"))
+
+# vault_access_logs: monthly range partitions + daily rollups + retention
+ACCESS_LOG_PREMAKE_MONTHS = int(_env("ATLAS_ACCESS_LOG_PREMAKE_MONTHS", "3"))
+ACCESS_LOG_RETENTION_MONTHS = int(_env("ATLAS_ACCESS_LOG_RETENTION_MONTHS", "13"))
+ACCESS_LOG_RETENTION = _env("ATLAS_ACCESS_LOG_RETENTION", "detach").lower()   # detach | drop | keep
+
+# Access-log analytics: aggregates are topped up (by transaction id, see
+# _rollup_access_logs) at most every ANALYTICS_REFRESH_S, off the event loop.
+ANALYTICS_REFRESH_S = float(_env("ATLAS_ANALYTICS_REFRESH_S", "30"))
+
+# Public onboarding intake guard: per-IP token bucket, body cap, concurrency cap
+INTAKE_RATE = float(_env("ATLAS_INTAKE_RATE", "0.2"))          # tokens/sec per client IP
+INTAKE_BURST = float(_env("ATLAS_INTAKE_BURST", "5"))
+INTAKE_MAX_BYTES = int(_env("ATLAS_INTAKE_MAX_BYTES", str(256 * 1024)))
+INTAKE_MAX_CONCURRENCY = int(_env("ATLAS_INTAKE_MAX_CONCURRENCY", "8"))
+if INTAKE_RATE <= 0 or INTAKE_BURST < 1:
+    # a bucket has to refill and hold at least one token; bucket TTLs divide by the rate
+    raise RuntimeError("ATLAS_INTAKE_RATE must be > 0 and ATLAS_INTAKE_BURST >= 1")
+RATE_LIMIT_STORE = _env("ATLAS_RATE_LIMIT_STORE", "memory")    # memory | postgres | sqlite:/path/to/file.db
+
+# Repeat onboarding submissions (same Idempotency-Key, or same canonical payload)
+# inside this window return the original onboarding_id instead of inserting
+ONBOARDING_DEDUP_WINDOW_S = int(_env("ATLAS_ONBOARDING_DEDUP_WINDOW_S", str(24 * 3600)))
+
+# Reviewer claims on onboarding submissions expire after this many seconds
+REVIEW_LEASE_S = int(_env("ATLAS_REVIEW_LEASE_S", "900"))
 
 ADMIN_EMAIL = _env("ATLAS_ADMIN_EMAIL", "admin@atlas.local").lower().strip()
 ADMIN_PASSWORD = _env("ATLAS_ADMIN_PASSWORD", "ChangeMeNow123!")
@@ -62,6 +290,7 @@ ADMIN_PASSWORD = _env("ATLAS_ADMIN_PASSWORD", "ChangeMeNow123!")
 # App
 # ----------------------------
 
+_t_app = time.perf_counter()
 app = FastAPI(title="Atlas Backend", version="0.1")
 
 app.add_middleware(
@@ -75,19 +304,183 @@ trusted = [h.strip() for h in _env("TRUSTED_HOSTS", "").split(",") if h.strip()]
 if trusted:
     app.add_middleware(TrustedHostMiddleware, allowed_hosts=trusted)
 
-# CORS: keep simple for now (same-origin UI doesn’t need credentials)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=False,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
 BASE_DIR = pathlib.Path(__file__).resolve().parent
 STATIC_DIR = BASE_DIR / "static"
-STATIC_DIR.mkdir(exist_ok=True)
-app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+# output of `python atlas_backend.py build-static` (fingerprinted + .gz/.br variants)
+STATIC_DIST_DIR = pathlib.Path(_env("ATLAS_STATIC_DIST", str(STATIC_DIR / "dist")))
+STATIC_BUILD_ON_START = _env("ATLAS_STATIC_BUILD_ON_START", "0") == "1"
+
+
+# ----------------------------
+# Static assets: build step + negotiating handler
+# ----------------------------
+
+_STATIC_IMMUTABLE = "public, max-age=31536000, immutable"
+_STATIC_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+def _accept_encoding_q(header: str) -> Dict[str, float]:
+    """Accept-Encoding -> {coding: q}; tokens with a malformed q are ignored."""
+    prefs: Dict[str, float] = {}
+    for token in header.split(","):
+        coding, *params = [p.strip() for p in token.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = None
+        if q is not None:
+            prefs[coding.lower()] = q
+    return prefs
+
+_STATIC_REF = re.compile(r"""(?P<q>["'(])/static/(?P<path>[^"'()?#\s]+)""")
+
+def build_static(src: pathlib.Path = STATIC_DIR, out: pathlib.Path = STATIC_DIST_DIR) -> Dict[str, Any]:
+    """
+    Write a servable copy of static/ into `out`:
+    - every non-HTML file as name.<sha256[:12]>.ext (manifest.json maps source -> fingerprinted)
+    - HTML under its own name with /static/... references rewritten to fingerprinted names
+    - .br (if the brotli module is installed) and .gz next to any file they shrink by >= 10%
+    Built into a temp dir and swapped in, so a running worker never sees a half-built tree.
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    tmp = out.with_name(out.name + ".tmp")
+    old = out.with_name(out.name + ".old")
+    # out and its siblings from an interrupted build may sit inside src; never collect them
+    skip = {out, tmp, old}
+    files = sorted(
+        p for p in src.rglob("*")
+        if p.is_file() and skip.isdisjoint(p.parents) and p.suffix not in (".gz", ".br")
+    )
+    pages = [p for p in files if p.suffix == ".html"]
+
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    manifest: Dict[str, str] = {}
+    written: list[pathlib.Path] = []
+    for p in files:
+        if p.suffix == ".html":
+            continue
+        rel = p.relative_to(src).as_posix()
+        data = p.read_bytes()
+        fp = f"{p.stem}.{hashlib.sha256(data).hexdigest()[:12]}{p.suffix}"
+        fp_rel = str(pathlib.PurePosixPath(rel).with_name(fp))
+        dst = tmp / fp_rel
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        dst.write_bytes(data)
+        manifest[rel] = fp_rel
+        written.append(dst)
+
+    def _rewrite(m: re.Match) -> str:
+        fp_rel = manifest.get(m.group("path"))
+        return f"{m.group('q')}/static/{fp_rel}" if fp_rel else m.group(0)
+
+    for p in pages:
+        rel = p.relative_to(src).as_posix()
+        dst = tmp / rel
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        dst.write_text(_STATIC_REF.sub(_rewrite, p.read_text(encoding="utf-8")), encoding="utf-8")
+        written.append(dst)
+
+    saved = {"gzip": 0, "br": 0}
+    for dst in written:
+        data = dst.read_bytes()
+        variants = [("gzip", ".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(("br", ".br", brotli.compress(data, quality=11)))
+        for enc, ext, packed in variants:
+            if len(packed) <= len(data) * 0.9:
+                dst.with_name(dst.name + ext).write_bytes(packed)
+                saved[enc] += len(data) - len(packed)
+
+    (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+
+    shutil.rmtree(old, ignore_errors=True)
+    if out.exists():
+        out.rename(old)
+    tmp.rename(out)
+    shutil.rmtree(old, ignore_errors=True)
+    return {"files": len(written), "fingerprinted": len(manifest), "brotli": brotli is not None, "bytes_saved": saved}
+
+class _StaticAssets(StaticFiles):
+    """
+    /static handler. Paths produced by build_static are served from the dist
+    tree, picking .br/.gz by Accept-Encoding; fingerprinted files are cached
+    as immutable, HTML revalidates. Anything not in the build falls through
+    to plain StaticFiles (no-cache, so ETag revalidation still applies).
+    """
+
+    def __init__(self, *, directory: str, dist: pathlib.Path, **kw):
+        super().__init__(directory=directory, **kw)
+        self.dist = dist
+        self._built: Dict[str, bool] = {}  # dist-relative path -> immutable?
+        self._built_mtime: float | None = None
+        self._checked_at = 0.0
+
+    def _load_build(self) -> Dict[str, bool]:
+        # re-stat the manifest at most every few seconds so a rebuild is picked up without a restart
+        now = time.monotonic()
+        if now - self._checked_at < 5.0:
+            return self._built
+        self._checked_at = now
+        try:
+            mtime = (self.dist / "manifest.json").stat().st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._built_mtime:
+            built: Dict[str, bool] = {}
+            try:
+                manifest = json.loads((self.dist / "manifest.json").read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                manifest = {}
+            if manifest:
+                built = {fp: True for fp in manifest.values()}
+                for p in self.dist.rglob("*.html"):
+                    built[p.relative_to(self.dist).as_posix()] = False
+            self._built, self._built_mtime = built, mtime
+        return self._built
+
+    async def get_response(self, path: str, scope) -> Response:
+        immutable = self._load_build().get(path)
+        if immutable is not None and scope["method"] in ("GET", "HEAD"):
+            # highest q among the variants on disk wins; on a tie a compressed variant
+            # beats identity and br beats gzip. Unlisted identity ranks below any
+            # listed coding, and is still the fallback when everything is q=0.
+            prefs = _accept_encoding_q(Headers(scope=scope).get("accept-encoding", ""))
+            star = prefs.get("*")
+            target, encoding = self.dist / path, None
+            best = prefs.get("identity", star or 0.0)
+            for enc, ext in _STATIC_ENCODINGS:
+                q = prefs.get(enc, star or 0.0)
+                beats = q > best or (q == best and encoding is None)
+                if q > 0 and beats and (self.dist / (path + ext)).is_file():
+                    target, encoding, best = self.dist / (path + ext), enc, q
+            headers = {"Cache-Control": _STATIC_IMMUTABLE if immutable else "no-cache", "Vary": "Accept-Encoding"}
+            if encoding:
+                headers["Content-Encoding"] = encoding
+            media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            st = await run_in_threadpool(os.stat, target)
+            resp = FileResponse(str(target), media_type=media_type, headers=headers, stat_result=st)
+            if self.is_not_modified(resp.headers, Headers(scope=scope)):
+                return Response(status_code=304, headers={k: v for k, v in resp.headers.items()
+                                                          if k in ("etag", "cache-control", "vary")})
+            return resp
+
+        resp = await super().get_response(path, scope)
+        resp.headers.setdefault("Cache-Control", "no-cache")
+        return resp
+
+app.mount("/static", _StaticAssets(directory=str(STATIC_DIR), dist=STATIC_DIST_DIR, check_dir=False), name="static")
+_PHASES.append(("app+middleware", (time.perf_counter() - _t_app) * 1000.0))
+_t_routes = time.perf_counter()
 
 
 # ----------------------------
@@ -194,22 +587,29 @@ create table if not exists atlas_onboarding_submissions (
   entity_type text,
   jurisdiction text,
 
-  owner_json jsonb,
+  ip_assets_count int not null default 0,
+  notes text,
+
+  user_agent text,
+  ip_address text
+);
 
+-- submitted payloads live beside the narrow review row, so listing and status
+-- updates never read or rewrite them (see _migrate_onboarding_payloads)
+create table if not exists atlas_onboarding_payloads (
+  submission_id uuid primary key references atlas_onboarding_submissions(id) on delete cascade,
+  owner_json jsonb,
   nda_json jsonb,
   intake_json jsonb,
   attestation_json jsonb,
   participation_json jsonb,
   billing_ack_json jsonb,
-  doc_versions_json jsonb,
-
-  ip_assets_count int not null default 0,
-  notes text,
-
-  user_agent text,
-  ip_address text
+  doc_versions_json jsonb
 );
 
+-- leave page room so status/notes updates stay HOT (no index maintenance)
+alter table if exists atlas_onboarding_submissions set (fillfactor = 85);
+
 alter table if exists atlas_onboarding_submissions
   add column if not exists approved_owner_id uuid references ip_owners(id) on delete set null;
 
@@ -222,6 +622,27 @@ alter table if exists atlas_onboarding_submissions
 create index if not exists idx_atlas_onboarding_created_at on atlas_onboarding_submissions (created_at desc);
 create index if not exists idx_atlas_onboarding_owner_email on atlas_onboarding_submissions (owner_email);
 
+-- submission dedup: dedup_key is 'idem:<Idempotency-Key>' or 'sha:<payload_sha256>',
+-- cleared once it ages out of ATLAS_ONBOARDING_DEDUP_WINDOW_S
+alter table if exists atlas_onboarding_submissions
+  add column if not exists payload_sha256 text;
+
+alter table if exists atlas_onboarding_submissions
+  add column if not exists dedup_key text;
+
+create unique index if not exists uq_atlas_onboarding_dedup_key
+  on atlas_onboarding_submissions (dedup_key) where dedup_key is not null;
+
+-- reviewer work queue: a claim is a lease held until claimed_until
+alter table if exists atlas_onboarding_submissions
+  add column if not exists claimed_by text;
+
+alter table if exists atlas_onboarding_submissions
+  add column if not exists claimed_until timestamptz;
+
+create index if not exists idx_atlas_onboarding_queue
+  on atlas_onboarding_submissions (status, created_at) where status in ('submitted', 'needs_more');
+
 create table if not exists vault_sources (
   id uuid primary key default gen_random_uuid(),
   created_at timestamptz not null default now(),
@@ -254,6 +675,47 @@ create table if not exists vault_objects (
 create index if not exists idx_vault_objects_created on vault_objects(created_at desc);
 create index if not exists idx_vault_objects_source on vault_objects(source_key);
 
+-- 'file' = whole file at stored_path, 'chunked' = reassembled from vault_object_chunks
+alter table if exists vault_objects
+  add column if not exists storage text not null default 'file';
+
+-- bytes actually written to disk for this object after chunk dedup
+alter table if exists vault_objects
+  add column if not exists stored_bytes bigint;
+
+create table if not exists vault_chunks (
+  sha256 text primary key,
+  created_at timestamptz not null default now(),
+  byte_size int not null,
+  ref_count bigint not null default 0
+);
+
+create table if not exists vault_object_chunks (
+  object_id uuid not null references vault_objects(id) on delete cascade,
+  seq int not null,
+  chunk_sha256 text not null references vault_chunks(sha256),
+  byte_offset bigint not null,
+  byte_size int not null,
+  primary key (object_id, seq)
+);
+
+create index if not exists idx_vault_object_chunks_chunk on vault_object_chunks(chunk_sha256);
+
+create table if not exists vault_object_members (
+  object_id uuid not null references vault_objects(id) on delete cascade,
+  member_path text not null,
+  byte_size bigint not null,
+  compressed_size bigint not null,
+  crc32 bigint not null,
+  compress_type int,
+  header_offset bigint,
+  modified_at timestamp,
+  primary key (object_id, member_path)
+);
+
+alter table if exists vault_objects
+  add column if not exists members_indexed_at timestamptz;
+
 create table if not exists atlas_documents (
   id uuid primary key default gen_random_uuid(),
   created_at timestamptz not null default now(),
@@ -268,17 +730,83 @@ create table if not exists atlas_documents (
 );
 
 create index if not exists idx_atlas_documents_owner on atlas_documents(owner_id);
+create index if not exists idx_atlas_documents_onboarding on atlas_documents(onboarding_id);
+
+-- executed-PDF render cache: render_key = sha256(template, renderer version, fields, executed_at)
+create table if not exists atlas_render_cache (
+  render_key text primary key,
+  created_at timestamptz not null default now(),
+  sha256 text not null,
+  stored_path text not null,
+  byte_size bigint not null
+);
 create index if not exists idx_atlas_documents_created on atlas_documents(created_at desc);
 
-create table if not exists vault_access_logs (
+-- integrity scrubber state: verify_status is ok / mismatch / missing / unreadable
+alter table if exists vault_objects add column if not exists last_verified_at timestamptz;
+alter table if exists vault_objects add column if not exists verify_status text;
+alter table if exists atlas_documents add column if not exists last_verified_at timestamptz;
+alter table if exists atlas_documents add column if not exists verify_status text;
+
+create index if not exists idx_vault_objects_verified on vault_objects(last_verified_at nulls first);
+create index if not exists idx_atlas_documents_verified on atlas_documents(last_verified_at nulls first);
+
+create table if not exists storage_scrub_events (
   id uuid primary key default gen_random_uuid(),
   created_at timestamptz not null default now(),
+  kind text not null, -- vault_object / document
+  row_id uuid not null,
+  status text not null,
+  expected_sha256 text,
+  actual_sha256 text,
+  detail text
+);
+
+create index if not exists idx_storage_scrub_events_created on storage_scrub_events(created_at desc);
+
+-- monthly range partitions on created_at (see _migrate_access_logs / maintain_access_logs)
+create table if not exists vault_access_logs (
+  id uuid not null default gen_random_uuid(),
+  created_at timestamptz not null default now(),
   object_id uuid references vault_objects(id) on delete cascade,
   actor_email text,
   action text,
   ip_address text,
-  user_agent text
+  user_agent text,
+  xid xid8 not null default pg_current_xact_id(),  -- inserting transaction, tracked by rollups
+  primary key (id, created_at)
+) partition by range (created_at);
+
+create table if not exists vault_access_log_daily (
+  day date not null,
+  actor_email text not null default '',
+  action text not null default '',
+  object_id uuid,
+  count bigint not null default 0
+);
+
+create unique index if not exists uq_vault_access_log_daily
+  on vault_access_log_daily (day, actor_email, action, coalesce(object_id, '00000000-0000-0000-0000-000000000000'::uuid));
+
+create index if not exists idx_vault_access_log_daily_day on vault_access_log_daily (day, action);
+create index if not exists idx_vault_access_log_daily_actor on vault_access_log_daily (actor_email, day);
+create index if not exists idx_vault_access_log_daily_object on vault_access_log_daily (object_id, day);
+
+-- shared token buckets (ATLAS_RATE_LIMIT_STORE=postgres)
+create table if not exists atlas_rate_limits (
+  bucket_key text primary key,
+  tokens double precision not null,
+  updated_at timestamptz not null default now()
 );
+
+create table if not exists atlas_rollup_state (
+  name text primary key,
+  high_water timestamptz not null,
+  updated_at timestamptz not null default now()
+);
+
+-- snapshot xmin the last rollup counted up to (rows with xid below it are final)
+alter table if exists atlas_rollup_state add column if not exists xid_high_water bigint;
 """
 
 def run_ddl():
@@ -287,22 +815,55 @@ def run_ddl():
         for stmt in [s.strip() for s in DDL.split(";")]:
             if stmt:
                 conn.execute(text(stmt))
+        _migrate_access_logs(conn)
+        _migrate_onboarding_payloads(conn)
+        _install_activity_triggers(conn)
+        _install_chunk_refcount_trigger(conn)
 
 def ensure_admin():
     eng = get_engine()
-    pw_hash = bcrypt.hashpw(ADMIN_PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
     with eng.begin() as conn:
         r = conn.execute(text("select id from atlas_users where email=:e"), {"e": ADMIN_EMAIL}).fetchone()
-        if not r:
-            conn.execute(
-                text("insert into atlas_users (email, password_hash, role) values (:e, :p, 'admin')"),
-                {"e": ADMIN_EMAIL, "p": pw_hash},
-            )
+        if r:
+            return  # bcrypt is deliberately slow; only hash when we actually insert
+        pw_hash = bcrypt.hashpw(ADMIN_PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        conn.execute(
+            text("insert into atlas_users (email, password_hash, role) values (:e, :p, 'admin') on conflict (email) do nothing"),
+            {"e": ADMIN_EMAIL, "p": pw_hash},
+        )
 
 @app.on_event("startup")
 def _startup():
-    run_ddl()
-    ensure_admin()
+    with _phase("dirs"):
+        VAULT_DIR.mkdir(parents=True, exist_ok=True)
+        DOCS_DIR.mkdir(parents=True, exist_ok=True)
+        CHUNK_DIR.mkdir(parents=True, exist_ok=True)
+        ASSEMBLED_DIR.mkdir(parents=True, exist_ok=True)
+    # ATLAS_SKIP_DDL=1 lets extra workers skip schema bootstrap once one process has run it
+    if _env("ATLAS_SKIP_DDL", "0") != "1":
+        with _phase("ddl"):
+            run_ddl()
+    with _phase("ensure_admin"):
+        ensure_admin()
+    if STATIC_BUILD_ON_START and not (STATIC_DIST_DIR / "manifest.json").exists():
+        with _phase("static_build"):
+            build_static()
+    if SCRUB_ENABLED:
+        _SCRUBBER.start()
+    if REPLICA_URLS:
+        _run_periodically("replica-health", _REPLICAS.check, REPLICA_CHECK_S, _MAINTENANCE_STOP)
+    if RATE_LIMIT_STORE == "postgres":
+        _run_periodically("rate-limit-prune", _PostgresTokenBuckets(INTAKE_RATE, INTAKE_BURST).prune,
+                          3600, _MAINTENANCE_STOP)
+    _run_periodically("access-log-maintenance", maintain_access_logs, 24 * 3600, _MAINTENANCE_STOP)
+    _run_periodically("chunk-gc", collect_vault_chunks, 24 * 3600, _MAINTENANCE_STOP)
+    _report_startup()
+
+@app.on_event("shutdown")
+def _shutdown():
+    _SCRUBBER.stop()
+    _MAINTENANCE_STOP.set()
+    _ACTIVITY.stop()
 
 
 # ----------------------------
@@ -365,8 +926,7 @@ async def me(request: Request):
 @app.get("/api/owner/me")
 async def owner_me(request: Request):
     owner_id = require_owner(request)
-    eng = get_engine()
-    with eng.begin() as conn:
+    with read_conn(request) as conn:
         o = conn.execute(text("""
           select id, created_at, legal_name, entity_type, jurisdiction, address, email, phone
           from ip_owners
@@ -379,8 +939,7 @@ async def owner_me(request: Request):
 @app.get("/api/owner/assets")
 async def owner_assets(request: Request, limit: int = Query(200, ge=1, le=500)):
     owner_id = require_owner(request)
-    eng = get_engine()
-    with eng.begin() as conn:
+    with read_conn(request) as conn:
         rows = conn.execute(text("""
           select id, created_at, title, asset_type, jurisdictions, reg_no, status, priority_date,
                  inventors, current_owner_entity, encumbrances, description, targets, active
@@ -394,14 +953,14 @@ async def owner_assets(request: Request, limit: int = Query(200, ge=1, le=500)):
 @app.get("/api/owner/onboarding")
 async def owner_onboarding(request: Request):
     owner_id = require_owner(request)
-    eng = get_engine()
-    with eng.begin() as conn:
+    with read_conn(request) as conn:
         r = conn.execute(text("""
-          select id, created_at, status, notes, owner_email, owner_name,
-                 nda_json, intake_json, attestation_json, participation_json, billing_ack_json, doc_versions_json
-          from atlas_onboarding_submissions
-          where approved_owner_id = :oid::uuid
-          order by created_at desc
+          select s.id, s.created_at, s.status, s.notes, s.owner_email, s.owner_name,
+                 p.nda_json, p.intake_json, p.attestation_json, p.participation_json, p.billing_ack_json, p.doc_versions_json
+          from atlas_onboarding_submissions s
+          left join atlas_onboarding_payloads p on p.submission_id = s.id
+          where s.approved_owner_id = :oid::uuid
+          order by s.created_at desc
           limit 1
         """), {"oid": owner_id}).fetchone()
     if not r:
@@ -422,16 +981,21 @@ async def approve_onboarding(onboarding_id: str, request: Request):
 
     with eng.begin() as conn:
         sub = conn.execute(text("""
-          select id, status, owner_email, owner_name, entity_type, jurisdiction,
-            owner_json, intake_json, doc_versions_json,
-            nda_json, attestation_json, participation_json, billing_ack_json
-          from atlas_onboarding_submissions
-          where id = :id::uuid
+          select s.id, s.status, s.owner_email, s.owner_name, s.entity_type, s.jurisdiction,
+            coalesce(s.approved_at, date_trunc('second', now())) as executed_at,
+            p.owner_json, p.intake_json, p.doc_versions_json,
+            p.nda_json, p.attestation_json, p.participation_json, p.billing_ack_json
+          from atlas_onboarding_submissions s
+          left join atlas_onboarding_payloads p on p.submission_id = s.id
+          where s.id = :id::uuid
+          for update of s
         """), {"id": onboarding_id}).fetchone()
 
         if not sub:
             raise HTTPException(status_code=404, detail="Not found")
 
+        _check_review_claim(conn, onboarding_id, actor)
+
         if sub.status not in ("submitted", "needs_more"):
             raise HTTPException(status_code=400, detail=f"Cannot approve from status={sub.status}")
 
@@ -508,140 +1072,28 @@ async def approve_onboarding(onboarding_id: str, request: Request):
         conn.execute(text("""
           update atlas_onboarding_submissions
           set status='approved',
+              claimed_by = null,
+              claimed_until = null,
               approved_owner_id = :oid::uuid,
               approved_user_id = :uid::uuid,
-              approved_at = now()
+              approved_at = :executed_at
           where id = :sid::uuid
-        """), {"oid": owner_id, "uid": user_id, "sid": onboarding_id})
+        """), {"oid": owner_id, "uid": user_id, "sid": onboarding_id, "executed_at": sub.executed_at})
 
         # Generate executed PDFs + store in atlas_documents
-       
-        owner_name_exec = (owner_json.get("legal_name") or sub.owner_name or "").strip()
-        owner_email_exec = (owner_json.get("email") or sub.owner_email or "").strip()
-        signer_name = (att_json.get("signer_name") or "").strip()
-        signer_title = (att_json.get("signer_title") or "").strip()
-        att_date = (att_json.get("date") or "").strip()
-
-        # doc versions (from onboarding page hidden fields)
-        mippa_ver = str(doc_versions.get("mippa_version") or "Atlas-MIPPA-v1")
-        billing_ver = str(doc_versions.get("billing_policy_version") or "Atlas-Billing-Payout-Policy-v1")
-        nda_ver = str(doc_versions.get("nda_version") or "Atlas-NDA-v1")
-
-        # 1) NDA executed cert (only if enabled)
-        if bool(nda_json.get("enabled")):
-            nda_out = DOCS_DIR / f"nda_exec_{onboarding_id}_{_safe_filename(owner_email_exec)}.pdf"
-            _write_exec_pdf(
-                out_path=nda_out,
-                title="Executed NDA Acknowledgment",
-                subtitle="Atlas Mutual NDA • executed record",
-                fields=[
-                    ("Owner / Counterparty", owner_name_exec),
-                    ("Email", owner_email_exec),
-                    ("Effective Date", str(nda_json.get("effective_date") or "")),
-                    ("Counterparty Name", str(nda_json.get("counterparty_name") or "")),
-                    ("Counterparty Type", str(nda_json.get("counterparty_type") or "")),
-                    ("Signer Name (typed)", str(nda_json.get("signer_name") or "")),
-                    ("Signer Title", str(nda_json.get("signer_title") or "")),
-                    ("Non-Solicit Included", "YES" if nda_json.get("non_solicit") else "NO"),
-                    ("Residuals Included", "YES" if nda_json.get("residuals") else "NO"),
-                    ("Doc Version", nda_ver),
-                ],
-            )
-            nda_sha = sha256_file(nda_out)
-            _store_document_row(
-                conn=conn,
-                owner_id=owner_id,
-                onboarding_id=onboarding_id,
-                doc_type="nda",
-                doc_version=nda_ver,
-                filename=nda_out.name,
-                stored_path=nda_out,
-                sha256=nda_sha,
-            )
-
-        # 2) Attestation executed cert
-        att_out = DOCS_DIR / f"attestation_exec_{onboarding_id}_{_safe_filename(owner_email_exec)}.pdf"
-        _write_exec_pdf(
-            out_path=att_out,
-            title="Executed Owner Attestation",
-            subtitle="IP Owner Attestation & Authorization • executed record",
-            fields=[
-                ("Owner Legal Name", owner_name_exec),
-                ("Owner Email", owner_email_exec),
-                ("Signer Name (typed)", signer_name),
-                ("Signer Title", signer_title),
-                ("Attestation Date", att_date),
-                ("Confirm Ownership", "YES" if att_json.get("confirm_ownership") else "NO"),
-                ("Confirm Accuracy", "YES" if att_json.get("confirm_accuracy") else "NO"),
-                ("Ack No Legal/Tax Advice", "YES" if att_json.get("ack_no_legal") else "NO"),
-                ("Doc Version", "Atlas-IP-Owner-Attestation-v1"),
-            ],
-        )
-        att_sha = sha256_file(att_out)
-        _store_document_row(
-            conn=conn,
-            owner_id=owner_id,
-            onboarding_id=onboarding_id,
-            doc_type="attestation",
-            doc_version="Atlas-IP-Owner-Attestation-v1",
-            filename=att_out.name,
-            stored_path=att_out,
-            sha256=att_sha,
-        )
-
-        # 3) Participation Agreement acceptance cert
-        pa_out = DOCS_DIR / f"mippa_ack_{onboarding_id}_{_safe_filename(owner_email_exec)}.pdf"
-        _write_exec_pdf(
-            out_path=pa_out,
-            title="Participation Agreement Acceptance",
-            subtitle="Atlas Master IP Participation Agreement • acceptance record",
-            fields=[
-                ("Owner Legal Name", owner_name_exec),
-                ("Owner Email", owner_email_exec),
-                ("Agreement Effective Date", str(part_json.get("effective_date") or "")),
-                ("Accepted", "YES" if part_json.get("accepted") else "NO"),
-                ("Fee", "20% of Gross Receipts (default)"),
-                ("Doc Version", mippa_ver),
-            ],
-        )
-        pa_sha = sha256_file(pa_out)
-        _store_document_row(
-            conn=conn,
+        _generate_executed_docs(
+            conn,
             owner_id=owner_id,
             onboarding_id=onboarding_id,
-            doc_type="mippa_ack",
-            doc_version=mippa_ver,
-            filename=pa_out.name,
-            stored_path=pa_out,
-            sha256=pa_sha,
+            owner_name=sub.owner_name,
+            owner_email=sub.owner_email,
+            payloads={
+                "owner": owner_json, "nda": nda_json, "attestation": att_json,
+                "participation": part_json, "billing_ack": bill_json, "doc_versions": doc_versions,
+            },
+            executed_at=sub.executed_at,
         )
 
-        # 4) Billing Policy acceptance cert
-        bp_out = DOCS_DIR / f"billing_ack_{onboarding_id}_{_safe_filename(owner_email_exec)}.pdf"
-        _write_exec_pdf(
-            out_path=bp_out,
-            title="Billing & Payout Policy Acknowledgment",
-            subtitle="Atlas Billing & Payout Policy • acceptance record",
-            fields=[
-                ("Owner Legal Name", owner_name_exec),
-                ("Owner Email", owner_email_exec),
-                ("Accepted", "YES" if bill_json.get("accepted") else "NO"),
-                ("Doc Version", billing_ver),
-            ],
-        )
-        bp_sha = sha256_file(bp_out)
-        _store_document_row(
-            conn=conn,
-            owner_id=owner_id,
-            onboarding_id=onboarding_id,
-            doc_type="billing_ack",
-            doc_version=billing_ver,
-            filename=bp_out.name,
-            stored_path=bp_out,
-            sha256=bp_sha,
-        )
-
-
         # audit log
         conn.execute(text("""
           insert into vault_access_logs (object_id, actor_email, action, ip_address, user_agent)
@@ -681,6 +1133,224 @@ async def onboard_redirect():
 # Onboarding intake (public)
 # ----------------------------
 
+class _MemoryTokenBuckets:
+    """
+    Per-process buckets; enough for a single worker. Kept in LRU order, so
+    eviction only ever looks at the oldest entry: O(1) per request.
+    """
+
+    MAX_KEYS = 50_000
+
+    def __init__(self, rate: float, burst: float):
+        self.rate, self.burst = rate, burst
+        self._refill_s = burst / rate  # untouched this long = full bucket = no state
+        self._lock = threading.Lock()
+        self._buckets: collections.OrderedDict[str, tuple[float, float]] = collections.OrderedDict()
+
+    def take(self, key: str) -> float:
+        """Consume one token; returns 0 if allowed, else seconds until a token is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - ts) * self.rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1 if tokens >= 1 else tokens, now)
+            # oldest first: drop refilled buckets (TTL), and over MAX_KEYS the LRU one regardless
+            while self._buckets:
+                _k, (_t, u) = next(iter(self._buckets.items()))
+                if now - u < self._refill_s and len(self._buckets) <= self.MAX_KEYS:
+                    break
+                self._buckets.popitem(last=False)
+        return wait
+
+class _PostgresTokenBuckets:
+    """Shared across workers/hosts through atlas_rate_limits."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate, self.burst = rate, burst
+
+    def take(self, key: str) -> float:
+        with get_engine().begin() as conn:
+            # the no-op update row-locks an existing bucket, so prune() can't delete it mid-take
+            conn.execute(text("""
+                insert into atlas_rate_limits (bucket_key, tokens, updated_at)
+                values (:k, :burst, now())
+                on conflict (bucket_key) do update set bucket_key = excluded.bucket_key
+            """), {"k": key, "burst": self.burst})
+            r = conn.execute(text("""
+                select least(:burst, tokens + extract(epoch from now() - updated_at) * :rate) as tokens
+                from atlas_rate_limits
+                where bucket_key = :k
+                for update
+            """), {"k": key, "burst": self.burst, "rate": self.rate}).fetchone()
+            tokens = float(r.tokens)
+            allowed = tokens >= 1
+            conn.execute(text("""
+                update atlas_rate_limits set tokens = :t, updated_at = now() where bucket_key = :k
+            """), {"k": key, "t": tokens - 1 if allowed else tokens})
+        return 0.0 if allowed else (1 - tokens) / self.rate
+
+    def prune(self) -> int:
+        """Delete buckets that have refilled completely; a missing row reads as a full bucket."""
+        with get_engine().begin() as conn:
+            return conn.execute(text("""
+                delete from atlas_rate_limits where updated_at < now() - make_interval(secs => :s)
+            """), {"s": self.burst / self.rate}).rowcount
+
+class _SqliteTokenBuckets:
+    """Shared across workers on one host via a local SQLite file."""
+
+    def __init__(self, path: str, rate: float, burst: float):
+        self.path, self.rate, self.burst = path, rate, burst
+        self._local = threading.local()
+
+    def _conn(self):
+        import sqlite3
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            c.execute("pragma journal_mode=wal")
+            c.execute("create table if not exists buckets (k text primary key, tokens real not null, ts real not null)")
+            self._local.conn = c
+        return c
+
+    def take(self, key: str) -> float:
+        c = self._conn()
+        now = time.time()
+        c.execute("begin immediate")
+        try:
+            row = c.execute("select tokens, ts from buckets where k = ?", (key,)).fetchone()
+            tokens = self.burst if row is None else min(self.burst, row[0] + (now - row[1]) * self.rate)
+            allowed = tokens >= 1
+            c.execute("insert or replace into buckets (k, tokens, ts) values (?, ?, ?)",
+                      (key, tokens - 1 if allowed else tokens, now))
+            c.execute("commit")
+        except Exception:
+            c.execute("rollback")
+            raise
+        return 0.0 if allowed else (1 - tokens) / self.rate
+
+def _make_token_buckets():
+    if RATE_LIMIT_STORE == "postgres":
+        return _PostgresTokenBuckets(INTAKE_RATE, INTAKE_BURST)
+    if RATE_LIMIT_STORE.startswith("sqlite:"):
+        return _SqliteTokenBuckets(RATE_LIMIT_STORE[len("sqlite:"):], INTAKE_RATE, INTAKE_BURST)
+    return _MemoryTokenBuckets(INTAKE_RATE, INTAKE_BURST)
+
+class IntakeGuardMiddleware:
+    """
+    Guards POST /api/atlas/onboarding before the body is parsed or a DB
+    connection is taken: 429 per client_ip() over the token-bucket rate,
+    413 over INTAKE_MAX_BYTES, 503 once INTAKE_MAX_CONCURRENCY requests are in
+    flight. Rejections carry Retry-After instead of queueing.
+    """
+
+    PATH = "/api/atlas/onboarding"
+
+    def __init__(self, app):
+        self.app = app
+        self.buckets = _make_token_buckets()
+        self.inflight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != self.PATH:
+            return await self.app(scope, receive, send)
+
+        request = Request(scope)
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > INTAKE_MAX_BYTES:
+            return await self._reject(scope, receive, send, 413, "request body too large", None)
+
+        key = f"intake:{client_ip(request) or 'unknown'}"
+        wait = await run_in_threadpool(self.buckets.take, key)
+        if wait > 0:
+            return await self._reject(scope, receive, send, 429, "too many submissions, slow down", wait)
+
+        # counted from here, not once the body is in: a slow upload holds its slot too
+        if self.inflight >= INTAKE_MAX_CONCURRENCY:
+            return await self._reject(scope, receive, send, 503, "intake busy, retry shortly", 1)
+        self.inflight += 1
+        try:
+            # the body is small by construction: read it here (capped) and replay it,
+            # so oversized chunked uploads get a 413 before anything parses them
+            body = bytearray()
+            more = True
+            while more:
+                msg = await receive()
+                if msg["type"] != "http.request":
+                    return
+                body += msg.get("body", b"")
+                more = msg.get("more_body", False)
+                if len(body) > INTAKE_MAX_BYTES:
+                    return await self._reject(scope, receive, send, 413, "request body too large", None)
+
+            replayed = False
+
+            async def replay_receive():
+                nonlocal replayed
+                if not replayed:
+                    replayed = True
+                    return {"type": "http.request", "body": bytes(body), "more_body": False}
+                return await receive()
+
+            await self.app(scope, replay_receive, send)
+        finally:
+            self.inflight -= 1
+
+    @staticmethod
+    async def _reject(scope, receive, send, status: int, detail: str, retry_after: float | None):
+        headers = {"Retry-After": str(max(1, int(retry_after + 0.999)))} if retry_after else None
+        await JSONResponse({"detail": detail}, status_code=status, headers=headers)(scope, receive, send)
+
+app.add_middleware(IntakeGuardMiddleware)
+
+class ReadYourWritesMiddleware:
+    """
+    Pins a client's reads to the primary for READ_YOUR_WRITES_S after any
+    successful unsafe request, via a short-lived cookie, so a reviewer never
+    reads a replica that has not yet replayed their own change.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        cookie = Headers(scope=scope).get("cookie", "")
+        m = re.search(rf"(?:^|;\s*){_RW_COOKIE}=([0-9.]+)", cookie)
+        if m and time.time() - float(m.group(1)) < READ_YOUR_WRITES_S:
+            scope.setdefault("state", {})["read_primary"] = True
+
+        if scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(msg):
+            if msg["type"] == "http.response.start" and msg["status"] < 400:
+                set_cookie = f"{_RW_COOKIE}={time.time():.3f}; Max-Age={READ_YOUR_WRITES_S}; Path=/; HttpOnly; SameSite=Lax"
+                msg = {**msg, "headers": [*msg.get("headers", []), (b"set-cookie", set_cookie.encode("latin-1"))]}
+            await send(msg)
+
+        await self.app(scope, receive, send_wrapper)
+
+if REPLICA_URLS:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# CORS: keep simple for now (same-origin UI doesn’t need credentials).
+# Added last so it is outermost: IntakeGuard's 413/429/503 get CORS headers too.
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=False,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+def _canonical_payload_sha256(payload: Dict[str, Any]) -> str:
+    canon = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
 @app.post("/api/atlas/onboarding")
 async def submit_onboarding(payload: Dict[str, Any], request: Request):
     owner = payload.get("owner") or {}
@@ -727,25 +1397,70 @@ async def submit_onboarding(payload: Dict[str, Any], request: Request):
     ua = request.headers.get("user-agent", "")
     ip_addr = client_ip(request)
 
+    payload_sha = _canonical_payload_sha256(payload)
+    idem_key = (request.headers.get("idempotency-key") or "").strip()[:200]
+    dedup_key = f"idem:{idem_key}" if idem_key else f"sha:{payload_sha}"
+
     eng = get_engine()
     with eng.begin() as conn:
-        row = conn.execute(text("""
+        # let an expired key be reused; the unique index then decides between racing retries
+        conn.execute(text("""
+            update atlas_onboarding_submissions
+            set dedup_key = null
+            where dedup_key = :dk and created_at < now() - make_interval(secs => :win)
+        """), {"dk": dedup_key, "win": ONBOARDING_DEDUP_WINDOW_S})
+
+        insert = text("""
             insert into atlas_onboarding_submissions
               (owner_email, owner_name, entity_type, jurisdiction,
-              owner_json,
-              nda_json, intake_json, attestation_json, participation_json, billing_ack_json, doc_versions_json,
-              ip_assets_count, user_agent, ip_address)
+              ip_assets_count, user_agent, ip_address, payload_sha256, dedup_key)
             values
               (:owner_email, :owner_name, :entity_type, :jurisdiction,
-              :owner_json::jsonb,
-              :nda_json::jsonb, :intake_json::jsonb, :attestation_json::jsonb, :participation_json::jsonb, :billing_ack_json::jsonb, :doc_versions_json::jsonb,
-              :ip_assets_count, :user_agent, :ip_address)
+              :ip_assets_count, :user_agent, :ip_address, :payload_sha256, :dedup_key)
+            on conflict (dedup_key) where dedup_key is not null do nothing
             returning id
-        """), {
+        """)
+        params = {
             "owner_email": owner_email,
             "owner_name": owner_name,
             "entity_type": entity_type,
             "jurisdiction": jurisdiction,
+            "ip_assets_count": ip_assets_count,
+            "user_agent": ua,
+            "ip_address": ip_addr,
+            "payload_sha256": payload_sha,
+            "dedup_key": dedup_key,
+        }
+
+        for _attempt in range(2):
+            row = conn.execute(insert, params).fetchone()
+            if row is not None:
+                break
+            orig = conn.execute(text("""
+                select id, status, payload_sha256
+                from atlas_onboarding_submissions
+                where dedup_key = :dk
+            """), {"dk": dedup_key}).fetchone()
+            if orig is not None:
+                if orig.payload_sha256 != payload_sha:
+                    raise HTTPException(status_code=409, detail="Idempotency-Key was already used with a different payload")
+                return {"ok": True, "onboarding_id": str(orig.id), "status": orig.status, "duplicate": True}
+            # a concurrent submission expired the conflicting key between our insert and
+            # the select, so the key is free again: insert once more
+        else:
+            raise HTTPException(status_code=409, detail="Duplicate submission in progress, retry shortly")
+
+        onboarding_id = str(row[0])
+
+        conn.execute(text("""
+            insert into atlas_onboarding_payloads
+              (submission_id, owner_json,
+              nda_json, intake_json, attestation_json, participation_json, billing_ack_json, doc_versions_json)
+            values
+              (:id::uuid, :owner_json::jsonb,
+              :nda_json::jsonb, :intake_json::jsonb, :attestation_json::jsonb, :participation_json::jsonb, :billing_ack_json::jsonb, :doc_versions_json::jsonb)
+        """), {
+            "id": onboarding_id,
             "owner_json": json.dumps(owner),
             "nda_json": json.dumps(nda),
             "intake_json": json.dumps(intake),
@@ -753,11 +1468,7 @@ async def submit_onboarding(payload: Dict[str, Any], request: Request):
             "participation_json": json.dumps(part),
             "billing_ack_json": json.dumps(bill),
             "doc_versions_json": json.dumps(payload.get("doc_versions") or {}),
-            "ip_assets_count": ip_assets_count,
-            "user_agent": ua,
-            "ip_address": ip_addr
-        }).fetchone()
-        onboarding_id = str(row[0])
+        })
 
     return {"ok": True, "onboarding_id": onboarding_id, "status": "submitted"}
 
@@ -766,6 +1477,51 @@ async def submit_onboarding(payload: Dict[str, Any], request: Request):
 # Admin: onboarding review
 # ----------------------------
 
+# section name -> atlas_onboarding_payloads column
+_ONBOARDING_PAYLOAD_FIELDS = {
+    "owner": "owner_json",
+    "nda": "nda_json",
+    "intake": "intake_json",
+    "attestation": "attestation_json",
+    "participation": "participation_json",
+    "billing_ack": "billing_ack_json",
+    "doc_versions": "doc_versions_json",
+}
+_ONBOARDING_PAYLOAD_COLS = ", ".join(_ONBOARDING_PAYLOAD_FIELDS.values())
+
+_ONBOARDING_COLS = """id, created_at, status, owner_email, owner_name, entity_type, jurisdiction,
+    ip_assets_count, notes, user_agent, ip_address, approved_owner_id, approved_user_id, approved_at,
+    claimed_by, claimed_until"""
+
+def _migrate_onboarding_payloads(conn):
+    """One-time move of the JSONB payload columns off atlas_onboarding_submissions."""
+    # two workers bootstrapping at once would both see owner_json; the second waits
+    # here for the first to commit, then finds the columns gone
+    conn.execute(text("select pg_advisory_xact_lock(:k)"), {"k": 0x4154504C})  # "ATPL"
+    legacy = conn.execute(text("""
+        select 1 from information_schema.columns
+        where table_schema = current_schema() and table_name = 'atlas_onboarding_submissions'
+          and column_name = 'owner_json'
+    """)).scalar()
+    if not legacy:
+        return
+    conn.execute(text(f"""
+        insert into atlas_onboarding_payloads (submission_id, {_ONBOARDING_PAYLOAD_COLS})
+        select id, {_ONBOARDING_PAYLOAD_COLS} from atlas_onboarding_submissions
+        on conflict (submission_id) do nothing
+    """))
+    drops = ", ".join(f"drop column {c}" for c in _ONBOARDING_PAYLOAD_FIELDS.values())
+    conn.execute(text(f"alter table atlas_onboarding_submissions {drops}"))
+
+def _parse_onboarding_include(include: str) -> list[str]:
+    names = [x.strip() for x in include.split(",") if x.strip()]
+    if "all" in names:
+        return list(_ONBOARDING_PAYLOAD_FIELDS.values())
+    bad = [x for x in names if x not in _ONBOARDING_PAYLOAD_FIELDS]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"unknown include: {', '.join(bad)}")
+    return [_ONBOARDING_PAYLOAD_FIELDS[x] for x in names]
+
 @app.get("/api/admin/onboarding")
 async def list_onboarding(
     request: Request,
@@ -773,10 +1529,11 @@ async def list_onboarding(
     limit: int = Query(50, ge=1, le=200),
 ):
     actor = require_admin(request)
-    eng = get_engine()
-    with eng.begin() as conn:
+    with read_conn(request) as conn:
         rows = conn.execute(text("""
-            select id, created_at, status, owner_email, owner_name, ip_assets_count
+            select id, created_at, status, owner_email, owner_name, ip_assets_count,
+                   case when claimed_until > now() then claimed_by end as claimed_by,
+                   case when claimed_until > now() then claimed_until end as claimed_until
             from atlas_onboarding_submissions
             where (:status = 'all' or status = :status)
             order by created_at desc
@@ -784,13 +1541,78 @@ async def list_onboarding(
         """), {"status": status, "limit": limit}).fetchall()
     return {"ok": True, "items": [dict(r._mapping) for r in rows]}
 
+def _check_review_claim(conn, onboarding_id: str, actor: str):
+    """409 if another reviewer holds a live claim on this submission."""
+    holder = conn.execute(text("""
+        select case when claimed_until > now() and claimed_by <> :actor then claimed_by end
+        from atlas_onboarding_submissions
+        where id = :id::uuid
+        for update
+    """), {"id": onboarding_id, "actor": actor}).scalar()
+    if holder:
+        raise HTTPException(status_code=409, detail=f"Claimed by {holder}")
+
+@app.post("/api/admin/onboarding/claim")
+async def claim_onboarding(payload: Dict[str, Any], request: Request):
+    """
+    Lease the next N unclaimed submissions (oldest first) to the caller.
+    SKIP LOCKED lets concurrent reviewers pull disjoint batches; rows the
+    caller already holds are re-leased rather than handed to someone else.
+    """
+    actor = require_admin(request)
+    n = max(1, min(int(payload.get("n") or 10), 50))
+    status = (payload.get("status") or "submitted").strip()
+    if status not in {"submitted", "needs_more"}:
+        raise HTTPException(status_code=400, detail="invalid status")
+
+    eng = get_engine()
+    with eng.begin() as conn:
+        rows = conn.execute(text("""
+            with next as (
+              select id
+              from atlas_onboarding_submissions
+              where status = :status
+                and (claimed_until is null or claimed_until <= now() or claimed_by = :actor)
+              order by created_at
+              limit :n
+              for update skip locked
+            )
+            update atlas_onboarding_submissions s
+            set claimed_by = :actor,
+                claimed_until = now() + make_interval(secs => :lease)
+            from next
+            where s.id = next.id
+            returning s.id, s.created_at, s.status, s.owner_email, s.owner_name, s.ip_assets_count,
+                      s.claimed_by, s.claimed_until
+        """), {"status": status, "actor": actor, "n": n, "lease": REVIEW_LEASE_S}).fetchall()
+
+    items = sorted((dict(r._mapping) for r in rows), key=lambda r: r["created_at"])
+    return {"ok": True, "lease_s": REVIEW_LEASE_S, "items": items}
+
+@app.post("/api/admin/onboarding/{onboarding_id}/release")
+async def release_onboarding(onboarding_id: str, request: Request):
+    actor = require_admin(request)
+    eng = get_engine()
+    with eng.begin() as conn:
+        n = conn.execute(text("""
+            update atlas_onboarding_submissions
+            set claimed_by = null, claimed_until = null
+            where id = :id::uuid and claimed_by = :actor
+        """), {"id": onboarding_id, "actor": actor}).rowcount
+    return {"ok": True, "id": onboarding_id, "released": n > 0}
+
 @app.get("/api/admin/onboarding/{onboarding_id}")
-async def get_onboarding(onboarding_id: str, request: Request):
+async def get_onboarding(
+    onboarding_id: str,
+    request: Request,
+    include: str = Query("", description="payload sections to load: owner,nda,intake,attestation,participation,billing_ack,doc_versions or all"),
+):
     actor = require_admin(request)
+    payload_cols = _parse_onboarding_include(include)
     eng = get_engine()
     with eng.begin() as conn:
-        r = conn.execute(text("""
-            select *
+        r = conn.execute(text(f"""
+            select {_ONBOARDING_COLS}
             from atlas_onboarding_submissions
             where id = :id
         """), {"id": onboarding_id}).fetchone()
@@ -798,6 +1620,15 @@ async def get_onboarding(onboarding_id: str, request: Request):
         if not r:
             raise HTTPException(status_code=404, detail="Not found")
 
+        submission = dict(r._mapping)
+        if payload_cols:
+            p = conn.execute(text(f"""
+                select {", ".join(payload_cols)}
+                from atlas_onboarding_payloads
+                where submission_id = :id
+            """), {"id": onboarding_id}).fetchone()
+            submission.update(dict(p._mapping) if p else {c: None for c in payload_cols})
+
         # log read (object_id null is allowed)
         conn.execute(text("""
             insert into vault_access_logs (object_id, actor_email, action, ip_address, user_agent)
@@ -808,7 +1639,7 @@ async def get_onboarding(onboarding_id: str, request: Request):
             "ua": request.headers.get("user-agent", "")
         })
 
-    return {"ok": True, "submission": dict(r._mapping)}
+    return {"ok": True, "submission": submission}
 
 @app.post("/api/admin/onboarding/{onboarding_id}/status")
 async def set_onboarding_status(onboarding_id: str, payload: Dict[str, Any], request: Request):
@@ -820,9 +1651,10 @@ async def set_onboarding_status(onboarding_id: str, payload: Dict[str, Any], req
 
     eng = get_engine()
     with eng.begin() as conn:
+        _check_review_claim(conn, onboarding_id, actor)
         n = conn.execute(text("""
             update atlas_onboarding_submissions
-            set status = :s, notes = :notes
+            set status = :s, notes = :notes, claimed_by = null, claimed_until = null
             where id = :id
         """), {"s": status, "notes": notes, "id": onboarding_id}).rowcount
 
@@ -849,14 +1681,25 @@ def _safe_filename(name: str) -> str:
     keep = "._-"
     return "".join(c for c in name if c.isalnum() or c in keep)[:180] or "doc"
 
+# Bump when _write_exec_pdf's layout changes so cached renders are not reused
+EXEC_PDF_TEMPLATE = "exec-pdf-v2"
+RENDER_DIR = DOCS_DIR / "rendered"
+
 def _write_exec_pdf(
     *,
     out_path: pathlib.Path,
     title: str,
     subtitle: str,
     fields: list[tuple[str, str]],
+    executed_at: datetime,
 ):
-    c = canvas.Canvas(str(out_path), pagesize=letter)
+    """Byte-for-byte deterministic for the same arguments (invariant mode pins the PDF dates and ID)."""
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+
+    c = canvas.Canvas(str(out_path), pagesize=letter, invariant=1)
     w, h = letter
 
     # header bar
@@ -890,9 +1733,139 @@ def _write_exec_pdf(
     # footer
     c.setFont("Helvetica", 9)
     c.setFillColor(colors.HexColor("#6b7a90"))
-    c.drawRightString(w-0.75*inch, 0.5*inch, f"Generated by Atlas • {utcnow().isoformat()}")
+    c.drawRightString(w-0.75*inch, 0.5*inch, f"Generated by Atlas • {executed_at.astimezone(timezone.utc).isoformat()}")
     c.save()
 
+def _render_key(*, title: str, subtitle: str, fields: list[tuple[str, str]], executed_at: datetime) -> str:
+    import reportlab
+    canon = json.dumps({
+        "template": EXEC_PDF_TEMPLATE,
+        "reportlab": reportlab.Version,
+        "title": title,
+        "subtitle": subtitle,
+        "fields": [[k, v or ""] for k, v in fields],
+        "executed_at": executed_at.astimezone(timezone.utc).isoformat(),
+    }, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+def _render_exec_pdf(conn, **render) -> tuple[pathlib.Path, str]:
+    """
+    Content-addressed render: identical inputs map to one stored PDF under
+    RENDER_DIR, so re-approvals, retries and backfills only add a row.
+    """
+    key = _render_key(**render)
+    hit = conn.execute(text("select stored_path, sha256 from atlas_render_cache where render_key = :k"), {"k": key}).fetchone()
+    if hit and pathlib.Path(hit.stored_path).is_file():
+        return pathlib.Path(hit.stored_path), hit.sha256
+
+    out = RENDER_DIR / key[:2] / f"{key}.pdf"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(f".{out.name}.{secrets.token_hex(4)}.tmp")
+    _write_exec_pdf(out_path=tmp, **render)
+    os.replace(tmp, out)
+    sha = sha256_file(out)
+    conn.execute(text("""
+        insert into atlas_render_cache (render_key, sha256, stored_path, byte_size)
+        values (:k, :sha, :path, :size)
+        on conflict (render_key) do update set sha256 = excluded.sha256, stored_path = excluded.stored_path,
+                                               byte_size = excluded.byte_size
+    """), {"k": key, "sha": sha, "path": str(out), "size": out.stat().st_size})
+    return out, sha
+
+def _generate_executed_docs(
+    conn,
+    *,
+    owner_id: str,
+    onboarding_id: str,
+    owner_name: str | None,
+    owner_email: str | None,
+    payloads: Dict[str, Dict[str, Any]],
+    executed_at: datetime,
+) -> list[str]:
+    """Render (or reuse) the executed-document PDFs for an approved submission and record them."""
+    owner_json = payloads.get("owner") or {}
+    nda_json = payloads.get("nda") or {}
+    att_json = payloads.get("attestation") or {}
+    part_json = payloads.get("participation") or {}
+    bill_json = payloads.get("billing_ack") or {}
+    doc_versions = payloads.get("doc_versions") or {}
+
+    owner_name_exec = (owner_json.get("legal_name") or owner_name or "").strip()
+    owner_email_exec = (owner_json.get("email") or owner_email or "").strip()
+    signer_name = (att_json.get("signer_name") or "").strip()
+    signer_title = (att_json.get("signer_title") or "").strip()
+    att_date = (att_json.get("date") or "").strip()
+
+    # doc versions (from onboarding page hidden fields)
+    mippa_ver = str(doc_versions.get("mippa_version") or "Atlas-MIPPA-v1")
+    billing_ver = str(doc_versions.get("billing_policy_version") or "Atlas-Billing-Payout-Policy-v1")
+    nda_ver = str(doc_versions.get("nda_version") or "Atlas-NDA-v1")
+
+    docs = []
+
+    # 1) NDA executed cert (only if enabled)
+    if bool(nda_json.get("enabled")):
+        docs.append(("nda", nda_ver, "nda_exec", "Executed NDA Acknowledgment", "Atlas Mutual NDA • executed record", [
+            ("Owner / Counterparty", owner_name_exec),
+            ("Email", owner_email_exec),
+            ("Effective Date", str(nda_json.get("effective_date") or "")),
+            ("Counterparty Name", str(nda_json.get("counterparty_name") or "")),
+            ("Counterparty Type", str(nda_json.get("counterparty_type") or "")),
+            ("Signer Name (typed)", str(nda_json.get("signer_name") or "")),
+            ("Signer Title", str(nda_json.get("signer_title") or "")),
+            ("Non-Solicit Included", "YES" if nda_json.get("non_solicit") else "NO"),
+            ("Residuals Included", "YES" if nda_json.get("residuals") else "NO"),
+            ("Doc Version", nda_ver),
+        ]))
+
+    # 2) Attestation executed cert
+    docs.append(("attestation", "Atlas-IP-Owner-Attestation-v1", "attestation_exec", "Executed Owner Attestation",
+                 "IP Owner Attestation & Authorization • executed record", [
+        ("Owner Legal Name", owner_name_exec),
+        ("Owner Email", owner_email_exec),
+        ("Signer Name (typed)", signer_name),
+        ("Signer Title", signer_title),
+        ("Attestation Date", att_date),
+        ("Confirm Ownership", "YES" if att_json.get("confirm_ownership") else "NO"),
+        ("Confirm Accuracy", "YES" if att_json.get("confirm_accuracy") else "NO"),
+        ("Ack No Legal/Tax Advice", "YES" if att_json.get("ack_no_legal") else "NO"),
+        ("Doc Version", "Atlas-IP-Owner-Attestation-v1"),
+    ]))
+
+    # 3) Participation Agreement acceptance cert
+    docs.append(("mippa_ack", mippa_ver, "mippa_ack", "Participation Agreement Acceptance",
+                 "Atlas Master IP Participation Agreement • acceptance record", [
+        ("Owner Legal Name", owner_name_exec),
+        ("Owner Email", owner_email_exec),
+        ("Agreement Effective Date", str(part_json.get("effective_date") or "")),
+        ("Accepted", "YES" if part_json.get("accepted") else "NO"),
+        ("Fee", "20% of Gross Receipts (default)"),
+        ("Doc Version", mippa_ver),
+    ]))
+
+    # 4) Billing Policy acceptance cert
+    docs.append(("billing_ack", billing_ver, "billing_ack", "Billing & Payout Policy Acknowledgment",
+                 "Atlas Billing & Payout Policy • acceptance record", [
+        ("Owner Legal Name", owner_name_exec),
+        ("Owner Email", owner_email_exec),
+        ("Accepted", "YES" if bill_json.get("accepted") else "NO"),
+        ("Doc Version", billing_ver),
+    ]))
+
+    for doc_type, doc_version, prefix, title, subtitle, fields in docs:
+        path, sha = _render_exec_pdf(conn, title=title, subtitle=subtitle, fields=fields, executed_at=executed_at)
+        _store_document_row(
+            conn=conn,
+            owner_id=owner_id,
+            onboarding_id=onboarding_id,
+            doc_type=doc_type,
+            doc_version=doc_version,
+            filename=f"{prefix}_{onboarding_id}_{_safe_filename(owner_email_exec)}.pdf",
+            stored_path=path,
+            sha256=sha,
+        )
+    return [d[0] for d in docs]
+
 def _store_document_row(
     *,
     conn,
@@ -926,6 +1899,443 @@ def sha256_file(path: pathlib.Path) -> str:
             h.update(chunk)
     return h.hexdigest()
 
+# ----------------------------
+# File serving (download handlers call this after access check + audit log)
+# ----------------------------
+
+class _VaultFileResponse(FileResponse):
+    """FileResponse streaming in 1 MiB reads instead of 64 KiB (python serve mode)."""
+    chunk_size = 1024 * 1024
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+def _file_response(path: pathlib.Path, *, media_type: str, filename: str, mode: str | None = None) -> Response:
+    mode = mode or FILE_SERVE_MODE
+    headers = {"Content-Disposition": _content_disposition(filename)}
+
+    if mode == "accel":
+        try:
+            rel = path.resolve().relative_to(VAULT_DIR)
+        except ValueError:
+            rel = None  # outside the proxied root; serve it ourselves
+        if rel is not None:
+            headers["X-Accel-Redirect"] = ACCEL_PREFIX + quote(rel.as_posix())
+            return Response(status_code=200, media_type=media_type, headers=headers)
+
+    if mode == "xsendfile":
+        headers["X-Sendfile"] = str(path.resolve())
+        return Response(status_code=200, media_type=media_type, headers=headers)
+
+    return _VaultFileResponse(str(path), media_type=media_type, filename=filename)
+
+# ----------------------------
+# Vault chunk store (content-defined chunking + dedup)
+# ----------------------------
+
+# Content-defined cut points: a position is a candidate when its byte is in a
+# small anchor set (found with a C-speed regex scan), and a cut when the crc32
+# of the preceding window matches a mask -- stricter before CDC_AVG, looser
+# after it, so sizes cluster around CDC_AVG (FastCDC-style normalization).
+# Boundaries depend only on nearby content, so an insert near the start of a
+# re-export only changes the chunks around it. A per-byte rolling hash loop in
+# pure Python measured ~3 MB/s; this runs several times faster.
+CDC_MIN = 256 * 1024
+CDC_AVG = 1024 * 1024
+CDC_MAX = 4 * 1024 * 1024
+_CDC_WINDOW = 64
+_CDC_MASK_S = (1 << 16) - 1
+_CDC_MASK_L = (1 << 13) - 1
+# Anchor bytes must be stable across processes/hosts (chunk ids are shared):
+# 4 printable + 4 other byte values picked by hash, so both text exports
+# (JSONL/CSV) and compressed zip members yield candidates.
+def _cdc_anchor_bytes() -> bytes:
+    rank = lambda i: hashlib.sha256(bytes([i])).digest()
+    printable = sorted(range(0x20, 0x7F), key=rank)[:4]
+    other = sorted([i for i in range(256) if not 0x20 <= i < 0x7F], key=rank)[:4]
+    return bytes(sorted(printable + other))
+
+_CDC_ANCHOR = re.compile(b"[" + b"".join(re.escape(bytes([i])) for i in _cdc_anchor_bytes()) + b"]")
+
+def _cdc_cut(buf, start: int, end: int) -> int:
+    """End offset of the chunk starting at `start`; callers pass at least CDC_MAX bytes unless at EOF."""
+    if end - start <= CDC_MIN:
+        return end
+    normal = min(start + CDC_AVG, end)
+    stop = min(start + CDC_MAX, end)
+    crc = zlib.crc32
+    for m in _CDC_ANCHOR.finditer(buf, start + CDC_MIN, stop):
+        i = m.end()
+        if not (crc(buf[i - _CDC_WINDOW:i]) & (_CDC_MASK_S if i < normal else _CDC_MASK_L)):
+            return i
+    return stop
+
+def _chunk_path(sha: str) -> pathlib.Path:
+    return CHUNK_DIR / sha[:2] / sha[2:4] / sha
+
+class _ChunkWriter:
+    """
+    Feed an upload through CDC; each unique chunk is written once under
+    CHUNK_DIR. Collects the per-object chunk list for vault_object_chunks.
+    Call from a worker thread (hashing + cut-point scanning are CPU bound).
+    Chunks land on disk before the object row commits; if that insert fails
+    they stay unreferenced and collect_vault_chunks removes them.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._obj_hash = hashlib.sha256()
+        self._offset = 0
+        self.size = 0
+        self.new_bytes = 0
+        self.chunks: list[tuple[str, int, int]] = []  # (sha256, offset, size)
+
+    def feed(self, data: bytes):
+        self._obj_hash.update(data)
+        self.size += len(data)
+        self._buf += data
+        self._drain(eof=False)
+
+    def finish(self) -> str:
+        self._drain(eof=True)
+        return self._obj_hash.hexdigest()
+
+    def _drain(self, eof: bool):
+        # only cut once a full CDC_MAX window is buffered, so each byte is scanned once
+        buf = self._buf
+        pos = 0
+        while len(buf) - pos >= CDC_MAX or (eof and pos < len(buf)):
+            cut = _cdc_cut(buf, pos, len(buf))
+            self._emit(bytes(buf[pos:cut]))
+            pos = cut
+        if pos:
+            del buf[:pos]
+
+    def _emit(self, data: bytes):
+        sha = hashlib.sha256(data).hexdigest()
+        self.chunks.append((sha, self._offset, len(data)))
+        self._offset += len(data)
+        path = _chunk_path(sha)
+        try:
+            os.utime(path)  # reused: a fresh mtime keeps the chunk GC away until we commit
+            return
+        except FileNotFoundError:
+            pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{sha}.{secrets.token_hex(4)}.part")
+        with tmp.open("wb") as f:
+            f.write(data)
+        tmp.replace(path)
+        self.new_bytes += len(data)
+
+def _record_object_chunks(conn, object_id: str, chunks: list[tuple[str, int, int]]):
+    # a chunk repeated inside one object still counts one reference per occurrence;
+    # sha order keeps concurrent ingests locking shared vault_chunks rows in the same order
+    refs: dict[str, list[int]] = {}  # sha -> [size, references]
+    for sha, _off, size in chunks:
+        refs.setdefault(sha, [size, 0])[1] += 1
+    conn.execute(text("""
+        insert into vault_chunks (sha256, byte_size, ref_count)
+        values (:sha, :size, :n)
+        on conflict (sha256) do update set ref_count = vault_chunks.ref_count + excluded.ref_count
+    """), [{"sha": sha, "size": size, "n": n} for sha, (size, n) in sorted(refs.items())])
+    conn.execute(text("""
+        insert into vault_object_chunks (object_id, seq, chunk_sha256, byte_offset, byte_size)
+        values (:oid::uuid, :seq, :sha, :off, :size)
+    """), [{"oid": object_id, "seq": seq, "sha": sha, "off": off, "size": size}
+           for seq, (sha, off, size) in enumerate(chunks)])
+
+def _install_chunk_refcount_trigger(conn):
+    """Deleting an object (its vault_object_chunks rows cascade) gives its chunk references back."""
+    conn.execute(text("""
+        create or replace function atlas_release_chunks() returns trigger language plpgsql as $fn$
+        begin
+          update vault_chunks c
+          set ref_count = c.ref_count - g.n
+          from (select chunk_sha256, count(*) as n from released group by chunk_sha256) g
+          where c.sha256 = g.chunk_sha256;
+          return null;
+        end
+        $fn$
+    """))
+    conn.execute(text("drop trigger if exists trg_vault_object_chunks_release on vault_object_chunks"))
+    conn.execute(text("""
+        create trigger trg_vault_object_chunks_release after delete on vault_object_chunks
+        referencing old table as released
+        for each statement execute function atlas_release_chunks()
+    """))
+
+def _retire_file(path: pathlib.Path, cutoff: float) -> int:
+    """
+    Delete `path` unless it was touched after `cutoff`; returns the bytes freed.
+    The file is renamed aside first and its mtime checked afterwards: an ingest
+    that reused it just before the rename bumped the mtime (so it is put back),
+    and one arriving after the rename finds it missing and writes it again.
+    """
+    aside = path.with_name(path.name + ".gc")
+    try:
+        os.replace(path, aside)
+    except FileNotFoundError:
+        return 0
+    st = aside.stat()
+    if st.st_mtime >= cutoff:
+        os.replace(aside, path)
+        return 0
+    aside.unlink()
+    return st.st_size
+
+def _stale_files(root: pathlib.Path, cutoff: float):
+    # two-level fan-out directories (ab/cd/<sha>), files untouched since `cutoff`
+    for d1 in os.scandir(root):
+        if not d1.is_dir():
+            continue
+        for d2 in os.scandir(d1.path):
+            if not d2.is_dir():
+                continue
+            for e in os.scandir(d2.path):
+                if e.is_file() and e.stat().st_mtime < cutoff:
+                    yield pathlib.Path(e.path)
+
+def collect_vault_chunks() -> dict:
+    """
+    Daily job: delete chunk files nothing references any more -- rows whose
+    ref_count fell to 0 once their objects were deleted, and files with no row
+    at all (ingests that failed after writing chunks) -- plus assembled copies
+    nobody downloaded within the grace period. Files touched within
+    CHUNK_GC_GRACE_HOURS are kept, since an ingest may be about to commit them.
+    """
+    cutoff = time.time() - CHUNK_GC_GRACE_HOURS * 3600
+    out = {"released": 0, "orphans": 0, "assembled": 0, "bytes": 0}
+    with get_engine().begin() as conn:
+        if not conn.execute(text("select pg_try_advisory_xact_lock(:k)"), {"k": 0x41544347}).scalar():
+            return {"skipped": "another worker is collecting chunks"}
+
+        for sha in conn.execute(text("select sha256 from vault_chunks where ref_count <= 0")).scalars().all():
+            path = _chunk_path(sha)
+            freed = _retire_file(path, cutoff)
+            if freed or not path.exists():
+                # the ref_count guard loses to an ingest that re-referenced it meanwhile
+                conn.execute(text("delete from vault_chunks where sha256 = :sha and ref_count <= 0"), {"sha": sha})
+                out["released"] += 1
+                out["bytes"] += freed
+
+        batch: list[pathlib.Path] = []
+
+        def _orphans():
+            known = set(conn.execute(text("select sha256 from vault_chunks where sha256 = any(:shas)"),
+                                     {"shas": [p.name for p in batch]}).scalars().all())
+            for p in batch:
+                if p.name not in known:
+                    freed = _retire_file(p, cutoff)
+                    out["orphans"] += bool(freed)
+                    out["bytes"] += freed
+            batch.clear()
+
+        for p in _stale_files(CHUNK_DIR, cutoff):
+            if p.suffix in (".part", ".gc"):
+                p.unlink(missing_ok=True)  # left behind by a crash mid-write / mid-GC
+                continue
+            batch.append(p)
+            if len(batch) >= 1000:
+                _orphans()
+        if batch:
+            _orphans()
+
+    for p in _stale_files(ASSEMBLED_DIR, cutoff):
+        out["assembled"] += 1
+        out["bytes"] += p.stat().st_size
+        p.unlink(missing_ok=True)
+    return out
+
+def _load_object_chunks(conn, object_id: str) -> list[tuple[str, int, int]]:
+    rows = conn.execute(text("""
+        select chunk_sha256, byte_offset, byte_size
+        from vault_object_chunks
+        where object_id = :oid::uuid
+        order by seq
+    """), {"oid": object_id}).fetchall()
+    return [(r.chunk_sha256, int(r.byte_offset), int(r.byte_size)) for r in rows]
+
+class _ChunkedFileResponse(Response):
+    """
+    A chunked object sent chunk file by chunk file, each read off the event
+    loop and sent as one body message (python serve mode).
+    """
+
+    def __init__(self, chunks: list[tuple[str, int, int]], *, byte_size: int, media_type: str, filename: str):
+        super().__init__(media_type=media_type, headers={
+            "Content-Disposition": _content_disposition(filename),
+            "Content-Length": str(byte_size),
+        })
+        self.chunks = chunks
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") == "HEAD" or not self.chunks:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        last = len(self.chunks) - 1
+        for i, (sha, _off, _size) in enumerate(self.chunks):
+            data = await run_in_threadpool(_chunk_path(sha).read_bytes)
+            await send({"type": "http.response.body", "body": data, "more_body": i < last})
+
+def _assemble_chunked(chunks: list[tuple[str, int, int]], sha256: str) -> pathlib.Path:
+    """Whole-file copy of a chunked object under ASSEMBLED_DIR, built on first use."""
+    path = ASSEMBLED_DIR / sha256[:2] / sha256[2:4] / sha256
+    try:
+        os.utime(path)  # served again: keep it past the next GC
+        return path
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{sha256}.{secrets.token_hex(4)}.part")
+    with tmp.open("wb") as out:
+        for sha, _off, _size in chunks:
+            with _chunk_path(sha).open("rb") as f:
+                shutil.copyfileobj(f, out, 1024 * 1024)
+    tmp.replace(path)
+    return path
+
+async def _chunked_response(chunks, *, sha256: str, byte_size: int, media_type: str, filename: str,
+                            mode: str | None = None) -> Response:
+    missing = [sha for sha, _o, _s in chunks if not _chunk_path(sha).exists()]
+    if missing:
+        raise HTTPException(status_code=500, detail=f"Stored chunks missing on server ({len(missing)})")
+    mode = mode or FILE_SERVE_MODE
+    if mode in ("accel", "xsendfile"):
+        # the proxy can only send whole files, so it gets an assembled copy
+        path = await run_in_threadpool(_assemble_chunked, chunks, sha256)
+        return _file_response(path, media_type=media_type, filename=filename, mode=mode)
+    return _ChunkedFileResponse(chunks, byte_size=byte_size, media_type=media_type, filename=filename)
+
+class _ChunkedObjectReader(io.RawIOBase):
+    """Seekable read-only view over a chunked object (zipfile needs seek/tell)."""
+
+    def __init__(self, chunks: list[tuple[str, int, int]]):
+        self._chunks = chunks
+        self._starts = [off for _sha, off, _size in chunks]
+        self._size = (chunks[-1][1] + chunks[-1][2]) if chunks else 0
+        self._pos = 0
+        self._cached: tuple[str | None, bytes] = (None, b"")
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, b):
+        if self._pos >= self._size:
+            return 0
+        idx = bisect.bisect_right(self._starts, self._pos) - 1
+        sha, start, size = self._chunks[idx]
+        if self._cached[0] != sha:
+            self._cached = (sha, _chunk_path(sha).read_bytes())
+        data = self._cached[1]
+        n = min(len(b), start + size - self._pos)
+        b[:n] = data[self._pos - start:self._pos - start + n]
+        self._pos += n
+        return n
+
+def _open_vault_object(storage: str, stored_path: str, chunks: list[tuple[str, int, int]]):
+    if storage == "chunked":
+        return io.BufferedReader(_ChunkedObjectReader(chunks), buffer_size=1024 * 1024)
+    return open(stored_path, "rb")
+
+def _read_zip_members(fileobj) -> list[dict]:
+    """Central directory only: zipfile seeks to the end record, nothing is extracted."""
+    try:
+        with zipfile.ZipFile(fileobj) as zf:
+            infos = zf.infolist()
+    except (zipfile.BadZipFile, OSError, ValueError):
+        return []
+    return [{
+        "path": i.filename,
+        "size": i.file_size,
+        "csize": i.compress_size,
+        "crc": i.CRC,
+        "ctype": i.compress_type,
+        "hoff": i.header_offset,
+        "mtime": datetime(*i.date_time) if i.date_time[0] >= 1980 else None,
+    } for i in infos if not i.is_dir()]
+
+def _index_members(storage: str, stored_path: str, chunks: list[tuple[str, int, int]]) -> list[dict]:
+    with _open_vault_object(storage, stored_path, chunks) as f:
+        return _read_zip_members(f)
+
+def _record_object_members(conn, object_id: str, members: list[dict]):
+    if members:
+        conn.execute(text("""
+            insert into vault_object_members
+              (object_id, member_path, byte_size, compressed_size, crc32, compress_type, header_offset, modified_at)
+            values
+              (:oid::uuid, :path, :size, :csize, :crc, :ctype, :hoff, :mtime)
+            on conflict (object_id, member_path) do nothing
+        """), [{"oid": object_id, **m} for m in members])
+    conn.execute(text("update vault_objects set members_indexed_at = now() where id = :oid::uuid"),
+                 {"oid": object_id})
+
+def _iter_zip_member(fileobj, member_path: str):
+    with fileobj, zipfile.ZipFile(fileobj) as zf, zf.open(member_path) as m:
+        while True:
+            data = m.read(1024 * 1024)
+            if not data:
+                break
+            yield data
+
+_ZIP_LOCAL_HEADER = struct.Struct("<4s22xHH")  # signature ... name length, extra length
+
+def _iter_zip_member_at(fileobj, header_offset: int, compressed_size: int, compress_type: int, crc32: int):
+    """
+    Stream one member straight from its local header (offset recorded at
+    ingest), without reading the central directory. Stored and deflated
+    members only; the caller falls back to _iter_zip_member for the rest.
+    """
+    with fileobj:
+        fileobj.seek(header_offset)
+        sig, name_len, extra_len = _ZIP_LOCAL_HEADER.unpack(fileobj.read(_ZIP_LOCAL_HEADER.size))
+        if sig != b"PK\x03\x04":
+            raise zipfile.BadZipFile(f"no local file header at offset {header_offset}")
+        fileobj.seek(name_len + extra_len, io.SEEK_CUR)
+        inflate = zlib.decompressobj(-15) if compress_type == zipfile.ZIP_DEFLATED else None
+        crc, left = 0, compressed_size
+        while left > 0:
+            raw = fileobj.read(min(left, 1024 * 1024))
+            if not raw:
+                raise zipfile.BadZipFile("truncated member")
+            left -= len(raw)
+            data = inflate.decompress(raw) if inflate else raw
+            crc = zlib.crc32(data, crc)
+            yield data
+        if inflate:
+            tail = inflate.flush()
+            crc = zlib.crc32(tail, crc)
+            if tail:
+                yield tail
+        if crc != crc32:
+            raise zipfile.BadZipFile("member CRC mismatch")
+
+def _require_uuid(value: str) -> str:
+    # ids reach SQL as ::uuid casts; a malformed one is simply not found
+    try:
+        return str(uuid.UUID(value))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Not found")
+
 @app.post("/api/vault/ingest")
 async def vault_ingest(
     request: Request,
@@ -944,17 +2354,7 @@ async def vault_ingest(
     stored_name = f"{source_key}_{ts}_{safe_name}"
     stored_path = VAULT_DIR / stored_name
 
-    size = 0
-    with stored_path.open("wb") as out:
-        while True:
-            chunk = await bundle.read(1024 * 1024)
-            if not chunk:
-                break
-            out.write(chunk)
-            size += len(chunk)
-
-    sha = sha256_file(stored_path)
-
+    # reject bad requests before any bytes (or chunks) hit the disk
     manifest = {}
     if manifest_json.strip():
         try:
@@ -968,16 +2368,47 @@ async def vault_ingest(
             text("select source_key from vault_sources where source_key=:k"),
             {"k": source_key},
         ).fetchone()
-        if not s:
-            raise HTTPException(status_code=400, detail="unknown source_key (add to vault_sources first)")
+    if not s:
+        raise HTTPException(status_code=400, detail="unknown source_key (add to vault_sources first)")
+
+    chunks: list[tuple[str, int, int]] = []
+    if VAULT_CHUNKING:
+        writer = _ChunkWriter()
+        while True:
+            chunk = await bundle.read(1024 * 1024)
+            if not chunk:
+                break
+            await run_in_threadpool(writer.feed, chunk)
+        sha = await run_in_threadpool(writer.finish)
+        size, new_bytes, chunks = writer.size, writer.new_bytes, writer.chunks
+        storage, stored_path_value = "chunked", ""
+    else:
+        size = 0
+        h = hashlib.sha256()
+        with stored_path.open("wb") as out:
+            while True:
+                chunk = await bundle.read(1024 * 1024)
+                if not chunk:
+                    break
+                out.write(chunk)
+                h.update(chunk)
+                size += len(chunk)
+        sha = h.hexdigest()
+        new_bytes = size
+        storage, stored_path_value = "file", str(stored_path)
+
+    members = await run_in_threadpool(_index_members, storage, stored_path_value, chunks)
 
+    with eng.begin() as conn:
         row = conn.execute(text("""
             insert into vault_objects
               (source_key, org_id, tenant_id, schema_version,
-               filename, content_type, byte_size, sha256, manifest_json, stored_path)
+               filename, content_type, byte_size, sha256, manifest_json, stored_path,
+               storage, stored_bytes)
             values
               (:source_key, :org_id, :tenant_id, :schema_version,
-               :filename, :content_type, :byte_size, :sha256, :manifest::jsonb, :stored_path)
+               :filename, :content_type, :byte_size, :sha256, :manifest::jsonb, :stored_path,
+               :storage, :stored_bytes)
             returning id
         """), {
             "source_key": source_key,
@@ -989,10 +2420,16 @@ async def vault_ingest(
             "byte_size": size,
             "sha256": sha,
             "manifest": json.dumps(manifest),
-            "stored_path": str(stored_path),
+            "stored_path": stored_path_value,
+            "storage": storage,
+            "stored_bytes": new_bytes,
         }).fetchone()
         object_id = str(row[0])
 
+        if chunks:
+            _record_object_chunks(conn, object_id, chunks)
+        _record_object_members(conn, object_id, members)
+
         conn.execute(text("""
             insert into vault_access_logs (object_id, actor_email, action, ip_address, user_agent)
             values (:oid::uuid, :actor, 'ingest', :ip, :ua)
@@ -1003,7 +2440,8 @@ async def vault_ingest(
             "ua": request.headers.get("user-agent", "")
         })
 
-    return {"ok": True, "object_id": object_id, "sha256": sha, "byte_size": size}
+    return {"ok": True, "object_id": object_id, "sha256": sha, "byte_size": size,
+            "storage": storage, "stored_bytes": new_bytes, "chunks": len(chunks), "members": len(members)}
 
 @app.get("/api/admin/vault/objects")
 async def list_vault_objects(
@@ -1012,17 +2450,17 @@ async def list_vault_objects(
     limit: int = Query(50, ge=1, le=200),
 ):
     actor = require_admin(request)
-    eng = get_engine()
-    with eng.begin() as conn:
+    with read_conn(request) as conn:
         rows = conn.execute(text("""
           select id, created_at, source_key, org_id, tenant_id, schema_version,
-                 filename, byte_size, sha256
+                 filename, byte_size, sha256, storage, stored_bytes
           from vault_objects
           where (:k='all' or source_key=:k)
           order by created_at desc
           limit :limit
         """), {"k": source_key, "limit": limit}).fetchall()
 
+    with get_engine().begin() as conn:
         conn.execute(text("""
           insert into vault_access_logs (object_id, actor_email, action, ip_address, user_agent)
           values (null, :actor, 'list_vault', :ip, :ua)
@@ -1037,10 +2475,11 @@ async def list_vault_objects(
 @app.get("/api/admin/vault/objects/{object_id}/download")
 async def download_vault_object(object_id: str, request: Request):
     actor = require_admin(request)
+    object_id = _require_uuid(object_id)
     eng = get_engine()
     with eng.begin() as conn:
         r = conn.execute(text("""
-          select id, filename, stored_path, content_type
+          select id, filename, stored_path, content_type, storage, byte_size, sha256
           from vault_objects
           where id = :id
         """), {"id": object_id}).fetchone()
@@ -1048,6 +2487,8 @@ async def download_vault_object(object_id: str, request: Request):
         if not r:
             raise HTTPException(status_code=404, detail="Not found")
 
+        chunks = _load_object_chunks(conn, object_id) if r.storage == "chunked" else []
+
         conn.execute(text("""
           insert into vault_access_logs (object_id, actor_email, action, ip_address, user_agent)
           values (:oid::uuid, :actor, 'download', :ip, :ua)
@@ -1058,11 +2499,627 @@ async def download_vault_object(object_id: str, request: Request):
             "ua": request.headers.get("user-agent", "")
         })
 
+    media_type = r.content_type or "application/octet-stream"
+    if r.storage == "chunked":
+        return await _chunked_response(chunks, sha256=r.sha256, byte_size=int(r.byte_size),
+                                       media_type=media_type, filename=r.filename)
+
     path = pathlib.Path(r.stored_path)
     if not path.exists():
         raise HTTPException(status_code=500, detail="Stored file missing on server")
 
-    return FileResponse(str(path), media_type=r.content_type or "application/octet-stream", filename=r.filename)
+    return _file_response(path, media_type=media_type, filename=r.filename)
+
+@app.get("/api/admin/vault/objects/{object_id}/members")
+async def list_vault_object_members(
+    object_id: str,
+    request: Request,
+    prefix: str = Query(""),
+    limit: int = Query(1000, ge=1, le=10000),
+):
+    require_admin(request)
+    object_id = _require_uuid(object_id)
+    with read_conn(request) as conn:
+        o = conn.execute(text("""
+          select id, members_indexed_at from vault_objects where id = :id::uuid
+        """), {"id": object_id}).fetchone()
+        if not o:
+            raise HTTPException(status_code=404, detail="Not found")
+        rows = conn.execute(text("""
+          select member_path, byte_size, compressed_size, crc32, compress_type, modified_at
+          from vault_object_members
+          where object_id = :id::uuid
+            and (:prefix = '' or left(member_path, length(:prefix)) = :prefix)
+          order by member_path
+          limit :limit
+        """), {"id": object_id, "prefix": prefix, "limit": limit}).fetchall()
+    return {
+        "ok": True,
+        "indexed_at": o.members_indexed_at,
+        "items": [dict(r._mapping) for r in rows],
+    }
+
+@app.get("/api/admin/vault/objects/{object_id}/members/download")
+async def download_vault_object_member(object_id: str, request: Request, path: str = Query(...)):
+    actor = require_admin(request)
+    object_id = _require_uuid(object_id)
+    eng = get_engine()
+    with eng.begin() as conn:
+        r = conn.execute(text("""
+          select o.stored_path, o.storage, m.member_path, m.byte_size,
+                 m.header_offset, m.compressed_size, m.compress_type, m.crc32
+          from vault_objects o
+          join vault_object_members m on m.object_id = o.id
+          where o.id = :id::uuid and m.member_path = :path
+        """), {"id": object_id, "path": path}).fetchone()
+
+        if not r:
+            raise HTTPException(status_code=404, detail="Not found")
+
+        chunks = _load_object_chunks(conn, object_id) if r.storage == "chunked" else []
+
+        conn.execute(text("""
+          insert into vault_access_logs (object_id, actor_email, action, ip_address, user_agent)
+          values (:oid::uuid, :actor, 'download_member', :ip, :ua)
+        """), {
+            "oid": object_id,
+            "actor": actor,
+            "ip": client_ip(request),
+            "ua": request.headers.get("user-agent", "")
+        })
+
+    if r.storage != "chunked" and not pathlib.Path(r.stored_path).exists():
+        raise HTTPException(status_code=500, detail="Stored file missing on server")
+
+    name = r.member_path.rsplit("/", 1)[-1] or "member"
+    f = _open_vault_object(r.storage, r.stored_path, chunks)
+    if r.header_offset is not None and r.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        body = _iter_zip_member_at(f, int(r.header_offset), int(r.compressed_size), r.compress_type, int(r.crc32))
+    else:
+        body = _iter_zip_member(f, r.member_path)
+    return StreamingResponse(
+        body,
+        media_type=mimetypes.guess_type(name)[0] or "application/octet-stream",
+        headers={
+            "Content-Disposition": _content_disposition(_safe_filename(name)),
+            "Content-Length": str(r.byte_size),
+        },
+    )
+
+@app.get("/api/admin/vault/dedup")
+async def vault_dedup_report(request: Request):
+    require_admin(request)
+    with read_conn(request) as conn:
+        rows = conn.execute(text("""
+          with logical as (
+            select source_key, count(*) as objects, sum(byte_size) as logical_bytes
+            from vault_objects
+            where storage = 'chunked'
+            group by source_key
+          ),
+          physical as (
+            select u.source_key, count(*) as unique_chunks, sum(c.byte_size) as unique_bytes
+            from (
+              select distinct o.source_key, oc.chunk_sha256
+              from vault_object_chunks oc
+              join vault_objects o on o.id = oc.object_id
+            ) u
+            join vault_chunks c on c.sha256 = u.chunk_sha256
+            group by u.source_key
+          )
+          select l.source_key, l.objects, l.logical_bytes,
+                 coalesce(p.unique_chunks, 0) as unique_chunks,
+                 coalesce(p.unique_bytes, 0) as unique_bytes
+          from logical l
+          left join physical p on p.source_key = l.source_key
+          order by l.source_key
+        """)).fetchall()
+
+    items = []
+    for r in rows:
+        logical, unique = int(r.logical_bytes or 0), int(r.unique_bytes or 0)
+        items.append({
+            "source_key": r.source_key,
+            "objects": int(r.objects),
+            "logical_bytes": logical,
+            "unique_chunks": int(r.unique_chunks),
+            "unique_bytes": unique,
+            "dedup_ratio": round(logical / unique, 3) if unique else None,
+        })
+    return {"ok": True, "items": items}
+
+
+# ----------------------------
+# Storage integrity scrubber
+# ----------------------------
+
+class _ByteRateLimiter:
+    """Paces reads across all scrub threads to `mbps` MB/s (0 disables)."""
+
+    def __init__(self, mbps: float):
+        self.rate = mbps * 1024 * 1024
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def consume(self, n: int):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + n / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+_SCRUB_TARGETS = {
+    # kind -> (table, select list)
+    "vault_object": ("vault_objects", "id, sha256, stored_path, storage"),
+    "document": ("atlas_documents", "id, sha256, stored_path, 'file' as storage"),
+}
+
+class _Scrubber:
+    """
+    Resumable: progress lives in last_verified_at, and each pass takes rows in
+    priority order (never verified first, then oldest verification), so a
+    restart simply continues. One worker per deployment holds a Postgres
+    advisory lock; the others stay idle.
+    """
+
+    LOCK_KEY = 0x41544C53  # "ATLS"
+    BATCH = 64
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.progress: dict[str, Any] = {"running": False}
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="atlas-scrubber", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self._locked_pass()
+            except Exception as e:
+                # a DB outage or an odd file must not end the thread; the next pass resumes
+                print(f"[scrubber] pass failed: {e}")
+                self.progress = {**self.progress, "running": False, "error": str(e)}
+            self._stop.wait(60)
+
+    def _locked_pass(self):
+        # session-level lock on an autocommit connection: held for the pass, never idle in transaction
+        with get_engine().connect() as lock_conn:
+            lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+            if not lock_conn.execute(text("select pg_try_advisory_lock(:k)"), {"k": self.LOCK_KEY}).scalar():
+                self.progress = {"running": False, "note": "another worker holds the scrub lock"}
+                return
+            try:
+                self.run_pass()
+            finally:
+                lock_conn.execute(text("select pg_advisory_unlock(:k)"), {"k": self.LOCK_KEY})
+
+    def run_pass(self):
+        eng = get_engine()
+        limiter = _ByteRateLimiter(SCRUB_MBPS)
+        self.progress = {
+            "running": True, "pass_started_at": utcnow().isoformat(),
+            "checked": 0, "bytes": 0, "ok": 0, "mismatch": 0, "missing": 0, "unreadable": 0,
+        }
+        with ThreadPoolExecutor(max_workers=max(1, SCRUB_THREADS), thread_name_prefix="atlas-scrub") as pool:
+            for kind, (table, cols) in _SCRUB_TARGETS.items():
+                while not self._stop.is_set():
+                    with eng.begin() as conn:
+                        rows = conn.execute(text(f"""
+                          select {cols}
+                          from {table}
+                          where last_verified_at is null
+                             or last_verified_at < now() - make_interval(secs => :secs)
+                          order by last_verified_at nulls first, created_at
+                          limit :n
+                        """), {"secs": SCRUB_INTERVAL_HOURS * 3600, "n": self.BATCH}).fetchall()
+                    if not rows:
+                        break
+                    results = list(pool.map(lambda r: self._verify(r, limiter), rows))
+                    self._record(kind, table, rows, results)
+        self.progress["running"] = False
+        self.progress["pass_finished_at"] = utcnow().isoformat()
+
+    def _verify(self, r, limiter: _ByteRateLimiter) -> tuple[str, str | None, int]:
+        h = hashlib.sha256()
+        n = 0
+        try:
+            if r.storage == "chunked":
+                with get_engine().begin() as conn:
+                    chunks = _load_object_chunks(conn, str(r.id))
+                f = _open_vault_object("chunked", "", chunks)
+            else:
+                f = open(r.stored_path, "rb")
+            with f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    limiter.consume(len(block))
+                    h.update(block)
+                    n += len(block)
+        except FileNotFoundError:
+            return "missing", None, n
+        except OSError as e:  # PermissionError, IsADirectoryError, EIO, ...
+            print(f"[scrubber] {r.id}: {e}")
+            return "unreadable", None, n
+        actual = h.hexdigest()
+        return ("ok" if actual == r.sha256 else "mismatch"), actual, n
+
+    def _record(self, kind: str, table: str, rows, results):
+        p = self.progress
+        with get_engine().begin() as conn:
+            for r, (status, actual, n) in zip(rows, results):
+                p["checked"] += 1
+                p["bytes"] += n
+                p[status] += 1
+                conn.execute(text(f"""
+                  update {table} set last_verified_at = now(), verify_status = :st where id = :id::uuid
+                """), {"st": status, "id": str(r.id)})
+                if status != "ok":
+                    conn.execute(text("""
+                      insert into storage_scrub_events (kind, row_id, status, expected_sha256, actual_sha256)
+                      values (:kind, :id::uuid, :st, :exp, :act)
+                    """), {"kind": kind, "id": str(r.id), "st": status, "exp": r.sha256, "act": actual})
+
+_SCRUBBER = _Scrubber()
+
+@app.get("/api/admin/storage/scrub")
+async def storage_scrub_status(request: Request):
+    require_admin(request)
+    metrics = {}
+    with read_conn(request) as conn:
+        for kind, (table, _cols) in _SCRUB_TARGETS.items():
+            r = conn.execute(text(f"""
+              select count(*) as total,
+                     count(*) filter (where last_verified_at is null) as never_verified,
+                     count(*) filter (where verify_status = 'ok') as ok,
+                     count(*) filter (where verify_status = 'mismatch') as mismatch,
+                     count(*) filter (where verify_status = 'missing') as missing,
+                     count(*) filter (where verify_status = 'unreadable') as unreadable,
+                     min(last_verified_at) as oldest_verified_at
+              from {table}
+            """)).fetchone()
+            metrics[kind] = dict(r._mapping)
+        events = conn.execute(text("""
+          select created_at, kind, row_id, status, expected_sha256, actual_sha256
+          from storage_scrub_events
+          order by created_at desc
+          limit 50
+        """)).fetchall()
+    return {
+        "ok": True,
+        "enabled": SCRUB_ENABLED,
+        "progress": _SCRUBBER.progress,
+        "metrics": metrics,
+        "recent_events": [dict(e._mapping) for e in events],
+    }
+
+
+# ----------------------------
+# Access log partitions, rollups, retention
+# ----------------------------
+
+_ACCESS_LOG_BASE_COLS = "id, created_at, object_id, actor_email, action, ip_address, user_agent"
+_ACCESS_LOG_COLS = _ACCESS_LOG_BASE_COLS + ", xid"
+_NULL_UUID = "00000000-0000-0000-0000-000000000000"
+_ROLLUP_LOCK = 0x41544C52
+_ACCESS_LOG_LOCK = 0x41544C4C  # partition layout changes: migration + daily maintenance
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+def _add_months(d: date, n: int) -> date:
+    y, m = divmod(d.month - 1 + n, 12)
+    return date(d.year + y, m + 1, 1)
+
+def _access_log_partition_name(month: date) -> str:
+    return f"vault_access_logs_{month:%Y%m}"
+
+def _ensure_access_log_partition(conn, month: date):
+    """Create + attach the partition for `month`, moving any rows the default partition caught."""
+    name = _access_log_partition_name(month)
+    if conn.execute(text("select to_regclass(:n)"), {"n": name}).scalar():
+        return
+    lo, hi = f"{month.isoformat()} 00:00:00+00", f"{_add_months(month, 1).isoformat()} 00:00:00+00"
+    conn.execute(text(f"create table {name} (like vault_access_logs including defaults)"))
+    conn.execute(text(f"""
+        with moved as (
+          delete from vault_access_logs_default
+          where created_at >= :lo and created_at < :hi
+          returning {_ACCESS_LOG_COLS}
+        )
+        insert into {name} ({_ACCESS_LOG_COLS}) select {_ACCESS_LOG_COLS} from moved
+    """), {"lo": lo, "hi": hi})
+    conn.execute(text(f"alter table vault_access_logs attach partition {name} for values from ('{lo}') to ('{hi}')"))
+
+def _migrate_access_logs(conn):
+    """One-time conversion of a pre-partitioning (plain) vault_access_logs, then default partition + indexes."""
+    # workers starting together would both see relkind 'r' and race the rename; the loser
+    # waits here until the winner commits, then finds the partitioned table
+    conn.execute(text("select pg_advisory_xact_lock(:k)"), {"k": _ACCESS_LOG_LOCK})
+    kind = conn.execute(text("select relkind from pg_class where relname = 'vault_access_logs'")).scalar()
+    if kind == "r":
+        conn.execute(text("alter table vault_access_logs rename to vault_access_logs_legacy"))
+        conn.execute(text("""
+            create table vault_access_logs (
+              id uuid not null default gen_random_uuid(),
+              created_at timestamptz not null default now(),
+              object_id uuid references vault_objects(id) on delete cascade,
+              actor_email text,
+              action text,
+              ip_address text,
+              user_agent text,
+              xid xid8 not null default pg_current_xact_id(),
+              primary key (id, created_at)
+            ) partition by range (created_at)
+        """))
+        conn.execute(text("create table vault_access_logs_default partition of vault_access_logs default"))
+        lo, hi = conn.execute(text("select min(created_at), max(created_at) from vault_access_logs_legacy")).fetchone()
+        if lo is not None:
+            m = _month_start(lo.astimezone(timezone.utc).date())
+            while m <= hi.astimezone(timezone.utc).date():
+                _ensure_access_log_partition(conn, m)
+                m = _add_months(m, 1)
+        conn.execute(text(f"""
+            insert into vault_access_logs ({_ACCESS_LOG_BASE_COLS})
+            select {_ACCESS_LOG_BASE_COLS} from vault_access_logs_legacy
+        """))
+        conn.execute(text("drop table vault_access_logs_legacy"))
+
+    conn.execute(text("create table if not exists vault_access_logs_default partition of vault_access_logs default"))
+    conn.execute(text("create index if not exists idx_vault_access_logs_created on vault_access_logs (created_at desc)"))
+    conn.execute(text("create index if not exists idx_vault_access_logs_object on vault_access_logs (object_id)"))
+    # partitioned tables from before rollups tracked transaction ids; existing rows get this
+    # transaction's id, and the first xid-based rollup skips them by created_at instead
+    conn.execute(text("""
+        alter table vault_access_logs add column if not exists xid xid8 not null default pg_current_xact_id()
+    """))
+    conn.execute(text("create index if not exists idx_vault_access_logs_xid on vault_access_logs (xid)"))
+
+def _rollup_access_logs(conn, wait: bool = True) -> datetime | None:
+    """
+    Add newly committed log rows into vault_access_log_daily. Progress is kept
+    as a transaction id, not a created_at time: created_at is when the
+    inserting transaction started, so one that commits late would land behind
+    a time-based mark. Every transaction below the snapshot's xmin has ended,
+    so rows with xid < xmin are final; each run counts [last xmin, xmin now).
+    Additive, so it can run as often as needed (daily job and analytics refresh
+    share it); the advisory lock keeps two workers from counting the same rows
+    twice, and with wait=False a busy lock just skips this run. Returns the
+    time of the last completed rollup.
+    """
+    if wait:
+        conn.execute(text("select pg_advisory_xact_lock(:k)"), {"k": _ROLLUP_LOCK})
+    elif not conn.execute(text("select pg_try_advisory_xact_lock(:k)"), {"k": _ROLLUP_LOCK}).scalar():
+        return None
+    st = conn.execute(text("""
+        select high_water, xid_high_water from atlas_rollup_state where name = 'access_log_daily'
+    """)).fetchone()
+    xmin = conn.execute(text("select pg_snapshot_xmin(pg_current_snapshot())::text::bigint")).scalar()
+    lo_xid = st.xid_high_water if st and st.xid_high_water is not None else 0
+    # state from the created_at-based rollup: rows before its mark are already counted
+    floor = st.high_water if st and st.xid_high_water is None else None
+    if lo_xid < xmin:
+        conn.execute(text(f"""
+            insert into vault_access_log_daily (day, actor_email, action, object_id, count)
+            select (created_at at time zone 'UTC')::date, coalesce(actor_email, ''), coalesce(action, ''),
+                   object_id, count(*)
+            from vault_access_logs
+            where xid >= (:lo)::text::xid8 and xid < (:hi)::text::xid8
+              and (cast(:floor as timestamptz) is null or created_at >= :floor)
+            group by 1, 2, 3, 4
+            on conflict (day, actor_email, action, coalesce(object_id, '{_NULL_UUID}'::uuid))
+            do update set count = vault_access_log_daily.count + excluded.count
+        """), {"lo": lo_xid, "hi": xmin, "floor": floor})
+    return conn.execute(text("""
+        insert into atlas_rollup_state (name, high_water, xid_high_water, updated_at)
+        values ('access_log_daily', now(), :xid, now())
+        on conflict (name) do update
+          set high_water = excluded.high_water, xid_high_water = excluded.xid_high_water, updated_at = now()
+        returning high_water
+    """), {"xid": xmin}).scalar()
+
+def maintain_access_logs() -> dict:
+    """
+    Daily job: pre-create upcoming monthly partitions, roll up finished days,
+    then detach/drop raw partitions past retention whose days are all rolled up.
+    Serialized across workers with a transaction-scoped advisory lock.
+    """
+    today = utcnow().date()
+    out: dict[str, Any] = {"created": [], "retired": []}
+    with get_engine().begin() as conn:
+        if not conn.execute(text("select pg_try_advisory_xact_lock(:k)"), {"k": _ACCESS_LOG_LOCK}).scalar():
+            return {"skipped": "another worker is maintaining access logs"}
+
+        for i in range(ACCESS_LOG_PREMAKE_MONTHS + 1):
+            m = _add_months(_month_start(today), i)
+            if not conn.execute(text("select to_regclass(:n)"), {"n": _access_log_partition_name(m)}).scalar():
+                _ensure_access_log_partition(conn, m)
+                out["created"].append(_access_log_partition_name(m))
+
+        hw = _rollup_access_logs(conn)
+        # a partition may only be retired once every day in it is fully rolled up (only
+        # transactions still open at `hw` are outstanding; retirement is months behind that)
+        rolled_through = hw.astimezone(timezone.utc).date() if hw else None
+        out["rolled_through"] = rolled_through.isoformat() if rolled_through else None
+
+        if ACCESS_LOG_RETENTION in ("detach", "drop") and rolled_through:
+            cutoff = _add_months(_month_start(today), -ACCESS_LOG_RETENTION_MONTHS)
+            parts = conn.execute(text("""
+                select c.relname
+                from pg_inherits i
+                join pg_class c on c.oid = i.inhrelid
+                join pg_class p on p.oid = i.inhparent
+                where p.relname = 'vault_access_logs' and c.relname ~ '^vault_access_logs_[0-9]{6}$'
+            """)).scalars().all()
+            for name in sorted(parts):
+                month = date(int(name[-6:-2]), int(name[-2:]), 1)
+                if month >= cutoff or _add_months(month, 1) > rolled_through:
+                    continue
+                conn.execute(text(f"alter table vault_access_logs detach partition {name}"))
+                if ACCESS_LOG_RETENTION == "drop":
+                    conn.execute(text(f"drop table {name}"))
+                out["retired"].append(name)
+    return out
+
+def _run_periodically(name: str, fn, every_s: float, stop: threading.Event):
+    def _loop():
+        while not stop.is_set():
+            try:
+                fn()
+            except Exception as e:
+                print(f"[{name}] failed: {e}")
+            stop.wait(every_s)
+    threading.Thread(target=_loop, name=f"atlas-{name}", daemon=True).start()
+
+_MAINTENANCE_STOP = threading.Event()
+
+
+# ----------------------------
+# Admin: access-log analytics (served from vault_access_log_daily)
+# ----------------------------
+
+_analytics_lock = threading.Lock()
+_analytics_refreshed_at = 0.0
+
+def _refresh_access_analytics():
+    # runs in the threadpool; a refresh already underway here or in another worker
+    # (the daily job) is not waited for, the request just reads the current aggregates
+    global _analytics_refreshed_at
+    if time.monotonic() - _analytics_refreshed_at < ANALYTICS_REFRESH_S:
+        return
+    if not _analytics_lock.acquire(blocking=False):
+        return
+    try:
+        with get_engine().begin() as conn:
+            if _rollup_access_logs(conn, wait=False) is not None:
+                _analytics_refreshed_at = time.monotonic()
+    finally:
+        _analytics_lock.release()
+
+def _analytics_range(start: str, end: str) -> tuple[date, date]:
+    try:
+        d_end = date.fromisoformat(end) if end else utcnow().date()
+        d_start = date.fromisoformat(start) if start else d_end - timedelta(days=30)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start/end must be YYYY-MM-DD")
+    if d_start > d_end:
+        raise HTTPException(status_code=400, detail="start must be <= end")
+    return d_start, d_end
+
+def _analytics_query_sync(sql: str, params: dict) -> list[dict]:
+    _refresh_access_analytics()
+    with get_engine().begin() as conn:
+        rows = conn.execute(text(sql), params).fetchall()
+    return [dict(r._mapping) for r in rows]
+
+async def _analytics_query(sql: str, params: dict) -> list[dict]:
+    return await run_in_threadpool(_analytics_query_sync, sql, params)
+
+@app.get("/api/admin/analytics/actors")
+async def analytics_actors(
+    request: Request,
+    start: str = Query(""),
+    end: str = Query(""),
+    action: str = Query("all"),
+):
+    require_admin(request)
+    d0, d1 = _analytics_range(start, end)
+    items = await _analytics_query("""
+        select actor_email, action, sum(count)::bigint as count, min(day) as first_day, max(day) as last_day
+        from vault_access_log_daily
+        where day between :d0 and :d1 and (:action = 'all' or action = :action)
+        group by actor_email, action
+        order by actor_email, count desc
+    """, {"d0": d0, "d1": d1, "action": action})
+    return {"ok": True, "start": d0, "end": d1, "items": items}
+
+@app.get("/api/admin/analytics/objects")
+async def analytics_objects(
+    request: Request,
+    start: str = Query(""),
+    end: str = Query(""),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    require_admin(request)
+    d0, d1 = _analytics_range(start, end)
+    items = await _analytics_query("""
+        with per_action as (
+          select object_id, action, sum(count) as n
+          from vault_access_log_daily
+          where day between :d0 and :d1 and object_id is not null
+          group by object_id, action
+        ), per_actor as (
+          select object_id, count(distinct actor_email) as actors
+          from vault_access_log_daily
+          where day between :d0 and :d1 and object_id is not null
+          group by object_id
+        )
+        select p.object_id, o.filename, o.source_key,
+               sum(p.n)::bigint as events, a.actors,
+               jsonb_object_agg(p.action, p.n) as by_action
+        from per_action p
+        join per_actor a on a.object_id = p.object_id
+        left join vault_objects o on o.id = p.object_id
+        group by p.object_id, o.filename, o.source_key, a.actors
+        order by events desc
+        limit :limit
+    """, {"d0": d0, "d1": d1, "limit": limit})
+    return {"ok": True, "start": d0, "end": d1, "items": items}
+
+@app.get("/api/admin/analytics/timeseries")
+async def analytics_timeseries(
+    request: Request,
+    start: str = Query(""),
+    end: str = Query(""),
+    action: str = Query("all"),
+    actor: str = Query(""),
+):
+    require_admin(request)
+    d0, d1 = _analytics_range(start, end)
+    items = await _analytics_query("""
+        select day, action, sum(count)::bigint as count
+        from vault_access_log_daily
+        where day between :d0 and :d1
+          and (:action = 'all' or action = :action)
+          and (:actor = '' or actor_email = :actor)
+        group by day, action
+        order by day, action
+    """, {"d0": d0, "d1": d1, "action": action, "actor": actor.lower().strip()})
+    return {"ok": True, "start": d0, "end": d1, "items": items}
+
+@app.get("/api/admin/analytics/top-downloads")
+async def analytics_top_downloads(
+    request: Request,
+    start: str = Query(""),
+    end: str = Query(""),
+    limit: int = Query(20, ge=1, le=200),
+):
+    require_admin(request)
+    d0, d1 = _analytics_range(start, end)
+    items = await _analytics_query("""
+        select d.object_id, o.filename, o.source_key, o.byte_size,
+               sum(d.count)::bigint as downloads,
+               count(distinct d.actor_email) as actors
+        from vault_access_log_daily d
+        left join vault_objects o on o.id = d.object_id
+        where d.day between :d0 and :d1
+          and d.action in ('download', 'download_member')
+          and d.object_id is not null
+        group by d.object_id, o.filename, o.source_key, o.byte_size
+        order by downloads desc
+        limit :limit
+    """, {"d0": d0, "d1": d1, "limit": limit})
+    return {"ok": True, "start": d0, "end": d1, "items": items}
 
 
 # ----------------------------
@@ -1091,8 +3148,7 @@ async def create_owner(payload: Dict[str, Any], request: Request):
 @app.get("/api/admin/owners")
 async def list_owners(request: Request, limit: int = Query(50, ge=1, le=200)):
     require_admin(request)
-    eng = get_engine()
-    with eng.begin() as conn:
+    with read_conn(request) as conn:
         rows = conn.execute(text("""
           select id, created_at, legal_name, entity_type, jurisdiction, email
           from ip_owners
@@ -1133,8 +3189,7 @@ async def create_asset(payload: Dict[str, Any], request: Request):
 @app.get("/api/admin/assets")
 async def list_assets(request: Request, limit: int = Query(50, ge=1, le=200)):
     require_admin(request)
-    eng = get_engine()
-    with eng.begin() as conn:
+    with read_conn(request) as conn:
         rows = conn.execute(text("""
           select a.id, a.created_at, a.title, a.asset_type, a.status, a.reg_no,
                  o.legal_name as owner_name
@@ -1152,8 +3207,7 @@ async def list_assets(request: Request, limit: int = Query(50, ge=1, le=200)):
 @app.get("/api/owner/docs")
 async def owner_docs(request: Request, limit: int = Query(200, ge=1, le=500)):
     owner_id = require_owner(request)
-    eng = get_engine()
-    with eng.begin() as conn:
+    with read_conn(request) as conn:
         rows = conn.execute(text("""
           select id, created_at, doc_type, doc_version, filename, sha256
           from atlas_documents
@@ -1166,8 +3220,7 @@ async def owner_docs(request: Request, limit: int = Query(200, ge=1, le=500)):
 @app.get("/api/owner/docs/{doc_id}/download")
 async def owner_doc_download(doc_id: str, request: Request):
     owner_id = require_owner(request)
-    eng = get_engine()
-    with eng.begin() as conn:
+    with read_conn(request) as conn:
         r = conn.execute(text("""
           select id, owner_id, filename, stored_path
           from atlas_documents
@@ -1178,13 +3231,12 @@ async def owner_doc_download(doc_id: str, request: Request):
     path = pathlib.Path(r.stored_path)
     if not path.exists():
         raise HTTPException(status_code=500, detail="Stored file missing on server")
-    return FileResponse(str(path), media_type="application/pdf", filename=r.filename)
+    return _file_response(path, media_type="application/pdf", filename=r.filename)
 
 @app.get("/api/admin/docs")
 async def admin_docs(request: Request, owner_id: str = Query(""), limit: int = Query(200, ge=1, le=500)):
     require_admin(request)
-    eng = get_engine()
-    with eng.begin() as conn:
+    with read_conn(request) as conn:
         if owner_id.strip():
             rows = conn.execute(text("""
               select d.id, d.created_at, d.doc_type, d.doc_version, d.filename, d.sha256,
@@ -1221,8 +3273,399 @@ async def admin_doc_download(doc_id: str, request: Request):
     path = pathlib.Path(r.stored_path)
     if not path.exists():
         raise HTTPException(status_code=500, detail="Stored file missing on server")
-    return FileResponse(str(path), media_type="application/pdf", filename=r.filename)
+    return _file_response(path, media_type="application/pdf", filename=r.filename)
+
+# ----------------------------
+# Admin: live activity stream (SSE fed by LISTEN/NOTIFY)
+# ----------------------------
+
+ACTIVITY_CHANNEL = "atlas_activity"
+
+# table -> (event name, trigger timing/condition, columns copied into the event)
+_ACTIVITY_TRIGGERS = {
+    "atlas_onboarding_submissions": ("onboarding", [
+        ("insert", ""),
+        ("update", "when (old.status is distinct from new.status or old.claimed_by is distinct from new.claimed_by"
+                   " or old.claimed_until is distinct from new.claimed_until)"),
+    ], ["id", "created_at", "status", "owner_email", "owner_name", "ip_assets_count", "claimed_by", "claimed_until"]),
+    "vault_objects": ("vault_object", [("insert", "")],
+        ["id", "created_at", "source_key", "org_id", "tenant_id", "schema_version",
+         "filename", "byte_size", "sha256", "storage", "stored_bytes"]),
+    "atlas_documents": ("document", [("insert", "")],
+        ["id", "created_at", "doc_type", "doc_version", "filename", "sha256", "owner_id"]),
+}
+
+def _install_activity_triggers(conn):
+    """Row triggers that pg_notify a list-sized JSON row; kept out of DDL (plpgsql bodies contain ';')."""
+    conn.execute(text(f"""
+        create or replace function atlas_notify_activity() returns trigger language plpgsql as $fn$
+        declare
+          r jsonb;
+        begin
+          select coalesce(jsonb_object_agg(key, value), '{{}}'::jsonb) into r
+          from jsonb_each(to_jsonb(new)) where key = any(tg_argv[1:]);
+          if tg_table_name = 'atlas_documents' then
+            r := r || coalesce((select jsonb_build_object('owner_name', o.legal_name, 'owner_email', o.email)
+                                from ip_owners o where o.id = new.owner_id), '{{}}'::jsonb);
+          end if;
+          perform pg_notify('{ACTIVITY_CHANNEL}', jsonb_build_object('event', tg_argv[0], 'op', lower(tg_op), 'row', r)::text);
+          return null;
+        end
+        $fn$
+    """))
+    for table, (event, ops, cols) in _ACTIVITY_TRIGGERS.items():
+        args = ", ".join(f"'{x}'" for x in [event, *cols])
+        for op, when in ops:
+            name = f"trg_{table}_activity_{op}"
+            conn.execute(text(f"drop trigger if exists {name} on {table}"))
+            conn.execute(text(f"""
+                create trigger {name} after {op} on {table}
+                for each row {when} execute function atlas_notify_activity({args})
+            """))
+
+class _ActivityHub:
+    """
+    One LISTEN connection per worker, fanned out to every open SSE stream.
+    The listener starts with the first subscriber. After a reconnect (or a
+    subscriber falling behind) clients get a 'resync' event, because
+    notifications sent while nobody was listening are gone.
+    """
+
+    def __init__(self, queue_max: int = 1000):
+        self.queue_max = queue_max
+        self._subs: set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def subscribe(self) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue(maxsize=self.queue_max)
+        with self._lock:
+            self._subs.add((asyncio.get_running_loop(), q))
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._listen, name="atlas-activity", daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue):
+        with self._lock:
+            self._subs = {s for s in self._subs if s[1] is not q}
+
+    def stop(self):
+        self._stop.set()
+
+    @staticmethod
+    def _offer(q: asyncio.Queue, msg: str):
+        try:
+            q.put_nowait(msg)
+        except asyncio.QueueFull:
+            while not q.empty():
+                q.get_nowait()
+            q.put_nowait(json.dumps({"event": "resync"}))
+
+    def _publish(self, msg: str):
+        with self._lock:
+            subs = list(self._subs)
+        for loop, q in subs:
+            loop.call_soon_threadsafe(self._offer, q, msg)
+
+    def _listen(self):
+        backoff = 1.0
+        first = True
+        while not self._stop.is_set():
+            raw = None
+            try:
+                raw = get_engine().raw_connection()
+                raw.detach()  # long-lived; keep it out of the pool
+                dbapi = raw.dbapi_connection
+                dbapi.autocommit = True
+                with dbapi.cursor() as cur:
+                    cur.execute(f"listen {ACTIVITY_CHANNEL}")
+                if not first:
+                    self._publish(json.dumps({"event": "resync"}))
+                first, backoff = False, 1.0
+                while not self._stop.is_set():
+                    if select.select([dbapi], [], [], 5.0)[0]:
+                        dbapi.poll()
+                        while dbapi.notifies:
+                            self._publish(dbapi.notifies.pop(0).payload)
+                    with self._lock:
+                        if not self._subs:
+                            self._thread = None
+                            return
+            except Exception as e:
+                print(f"[activity] listener error: {e}; reconnecting in {backoff:.0f}s")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+
+_ACTIVITY = _ActivityHub()
+
+@app.get("/api/admin/events")
+async def admin_events(request: Request):
+    require_admin(request)
+    q = _ACTIVITY.subscribe()
+
+    async def _stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    msg = await asyncio.wait_for(q.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"  # keeps proxies from timing the stream out
+                    continue
+                event = json.loads(msg).get("event", "message")
+                yield f"event: {event}\ndata: {msg}\n\n"
+        finally:
+            _ACTIVITY.unsubscribe(q)
+
+    return StreamingResponse(_stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
 
 @app.get("/health")
 async def health():
     return {"ok": True, "service": "atlas", "time": utcnow().isoformat()}
+
+@app.get("/api/admin/db/replicas")
+async def replica_status(request: Request):
+    require_admin(request)
+    return {"ok": True, "max_lag_s": REPLICA_MAX_LAG_S, "replicas": _REPLICAS.status()}
+
+_PHASES.append(("routes", (time.perf_counter() - _t_routes) * 1000.0))
+
+
+# ----------------------------
+# CLI: python atlas_backend.py <command>
+# ----------------------------
+
+def _bench_serve(size_mb: int = 256, rounds: int = 3):
+    """
+    Worker-side cost of each serving mode: MB/s and CPU seconds spent in this
+    process to push one file through the ASGI response into /dev/null.
+    """
+    import anyio, tempfile
+
+    VAULT_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = pathlib.Path(tempfile.mkdtemp(dir=str(VAULT_DIR)))  # under VAULT_DIR so accel mode applies
+    src = tmp / "bench.bin"
+    with src.open("wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+
+    sink = os.open(os.devnull, os.O_WRONLY)
+
+    async def _drain(resp):
+        scope = {"type": "http", "method": "GET", "headers": []}
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(msg):
+            if msg["type"] == "http.response.body" and msg.get("body"):
+                os.write(sink, msg["body"])
+
+        await resp(scope, receive, send)
+
+    cases = [
+        ("fileresponse-64k", lambda: FileResponse(str(src), filename=src.name)),
+        ("python-1m",       lambda: _file_response(src, media_type="application/octet-stream", filename=src.name, mode="python")),
+        ("accel",           lambda: _file_response(src, media_type="application/octet-stream", filename=src.name, mode="accel")),
+        ("xsendfile",       lambda: _file_response(src, media_type="application/octet-stream", filename=src.name, mode="xsendfile")),
+    ]
+    print(f"bench-serve: {size_mb} MB x {rounds} rounds")
+    print(f"{'mode':<16} {'MB/s':>10} {'cpu_s':>8}")
+    try:
+        for name, make in cases:
+            wall = cpu = 0.0
+            for _ in range(rounds):
+                t, c = time.perf_counter(), time.process_time()
+                anyio.run(_drain, make())
+                wall += time.perf_counter() - t
+                cpu += time.process_time() - c
+            if name in ("accel", "xsendfile"):
+                # worker emits headers only; the proxy moves the bytes
+                print(f"{name:<16} {'proxy':>10} {cpu / rounds:>8.3f}")
+            else:
+                print(f"{name:<16} {(size_mb * rounds) / wall:>10.1f} {cpu / rounds:>8.3f}")
+    finally:
+        os.close(sink)
+        src.unlink(missing_ok=True)
+        tmp.rmdir()
+
+def _bench_onboarding(rows: int = 1_000_000, updates: int = 10_000):
+    """
+    Old (payloads inline) vs split layout at `rows` submissions, in a scratch
+    schema: the admin list query, a full status scan and `updates` random
+    status updates, with buffers touched from EXPLAIN (ANALYZE, BUFFERS).
+    """
+    schema = f"atlas_bench_{secrets.token_hex(4)}"
+    cols = list(_ONBOARDING_PAYLOAD_FIELDS.values())
+
+    def _payload(key: str) -> str:
+        return ", ".join(
+            f"jsonb_build_object('section', '{c}', 'text', repeat(md5({key} || '{c}'), 6))" for c in cols
+        )
+
+    narrow = """id uuid primary key default gen_random_uuid(), created_at timestamptz not null,
+        status text not null, owner_email text, owner_name text,
+        ip_assets_count int not null default 0, notes text"""
+    seed = """now() - make_interval(secs => g), (array['submitted','needs_more','approved','rejected'])[1 + g % 4],
+        'owner' || g || '@example.com', 'Owner ' || g, g % 5"""
+    narrow_cols = "created_at, status, owner_email, owner_name, ip_assets_count"
+
+    def _plan(conn, sql):
+        plan = conn.execute(text(f"explain (analyze, buffers, format json) {sql}")).scalar()[0]
+        top = plan["Plan"]
+        return plan["Execution Time"], top.get("Shared Hit Blocks", 0) + top.get("Shared Read Blocks", 0)
+
+    eng = get_engine()
+    results = {}
+    try:
+        with eng.begin() as conn:
+            conn.execute(text(f"create schema {schema}"))
+        for layout in ("inline", "split"):
+            t = f"{schema}.sub_{layout}"
+            with eng.begin() as conn:
+                if layout == "inline":
+                    conn.execute(text(f"create table {t} ({narrow}, {', '.join(c + ' jsonb' for c in cols)})"))
+                    conn.execute(text(f"""
+                        insert into {t} ({narrow_cols}, {', '.join(cols)})
+                        select {seed}, {_payload('g::text')} from generate_series(1, :n) g
+                    """), {"n": rows})
+                else:
+                    conn.execute(text(f"create table {t} ({narrow}) with (fillfactor = 85)"))
+                    conn.execute(text(f"""
+                        insert into {t} ({narrow_cols}) select {seed} from generate_series(1, :n) g
+                    """), {"n": rows})
+                    conn.execute(text(f"create table {schema}.payloads (submission_id uuid primary key, {', '.join(c + ' jsonb' for c in cols)})"))
+                    conn.execute(text(f"""
+                        insert into {schema}.payloads (submission_id, {', '.join(cols)})
+                        select id, {_payload('id::text')} from {t}
+                    """))
+                conn.execute(text(f"create index on {t} (created_at desc)"))
+            with eng.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(f"vacuum analyze {t}"))
+            with eng.begin() as conn:
+                size = conn.execute(text("select pg_relation_size(:t)"), {"t": t}).scalar()
+                list_ms, list_buf = _plan(conn, f"""
+                    select id, created_at, status, owner_email, owner_name, ip_assets_count
+                    from {t} where status = 'submitted' order by created_at desc limit 50""")
+                scan_ms, scan_buf = _plan(conn, f"select status, count(*) from {t} group by status")
+                ids = [r[0] for r in conn.execute(text(f"select id from {t} order by random() limit :n"), {"n": updates})]
+            t0 = time.perf_counter()
+            with eng.begin() as conn:
+                for oid in ids:
+                    conn.execute(text(f"update {t} set status = 'needs_more', notes = 'bench' where id = :id"), {"id": oid})
+                upd_s = time.perf_counter() - t0
+                hot = conn.execute(text("""
+                    select n_tup_hot_upd from pg_stat_xact_user_tables where schemaname = :s and relname = :r
+                """), {"s": schema, "r": f"sub_{layout}"}).scalar() or 0
+            results[layout] = {
+                "heap_mb": round(size / 2**20, 1),
+                "list_ms": round(list_ms, 2), "list_buffers": list_buf,
+                "scan_ms": round(scan_ms, 1), "scan_buffers": scan_buf,
+                "updates_per_s": round(updates / upd_s), "hot_updates": hot,
+            }
+            print(f"[bench-onboarding] {layout}: {results[layout]}")
+    finally:
+        with eng.begin() as conn:
+            conn.execute(text(f"drop schema if exists {schema} cascade"))
+    return results
+
+def _backfill_docs():
+    """Executed PDFs for approved submissions that have no atlas_documents rows (renders reuse the cache)."""
+    eng = get_engine()
+    with eng.begin() as conn:
+        subs = conn.execute(text(f"""
+          select s.id, s.owner_name, s.owner_email, s.approved_owner_id, s.approved_at, {_ONBOARDING_PAYLOAD_COLS}
+          from atlas_onboarding_submissions s
+          left join atlas_onboarding_payloads p on p.submission_id = s.id
+          where s.status = 'approved' and s.approved_owner_id is not null and s.approved_at is not null
+            and not exists (select 1 from atlas_documents d where d.onboarding_id = s.id)
+          order by s.approved_at
+        """)).fetchall()
+    for sub in subs:
+        with eng.begin() as conn:
+            types = _generate_executed_docs(
+                conn,
+                owner_id=str(sub.approved_owner_id),
+                onboarding_id=str(sub.id),
+                owner_name=sub.owner_name,
+                owner_email=sub.owner_email,
+                payloads={k: getattr(sub, col) for k, col in _ONBOARDING_PAYLOAD_FIELDS.items()},
+                executed_at=sub.approved_at,
+            )
+        print(f"[docs] {sub.id}: {', '.join(types)}")
+    print(f"[docs] backfilled {len(subs)} submissions")
+
+def _backfill_members(batch: int = 100):
+    """Index zip members for vault objects stored before the member index existed."""
+    eng = get_engine()
+    done = 0
+    while True:
+        with eng.begin() as conn:
+            rows = conn.execute(text("""
+              select id, storage, stored_path
+              from vault_objects
+              where members_indexed_at is null
+              order by created_at
+              limit :n
+            """), {"n": batch}).fetchall()
+        if not rows:
+            break
+        for r in rows:
+            oid = str(r.id)
+            with eng.begin() as conn:
+                chunks = _load_object_chunks(conn, oid) if r.storage == "chunked" else []
+                try:
+                    members = _index_members(r.storage, r.stored_path, chunks)
+                except FileNotFoundError:
+                    members = []
+                _record_object_members(conn, oid, members)
+            done += 1
+            print(f"[members] {oid}: {len(members)} members")
+    print(f"[members] indexed {done} objects")
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="atlas_backend")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("bench-serve", help="compare file serving modes (MB/s, worker CPU)")
+    b.add_argument("--size-mb", type=int, default=256)
+    b.add_argument("--rounds", type=int, default=3)
+    m = sub.add_parser("index-members", help="backfill the zip member index for existing vault objects")
+    m.add_argument("--batch", type=int, default=100)
+    sub.add_parser("scrub", help="run one integrity scrub pass now")
+    sub.add_parser("maintain-access-logs", help="create partitions, build rollups, apply retention")
+    sub.add_parser("backfill-docs", help="render executed PDFs for approved submissions that have none")
+    sub.add_parser("build-static", help="fingerprint + precompress static/ into ATLAS_STATIC_DIST")
+    o = sub.add_parser("bench-onboarding", help="inline vs split onboarding payloads: list scans and status updates")
+    o.add_argument("--rows", type=int, default=1_000_000)
+    o.add_argument("--updates", type=int, default=10_000)
+    args = ap.parse_args()
+
+    if args.cmd == "bench-serve":
+        _bench_serve(args.size_mb, args.rounds)
+    elif args.cmd == "index-members":
+        _backfill_members(args.batch)
+    elif args.cmd == "scrub":
+        _SCRUBBER.run_pass()
+        print(json.dumps(_SCRUBBER.progress, indent=2))
+    elif args.cmd == "maintain-access-logs":
+        print(json.dumps(maintain_access_logs(), indent=2))
+    elif args.cmd == "backfill-docs":
+        _backfill_docs()
+    elif args.cmd == "build-static":
+        print(json.dumps(build_static(), indent=2))
+    elif args.cmd == "bench-onboarding":
+        print(json.dumps(_bench_onboarding(args.rows, args.updates), indent=2))
@@ -1,10 +1,13 @@
 # qbo_harvester.py
-import os, json, csv, pathlib, webbrowser, base64
+import os, sys, json, csv, pathlib, webbrowser, base64, time, threading, random, hashlib, atexit
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+import queue
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from urllib.parse import urlencode, urlparse, parse_qs
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta, timezone
 import requests
-import difflib, re, secrets
+from requests.adapters import HTTPAdapter
+import difflib, re, secrets, itertools, sqlite3
 from dotenv import load_dotenv
 
 # Load .env and ensure keys
@@ -56,6 +59,23 @@ MAPPING_CSV_PATH = OUT_DIR / "material_map.csv"
 UNMAPPED_LOG     = OUT_DIR / "unmapped_materials.csv"
 NONMETAL_MAP_PATH = OUT_DIR / "nonmetal_map.csv"
 NONMETAL_OUT_PATH = OUT_DIR / "nonmetal_items.csv"
+STATE_PATH        = OUT_DIR / "harvest_state.sqlite"
+CUSTOMERS_CSV_PATH = OUT_DIR / "customers.csv"
+NORM_CACHE_PATH   = OUT_DIR / "normalize_cache.sqlite"
+NORM_CACHE_ON     = os.getenv("QBO_NORM_CACHE", "1").lower() in ("1","true","yes")
+NORM_LRU_SIZE     = int(os.getenv("QBO_NORM_LRU_SIZE", "50000"))
+BRIDGE_RETRY_PATH = OUT_DIR / "bridge_retry.ndjson"  # failed posts, replayed on the next run
+
+# Incremental harvesting: only invoices changed since the stored watermark are
+# re-read. QBO_FULL_RESYNC=1 (or --full-resync) ignores the state and rebuilds.
+FULL_RESYNC  = os.getenv("QBO_FULL_RESYNC", "0").lower() in ("1","true","yes")
+CDC_MAX_DAYS = 30  # QBO ChangeDataCapture only looks back 30 days
+
+# ===== Invoice PDF download stage =====
+# QBO throttles per realm (500 req/min, 10 concurrent); stay under both.
+PDF_WORKERS      = int(os.getenv("QBO_PDF_WORKERS", "8"))
+QBO_RATE_PER_SEC = float(os.getenv("QBO_RATE_PER_SEC", "7"))
+PDF_MAX_ATTEMPTS = int(os.getenv("QBO_PDF_MAX_ATTEMPTS", "4"))
 
 
 # ===== QuickBooks OAuth/API (.env) =====
@@ -80,6 +100,12 @@ BRIDGE_USER        = os.getenv("BRIDGE_USER")
 BRIDGE_PASS        = os.getenv("BRIDGE_PASS")
 BRIDGE_SELLER      = os.getenv("BRIDGE_SELLER", "Winski Brothers")
 POST_TO_BRIDGE     = os.getenv("POST_TO_BRIDGE", "true").lower() in ("1","true","yes")
+# "rows": one POST /contracts per new/changed line (pooled, concurrent); "bulk": the same lines in NDJSON batches
+BRIDGE_POST_MODE     = os.getenv("BRIDGE_POST_MODE", "rows").lower()
+BRIDGE_POST_WORKERS  = int(os.getenv("BRIDGE_POST_WORKERS", "4"))
+BRIDGE_MAX_ATTEMPTS  = int(os.getenv("BRIDGE_MAX_ATTEMPTS", "5"))
+BRIDGE_BULK_PATH     = os.getenv("BRIDGE_BULK_PATH", "/contracts/bulk")
+BRIDGE_BULK_BATCH    = int(os.getenv("BRIDGE_BULK_BATCH", "500"))
 
 ENV = os.getenv("ENV", "production").lower()
 HARVESTER_DISABLED = os.getenv("HARVESTER_DISABLED", "0") == "1"
@@ -556,7 +582,8 @@ def _preclean_source(s: str) -> str:
         return s
     return NONFE_RX.sub("", s).strip()
 
-def _is_nonmetal_hit(source_name: str, customer_name: str | None) -> bool:
+def _is_nonmetal_hit_reference(source_name: str, customer_name: str | None) -> bool:
+    # rule-by-rule scan; kept as the oracle for _MaterialMatcher (--check-matcher)
     if not source_name:
         return False
     s_raw = _preclean_source(source_name.strip())
@@ -648,16 +675,109 @@ NONMETAL_GLOBAL, NONMETAL_BY_CUST, NONMETAL_PATTERNS, NONMETAL_IGNORE_EXACT, NON
 ])
 
 
-def _log_unmapped(src, customer):
-    try:
-        write_header = not UNMAPPED_LOG.exists()
-        with open(UNMAPPED_LOG, "a", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            if write_header:
-                w.writerow(["source","customer","suggested"])
-            w.writerow([src, customer or "", ""])
-    except Exception:
-        pass
+class _UnmappedLog:
+    """
+    Aggregates unmapped terms in memory, one entry per (source, customer), and
+    merges them into UNMAPPED_LOG on flush(): counts add up, first_* is kept,
+    last_* moves forward, and any hand-filled `suggested` value survives.
+    `count` is the number of invoice harvests the term turned up in: repeated
+    lines of one invoice count once, but an invoice that changes and is
+    harvested again counts again. Older files (plain source,customer,suggested
+    rows, one per hit) fold in as count 1 per row. Flushed at the end of
+    main(), every `flush_every_s`, and at exit; a failed flush keeps its terms
+    for the next one.
+    """
+    HEADERS = ["source","customer","suggested","count","first_invoice","last_invoice","first_seen","last_seen"]
+
+    def __init__(self, path: pathlib.Path, flush_every_s: float = 60.0):
+        self.path = path
+        self.flush_every_s = flush_every_s
+        self.pending = {}  # (source, customer) -> [count, first_invoice, last_invoice]
+        self._counted = set()  # (source, customer, invoice) already counted this run
+        self.new_terms = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, src, customer, invoice=None):
+        key = (src, customer or "")
+        inv = "" if invoice is None else str(invoice)
+        with self._lock:
+            if inv:
+                if key + (inv,) in self._counted:
+                    return
+                self._counted.add(key + (inv,))
+            e = self.pending.get(key)
+            if e is None:
+                self.pending[key] = [1, inv, inv]
+            else:
+                e[0] += 1
+                if inv:
+                    e[1] = e[1] or inv
+                    e[2] = inv
+        if time.monotonic() - self._last_flush >= self.flush_every_s:
+            self.flush()
+
+    def _read(self) -> dict:
+        merged = {}
+        if not self.path.exists():
+            return merged
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for r in csv.DictReader(f):
+                key = (r.get("source") or "", r.get("customer") or "")
+                try:
+                    n = int(r.get("count") or 1)
+                except ValueError:
+                    n = 1
+                cur = merged.get(key)
+                if cur is None:
+                    merged[key] = {h: r.get(h) or "" for h in self.HEADERS}
+                    merged[key]["count"] = n
+                else:
+                    cur["count"] += n
+                    cur["suggested"] = cur["suggested"] or r.get("suggested") or ""
+                    cur["last_invoice"] = r.get("last_invoice") or cur["last_invoice"]
+                    cur["last_seen"] = r.get("last_seen") or cur["last_seen"]
+        return merged
+
+    def flush(self):
+        with self._lock:
+            pending, self.pending = self.pending, {}
+            self._last_flush = time.monotonic()
+            if not pending:
+                return
+            try:
+                merged = self._read()
+                today = date.today().isoformat()
+                new_terms = 0
+                for (src, cust), (n, first_inv, last_inv) in pending.items():
+                    cur = merged.get((src, cust))
+                    if cur is None:
+                        new_terms += 1
+                        merged[(src, cust)] = {"source": src, "customer": cust, "suggested": "", "count": n,
+                                               "first_invoice": first_inv, "last_invoice": last_inv,
+                                               "first_seen": today, "last_seen": today}
+                    else:
+                        cur["count"] += n
+                        cur["first_invoice"] = cur["first_invoice"] or first_inv
+                        cur["last_invoice"] = last_inv or cur["last_invoice"]
+                        cur["first_seen"] = cur["first_seen"] or today
+                        cur["last_seen"] = today
+                tmp = self.path.with_suffix(".csv.part")
+                with open(tmp, "w", newline="", encoding="utf-8") as f:
+                    w = csv.DictWriter(f, fieldnames=self.HEADERS)
+                    w.writeheader()
+                    w.writerows(merged.values())
+                tmp.replace(self.path)
+                self.new_terms += new_terms
+            except Exception as e:
+                self.pending = pending  # nothing was written; keep the terms for the next flush
+                print(f"[unmapped] flush failed: {e}")
+
+UNMAPPED = _UnmappedLog(UNMAPPED_LOG)
+atexit.register(UNMAPPED.flush)
+
+def _log_unmapped(src, customer, invoice=None):
+    UNMAPPED.add(src, customer, invoice)
 
 # --- Pre-clean & phrase map -------------------------------------------------
 NONFE_RX = re.compile(r"^\s*non\s*fe\s*:\s*", re.I)  # strip "NON FE:" prefix
@@ -710,8 +830,318 @@ QUICK_PHRASE_MAP = {
 }
 
 # ---- Material normalization ---------------------
-def normalize_material(source_name: str, customer_name: str | None = None):
+_MISS = object()  # no rule tier matched; fall through to fuzzy + passthrough
+
+FUZZY_CUTOFF = 0.88
+
+class _TrigramIndex:
+    """
+    Candidate index for difflib fuzzy matching. shortlist() never drops a key
+    that get_close_matches(word, keys, cutoff) could return:
+
+      * real_quick_ratio bound: 2*min(la, lb) / (la + lb) >= cutoff
+      * difflib's M matched chars sit in B <= u + 1 blocks (u = unmatched chars),
+        each block of length l carrying l - 2 trigrams shared with the word, so
+        shared >= M - 2(u + 1) >= (2.5*cutoff - 2)(la + lb) - 2.
+
+    Final scoring still goes through difflib on the shortlist, so ties and
+    scores are identical to the full scan.
+    """
+    def __init__(self, keys):
+        self.keys = list(dict.fromkeys(keys))
+        self.postings = collections.defaultdict(list)  # (trigram, nth occurrence) -> [key idx]
+        self.by_len = collections.defaultdict(list)    # len -> [key idx]
+        self.lens = [len(k) for k in self.keys]
+        for i, k in enumerate(self.keys):
+            self.by_len[len(k)].append(i)
+            for tok in self._tokens(k):
+                self.postings[tok].append(i)
+
+    @staticmethod
+    def _tokens(s: str):
+        # numbering repeated trigrams makes multiset overlap a plain set overlap
+        grams = [s[j:j + 3] for j in range(len(s) - 2)]
+        if len(set(grams)) == len(grams):
+            return [(g, 1) for g in grams]
+        seen = collections.Counter()
+        out = []
+        for j in range(len(s) - 2):
+            g = s[j:j + 3]
+            seen[g] += 1
+            out.append((g, seen[g]))
+        return out
+
+    def shortlist(self, word: str, cutoff: float = FUZZY_CUTOFF, tokens=None) -> list[str]:
+        lb = len(word)
+        lo = int(lb * cutoff / (2 - cutoff))          # rounded down: conservative
+        hi = int(lb * (2 - cutoff) / cutoff) + 1      # rounded up: conservative
+        slope = 2.5 * cutoff - 2
+        if slope <= 0:
+            return self.keys  # bound is vacuous at this cutoff
+        postings = self.postings
+        shared = collections.Counter(itertools.chain.from_iterable(
+            postings[t] for t in (tokens if tokens is not None else self._tokens(word)) if t in postings))
+        if slope * (lo + lb) - 2 > 0:
+            # every length in the window needs overlap, so only keys in `shared` qualify
+            lens, keys = self.lens, self.keys
+            return [keys[i] for i, c in shared.items()
+                    if lo <= lens[i] <= hi and c >= slope * (lens[i] + lb) - 2 - 1e-9]
+        out = []
+        for la in range(lo, hi + 1):
+            need = slope * (la + lb) - 2 - 1e-9
+            for i in self.by_len.get(la, ()):
+                if need <= 0 or shared.get(i, 0) >= need:
+                    out.append(self.keys[i])
+        return out
+
+def _fuzzy_exact(s: str, s_raw: str, cust: str):
+    # 7) fuzzy to CSV exacts only (don’t fuzz to patterns), over a trigram shortlist
+    tokens = _TrigramIndex._tokens(s)
+    keys = MATCHER.fuzzy_global.shortlist(s, tokens=tokens)
+    if cust and cust in MATCHER.fuzzy_by_cust:
+        keys = keys + MATCHER.fuzzy_by_cust[cust].shortlist(s, tokens=tokens)
+    if keys:
+        match = difflib.get_close_matches(s, keys, n=1, cutoff=FUZZY_CUTOFF)
+        if match:
+            return (EXACT_BY_CUST.get(cust, {}).get(match[0])
+                    or EXACT_GLOBAL.get(match[0])
+                    or s_raw)
+    return None
+
+def _fuzzy_exact_reference(s: str, s_raw: str, cust: str):
+    # full difflib scan over every exact key; oracle for _fuzzy_exact
+    keys = set(EXACT_GLOBAL.keys())
+    if cust:
+        keys |= set(EXACT_BY_CUST.get(cust, {}).keys())
+    if keys:
+        match = difflib.get_close_matches(s, list(keys), n=1, cutoff=FUZZY_CUTOFF)
+        if match:
+            return (EXACT_BY_CUST.get(cust, {}).get(match[0])
+                    or EXACT_GLOBAL.get(match[0])
+                    or s_raw)
+    return None
+
+def _alternation(rxs, lookahead: bool = False):
+    """
+    One compiled regex for an ordered rule list. Alternatives are tried left to
+    right, so the first rule (in list order) that matches is the one reported
+    via m.lastgroup ("r<index>"). lookahead=True gives re.search semantics per
+    rule while keeping list priority (a plain alternation would prefer the
+    leftmost position instead).
+    """
+    if not rxs:
+        return None
+    parts = []
+    for i, rx in enumerate(rxs):
+        body = f"(?i:{rx.pattern})" if rx.flags & re.I else f"(?:{rx.pattern})"
+        parts.append(rf"(?=[\s\S]*?(?P<r{i}>{body}))" if lookahead else f"(?P<r{i}>{body})")
+    return re.compile("|".join(parts))
+
+class _MaterialMatcher:
+    """
+    Compiled form of the mapping tables: one alternation per rule tier, wildcard
+    tiers pre-filtered per customer scope. Priorities are exactly those of
+    _normalize_material_reference / _is_nonmetal_hit_reference.
+    """
+    def __init__(self):
+        self.ignore = _alternation(IGNORE_PATTERNS)
+        self.nm_ignore = _alternation(NONMETAL_IGNORE_PATTERNS)
+        self.keywords = _alternation([rx for rx, _ in KEYWORD_RULES], lookahead=True)
+        self.fuzzy_global = _TrigramIndex(EXACT_GLOBAL)
+        self.fuzzy_by_cust = {c: _TrigramIndex(m) for c, m in EXACT_BY_CUST.items() if m}
+
+        # per scope: (alternation, canon by group index); "" is the no-customer / unscoped list
+        self._patterns = {}
+        self._nm_patterns = {}
+        for cust in {""} | {sc for _, _, sc in PATTERNS if sc}:
+            rules = [(rx, canon) for rx, canon, sc in PATTERNS if not sc or sc == cust]
+            self._patterns[cust] = (_alternation([rx for rx, _ in rules]), [c for _, c in rules])
+        for cust in {""} | {sc for _, _, sc in NONMETAL_PATTERNS if sc}:
+            rules = [rx for rx, _, sc in NONMETAL_PATTERNS if not sc or sc == cust]
+            self._nm_patterns[cust] = _alternation(rules)
+
+    def is_nonmetal(self, source_name: str, customer_name: str | None) -> bool:
+        if not source_name:
+            return False
+        s_raw = _preclean_source(source_name.strip())
+        return self._nonmetal(s_raw, s_raw.lower(), (customer_name or "").strip().lower())
+
+    def _nonmetal(self, s_raw, s, cust) -> bool:
+        # ignore rows in the nonmetal map are NOT routed
+        if s in NONMETAL_IGNORE_EXACT:
+            return False
+        if self.nm_ignore and self.nm_ignore.match(s_raw):
+            return False
+        if cust and s in NONMETAL_BY_CUST.get(cust, {}):
+            return True
+        if s in NONMETAL_GLOBAL:
+            return True
+        rx = self._nm_patterns.get(cust, self._nm_patterns[""])
+        return bool(rx and rx.match(s_raw))
+
+    def material(self, s_raw_orig, s_raw, s, cust):
+        """Canonical name, None for IGNORE, or _MISS when no rule tier matched (steps 1–6)."""
+        if s in IGNORE_EXACT:
+            return None
+        if self.ignore and self.ignore.match(s_raw_orig):
+            return None
+
+        if cust and s in EXACT_BY_CUST.get(cust, {}):
+            return EXACT_BY_CUST[cust][s]
+        if s in EXACT_GLOBAL:
+            return EXACT_GLOBAL[s]
+
+        rx, canons = self._patterns.get(cust, self._patterns[""])
+        if rx:
+            m = rx.match(s_raw)
+            if m:
+                return canons[int(m.lastgroup[1:])]
+
+        if s in BASE_MATERIAL_MAP:
+            return BASE_MATERIAL_MAP[s]
+        if s in QUICK_PHRASE_MAP:
+            return QUICK_PHRASE_MAP[s]
+
+        if self.keywords:
+            m = self.keywords.match(s_raw)
+            if m:
+                i = int(m.lastgroup[1:])
+                canon = KEYWORD_RULES[i][1]
+                if not callable(canon):
+                    return canon
+                # callable canon that declines: carry on rule by rule after it
+                for pat, canon in KEYWORD_RULES[i:]:
+                    m = pat.search(s_raw)
+                    if not m:
+                        continue
+                    if callable(canon):
+                        out = canon(m)
+                        if out:
+                            return out
+                    else:
+                        return canon
+        return _MISS
+
+    def evaluate(self, s_raw_orig: str, cust: str):
+        """(is_nonmetal, canonical, unmapped) for a stripped source and lowercased customer; no side effects."""
+        s_raw = _preclean_source(s_raw_orig)
+        s = s_raw.lower()
+        nonmetal = self._nonmetal(s_raw, s, cust)
+        canon = self.material(s_raw_orig, s_raw, s, cust)
+        if canon is not _MISS:
+            return nonmetal, canon, False
+        hit = _fuzzy_exact(s, s_raw, cust)
+        if hit is not None:
+            return nonmetal, hit, False
+        return nonmetal, s_raw, True
+
+def _mapping_fingerprint() -> str:
+    """Everything a cached normalization depends on: both CSV maps plus the in-code tables."""
+    h = hashlib.sha256()
+    for path in (MAPPING_CSV_PATH, NONMETAL_MAP_PATH):
+        h.update(str(path).encode())
+        h.update(path.read_bytes() if path.exists() else b"<missing>")
+    h.update(json.dumps([BASE_MATERIAL_MAP, QUICK_PHRASE_MAP,
+                         [(rx.pattern, rx.flags, canon if isinstance(canon, str) else "<callable>")
+                          for rx, canon in KEYWORD_RULES],
+                         FUZZY_CUTOFF], sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+class _NormalizationCache:
+    """
+    In-memory LRU in front of a SQLite table of MATCHER.evaluate() results, keyed
+    by (stripped source, customer, mapping fingerprint). A map edit changes the
+    fingerprint, so stale rows are simply never hit (and pruned on open).
+    """
+    def __init__(self, path: pathlib.Path, fingerprint: str, size: int = NORM_LRU_SIZE, persist: bool = True):
+        self.fp = fingerprint
+        self.size = size
+        self.lru = collections.OrderedDict()
+        self.pending = []
+        self.hits_mem = self.hits_disk = self.computed = 0
+        self.db = None
+        if persist:
+            try:
+                self.db = sqlite3.connect(path)
+                self.db.execute("""create table if not exists norm_cache(
+                    fp text, src text, cust text, nonmetal integer, canon text, unmapped integer,
+                    primary key (fp, src, cust))""")
+                pruned = self.db.execute("delete from norm_cache where fp <> ?", (self.fp,)).rowcount
+                self.db.commit()
+                if pruned > 0:
+                    print(f"[norm-cache] mapping changed; dropped {pruned} stale entries")
+            except sqlite3.Error as e:
+                print(f"[norm-cache] disk cache disabled: {e}")
+                self.db = None
+
+    def get(self, s_raw_orig: str, cust: str):
+        key = (s_raw_orig, cust)
+        val = self.lru.get(key)
+        if val is not None:
+            self.lru.move_to_end(key)
+            self.hits_mem += 1
+            return val
+        if self.db is not None:
+            row = self.db.execute("select nonmetal, canon, unmapped from norm_cache where fp=? and src=? and cust=?",
+                                  (self.fp, s_raw_orig, cust)).fetchone()
+            if row:
+                val = (bool(row[0]), row[1], bool(row[2]))
+                self.hits_disk += 1
+        if val is None:
+            val = MATCHER.evaluate(s_raw_orig, cust)
+            self.computed += 1
+            if self.db is not None:
+                self.pending.append((self.fp, s_raw_orig, cust, int(val[0]), val[1], int(val[2])))
+                if len(self.pending) >= 500:
+                    self.flush()
+        self.lru[key] = val
+        if len(self.lru) > self.size:
+            self.lru.popitem(last=False)
+        return val
+
+    def flush(self):
+        if self.db is None or not self.pending:
+            return
+        try:
+            self.db.executemany("insert or replace into norm_cache values (?,?,?,?,?,?)", self.pending)
+            self.db.commit()
+        except sqlite3.Error as e:
+            print(f"[norm-cache] write failed: {e}")
+        self.pending = []
+
+    def summary(self) -> str:
+        total = self.hits_mem + self.hits_disk + self.computed
+        if not total:
+            return "Normalization cache: no lookups"
+        pct = lambda n: f"{100.0 * n / total:.1f}%"
+        return (f"Normalization cache: {total} lookups | memory {pct(self.hits_mem)} | "
+                f"disk {pct(self.hits_disk)} | computed {pct(self.computed)} (fp {self.fp})")
+
+def normalize_material(source_name: str, customer_name: str | None = None, invoice=None, log: bool = True):
     """
+    Returns:
+      - str canonical material name
+      - or None if the row should be ignored (mapped to IGNORE)
+    Order: see _normalize_material_reference; evaluated by the compiled MATCHER.
+    log=False skips the unmapped log (re-normalizing an already harvested row).
+    """
+    return classify_material(source_name, customer_name, invoice, log)[1]
+
+def classify_material(source_name: str, customer_name: str | None = None, invoice=None, log: bool = True):
+    """(is_nonmetal, normalize_material result) from one cached evaluation."""
+    if not source_name:
+        return False, "Unknown"
+    s_raw_orig = source_name.strip()
+    nonmetal, canon, unmapped = NORM_CACHE.get(s_raw_orig, (customer_name or "").strip().lower())
+    if unmapped and log:
+        _log_unmapped(s_raw_orig, customer_name, invoice)
+    return nonmetal, canon
+
+def _normalize_material_reference(source_name: str, customer_name: str | None = None, log: bool = True):
+    """
+    Rule-by-rule reference implementation; normalize_material() must agree with
+    it on every input (checked by --check-matcher).
+
     Returns:
       - str canonical material name
       - or None if the row should be ignored (mapped to IGNORE)
@@ -734,6 +1164,22 @@ def normalize_material(source_name: str, customer_name: str | None = None):
     s = s_raw.lower()
     cust = (customer_name or "").strip().lower()
 
+    canon = _reference_tiers(s_raw_orig, s_raw, s, cust)
+    if canon is not _MISS:
+        return canon
+
+    # 7) fuzzy to CSV exacts only (don’t fuzz to patterns)
+    hit = _fuzzy_exact_reference(s, s_raw, cust)
+    if hit is not None:
+        return hit
+
+    # 8) log & passthrough (post-strip)
+    if log:
+        _log_unmapped(s_raw_orig, customer_name)
+    return s_raw
+
+def _reference_tiers(s_raw_orig, s_raw, s, cust):
+    # steps IGNORE..6b, one rule at a time
     # IGNORE (CSV patterns or exact)
     if s in IGNORE_EXACT:
         return None
@@ -775,21 +1221,128 @@ def normalize_material(source_name: str, customer_name: str | None = None):
             # else continue to other rules
         else:
             return canon
+    return _MISS
 
-    # 7) fuzzy to CSV exacts only (don’t fuzz to patterns)
-    keys = set(EXACT_GLOBAL.keys())
-    if cust:
-        keys |= set(EXACT_BY_CUST.get(cust, {}).keys())
-    if keys:
-        match = difflib.get_close_matches(s, list(keys), n=1, cutoff=0.88)
-        if match:
-            return (EXACT_BY_CUST.get(cust, {}).get(match[0])
-                    or EXACT_GLOBAL.get(match[0])
-                    or s_raw)
+MATCHER = _MaterialMatcher()
+NORM_CACHE = _NormalizationCache(NORM_CACHE_PATH, _mapping_fingerprint(), persist=NORM_CACHE_ON)
 
-    # 8) log & passthrough (post-strip)
-    _log_unmapped(s_raw_orig, customer_name)
-    return s_raw
+def check_matcher(paths=(CSV_PATH, NONMETAL_OUT_PATH), repeat: int = 1) -> int:
+    """
+    Equivalence + throughput check: every (description, customer) in the harvested
+    CSVs goes through both the reference scan and the compiled matcher. Returns the
+    number of mismatches.
+    """
+    samples = []
+    for path in paths:
+        if not path.exists():
+            continue
+        with open(path, newline="", encoding="utf-8") as f:
+            for r in csv.DictReader(f):
+                src = r.get("item_original") or r.get("description") or ""
+                samples.append((src, r.get("customer") or None))
+    if not samples:
+        print(f"[matcher] nothing to check (run the harvester first): {', '.join(map(str, paths))}")
+        return 0
+
+    mismatches = 0
+    for src, cust in samples:
+        want = (_is_nonmetal_hit_reference(src, cust), _normalize_material_reference(src, cust, log=False))
+        got = (_nonmetal_nolog(src, cust), _normalize_compiled_nolog(src, cust))
+        if got != want:
+            mismatches += 1
+            if mismatches <= 20:
+                print(f"[matcher] MISMATCH {src!r} ({cust}): reference={want} compiled={got}")
+
+    split = [(src.strip(), *_split_source(src, cust)) for src, cust in samples if src]
+
+    def _rate(fn, items):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            for it in items:
+                fn(*it)
+        return len(items) * repeat / max(time.perf_counter() - t0, 1e-9)
+
+    # rule tiers only (nonmetal scan + steps IGNORE..6), then the full path incl. fuzzy
+    ref_tiers = _rate(lambda o, r, s, c: (_is_nonmetal_hit_reference(o, c), _reference_tiers(o, r, s, c)), split)
+    new_tiers = _rate(lambda o, r, s, c: (MATCHER._nonmetal(r, s, c), MATCHER.material(o, r, s, c)), split)
+    ref_full = _rate(lambda src, cust: (_is_nonmetal_hit_reference(src, cust),
+                                        _normalize_material_reference(src, cust, log=False)), samples)
+    new_full = _rate(lambda src, cust: (_nonmetal_nolog(src, cust), _normalize_compiled_nolog(src, cust)), samples)
+    print(f"[matcher] {len(samples)} lines × {repeat}: {mismatches} mismatch(es)")
+    print(f"[matcher] rule tiers: reference {ref_tiers:,.0f} lines/s → compiled {new_tiers:,.0f} lines/s")
+    print(f"[matcher] end to end: reference {ref_full:,.0f} lines/s → compiled {new_full:,.0f} lines/s")
+    return mismatches
+
+def bench_fuzzy(n: int = 100_000, ref_sample: int = 2_000, seed: int = 0) -> int:
+    """
+    Synthetic unmapped corpus: mapping keys with 1–3 random edits (plus some
+    noise), run through the indexed fuzzy step; the first `ref_sample` lines also
+    go through the full difflib scan and must agree. Returns mismatches.
+    """
+    rnd = random.Random(seed)
+    keys = list(EXACT_GLOBAL) + [k for m in EXACT_BY_CUST.values() for k in m]
+    if not keys:
+        print(f"[fuzzy] no exact keys loaded from {MAPPING_CSV_PATH}")
+        return 0
+    custs = [None] + sorted(c for c, m in EXACT_BY_CUST.items() if m)
+    alphabet = "abcdefghijklmnopqrstuvwxyz0123456789 #/-&"
+
+    def _mutate(k):
+        k = list(k)
+        for _ in range(rnd.randint(1, 3)):
+            op = rnd.random()
+            pos = rnd.randrange(len(k) + 1)
+            if op < 0.3 and k:
+                del k[min(pos, len(k) - 1)]
+            elif op < 0.6:
+                k.insert(pos, rnd.choice(alphabet))
+            elif op < 0.85 and k:
+                k[min(pos, len(k) - 1)] = rnd.choice(alphabet)
+            elif len(k) > 1:
+                i = min(pos, len(k) - 2); k[i], k[i + 1] = k[i + 1], k[i]
+        return "".join(k)
+
+    corpus = []
+    for _ in range(n):
+        word = _mutate(rnd.choice(keys)) if rnd.random() < 0.8 else \
+            " ".join(_mutate(rnd.choice(keys)) for _ in range(2))
+        corpus.append((word, word, (rnd.choice(custs) or "")))
+
+    t0 = time.perf_counter()
+    got = [_fuzzy_exact(*it) for it in corpus]
+    idx_rate = n / max(time.perf_counter() - t0, 1e-9)
+
+    sample = corpus[:ref_sample]
+    t0 = time.perf_counter()
+    want = [_fuzzy_exact_reference(*it) for it in sample]
+    ref_rate = len(sample) / max(time.perf_counter() - t0, 1e-9)
+
+    mismatches = sum(1 for a, b in zip(got, want) if a != b)
+    hits = sum(1 for g in got if g is not None)
+    print(f"[fuzzy] {n} synthetic lines over {len(keys)} keys: {hits} fuzzy hits | "
+          f"{mismatches}/{len(sample)} mismatch(es) vs full scan")
+    print(f"[fuzzy] difflib full scan {ref_rate:,.0f} lines/s → trigram shortlist {idx_rate:,.0f} lines/s "
+          f"({idx_rate / ref_rate:.0f}×)")
+    return mismatches
+
+def _nonmetal_nolog(src, cust):
+    return MATCHER._nonmetal(*_split_source(src, cust)) if src else False
+
+def _split_source(src, cust):
+    s_raw = _preclean_source(src.strip())
+    return s_raw, s_raw.lower(), (cust or "").strip().lower()
+
+def _normalize_compiled_nolog(src, cust):
+    # normalize_material minus the unmapped log, for check_matcher
+    if not src:
+        return "Unknown"
+    s_raw_orig = src.strip()
+    s_raw, s, c = _split_source(src, cust)
+    canon = MATCHER.material(s_raw_orig, s_raw, s, c)
+    if canon is not _MISS:
+        return canon
+    hit = _fuzzy_exact(s, s_raw, c)
+    return s_raw if hit is None else hit
 # ---- End material normalization ----
 
 # ===== OAuth helpers =====
@@ -928,6 +1481,61 @@ def _refresh_tokens(toks):
     TOK_PATH.write_text(json.dumps(new_tokens, indent=2))
     return new_tokens
 
+# ===== Rate limiting + shared tokens =====
+class _RealmRateLimiter:
+    """Token bucket per realm; acquire() blocks until a request may go out. 429s push everyone back."""
+    def __init__(self, rate_per_sec: float, burst: float | None = None):
+        self.rate = max(rate_per_sec, 0.1)
+        self.burst = burst if burst is not None else max(1.0, self.rate)
+        self._lock = threading.Lock()
+        self._buckets = {}  # realm -> [tokens, last_ts, blocked_until]
+
+    def acquire(self, realm: str):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                b = self._buckets.setdefault(realm, [self.burst, now, 0.0])
+                b[0] = min(self.burst, b[0] + (now - b[1]) * self.rate)
+                b[1] = now
+                if now >= b[2] and b[0] >= 1.0:
+                    b[0] -= 1.0
+                    return
+                wait = max(b[2] - now, (1.0 - b[0]) / self.rate)
+            time.sleep(wait)
+
+    def back_off(self, realm: str, seconds: float):
+        with self._lock:
+            b = self._buckets.setdefault(realm, [0.0, time.monotonic(), 0.0])
+            b[0] = 0.0
+            b[2] = max(b[2], time.monotonic() + seconds)
+
+QBO_LIMITER = _RealmRateLimiter(QBO_RATE_PER_SEC)
+# batch endpoint: up to 30 operations per call, and its own 40 calls/min per realm
+QBO_BATCH_MAX = 30
+QBO_BATCH_LIMITER = _RealmRateLimiter(float(os.getenv("QBO_BATCH_PER_MIN", "35")) / 60.0, burst=5)
+
+class _SharedTokens:
+    """
+    Token set shared by download workers. On a 401 each worker calls
+    refresh(seen) with the generation it used; only the first one actually
+    calls _refresh_tokens, the rest wait on the lock and pick up the result.
+    """
+    def __init__(self, toks):
+        self._toks = toks
+        self._gen = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            return self._toks, self._gen
+
+    def refresh(self, seen_gen: int):
+        with self._lock:
+            if self._gen == seen_gen:
+                self._toks = _refresh_tokens(self._toks)
+                self._gen += 1
+            return self._toks, self._gen
+
 # ===== QBO query & PDF =====
 def api_headers(access_token):
     return {"Authorization": f"Bearer {access_token}", "Accept": "application/json"}
@@ -938,9 +1546,11 @@ def pdf_headers(access_token):
 def qbo_query(toks, query):
     url = f"{API_BASE}/{toks['realmId']}/query"
     params = {"query": query, "minorversion": "73"}
+    QBO_LIMITER.acquire(toks["realmId"])
     r = requests.get(url, headers=api_headers(toks["access_token"]), params=params)
     if r.status_code == 401:
         toks = _refresh_tokens(toks)
+        QBO_LIMITER.acquire(toks["realmId"])
         r = requests.get(url, headers=api_headers(toks["access_token"]), params=params)
 
     if r.status_code >= 400:
@@ -951,55 +1561,229 @@ def qbo_query(toks, query):
 
     return r.json(), toks
 
-def get_invoices_for_customer(toks, cust_id, start_date, end_date):
-    all_invs, startpos = [], 1
-    while True:
-        q = (
-          "SELECT Id, DocNumber, TxnDate, TotalAmt, Balance, CustomerRef, ShipDate, "
-          "ShipMethodRef, Line "
-          f"FROM Invoice WHERE CustomerRef = '{cust_id}' "
-          f"AND TxnDate >= '{start_date}' AND TxnDate <= '{end_date}' "
-          f"ORDER BY TxnDate STARTPOSITION {startpos} MAXRESULTS 500"
-        )
-        data, toks = qbo_query(toks, q)
-        invs = data.get("QueryResponse", {}).get("Invoice", [])
-        if not invs: break
-        all_invs.extend(invs); startpos += len(invs)
-    return all_invs, toks
-
-def download_invoice_pdf(toks, invoice_id, out_path: pathlib.Path):
+class QBOBatchItemError(RuntimeError):
+    """One operation inside a batch call came back as a Fault."""
+
+def qbo_batch_query(toks, queries):
     """
-    Downloads a QBO invoice PDF with 401 refresh retry and robust error logging.
-    Writes to `out_path` atomically.
+    Run independent queries through /batch, QBO_BATCH_MAX per HTTP call.
+    Returns ([QueryResponse dict or QBOBatchItemError, aligned with `queries`], toks).
+    A 401 refreshes tokens and resends the call; faulted items get one more
+    round before they are reported as errors.
     """
-    url = f"{API_BASE}/{toks['realmId']}/invoice/{invoice_id}/pdf"
+    results = [None] * len(queries)
+    pending = list(range(len(queries)))
+    url = f"{API_BASE}/{toks['realmId']}/batch"
+    params = {"minorversion": "73"}
+    for attempt in (1, 2):
+        failed = []
+        for k in range(0, len(pending), QBO_BATCH_MAX):
+            chunk = pending[k:k + QBO_BATCH_MAX]
+            body = {"BatchItemRequest": [{"bId": str(i), "Query": queries[i]} for i in chunk]}
+            QBO_BATCH_LIMITER.acquire(toks["realmId"])
+            r = requests.post(url, headers=api_headers(toks["access_token"]), params=params, json=body)
+            if r.status_code == 401:
+                toks = _refresh_tokens(toks)
+                QBO_BATCH_LIMITER.acquire(toks["realmId"])
+                r = requests.post(url, headers=api_headers(toks["access_token"]), params=params, json=body)
+            if r.status_code >= 400:
+                tid = r.headers.get("intuit_tid")
+                print(f"[QBO BATCH ERROR] {r.status_code} tid={tid} body={r.text[:2000]}")
+                r.raise_for_status()
+
+            seen = set()
+            for item in r.json().get("BatchItemResponse", []):
+                i = int(item["bId"])
+                seen.add(i)
+                if "Fault" in item:
+                    errs = (item["Fault"] or {}).get("Error") or [{}]
+                    results[i] = QBOBatchItemError(
+                        f"{errs[0].get('code')} {errs[0].get('Message')}: {errs[0].get('Detail')}")
+                    failed.append(i)
+                else:
+                    results[i] = item.get("QueryResponse", {})
+            for i in chunk:
+                if i not in seen:
+                    results[i] = QBOBatchItemError("missing from batch response")
+                    failed.append(i)
+        pending = failed
+        if not pending:
+            break
+    for i in pending:
+        print(f"[QBO BATCH] item failed: {results[i]} | query={queries[i][:200]}")
+    return results, toks
+
+def _invoice_query(cust_id, start_date, end_date, updated_since, startpos, page_size):
+    cust = f"CustomerRef = '{cust_id}' AND " if cust_id else ""
+    since = f"AND MetaData.LastUpdatedTime >= '{updated_since}' " if updated_since else ""
+    return (
+      "SELECT Id, DocNumber, TxnDate, TotalAmt, Balance, CustomerRef, ShipDate, "
+      "ShipMethodRef, Line, MetaData "
+      f"FROM Invoice WHERE {cust}"
+      f"TxnDate >= '{start_date}' AND TxnDate <= '{end_date}' {since}"
+      f"ORDER BY MetaData.LastUpdatedTime STARTPOSITION {startpos} MAXRESULTS {page_size}"
+    )
 
-    def _do_get(toks_):
-        return requests.get(
-            url,
-            headers=pdf_headers(toks_["access_token"]),
-            stream=True,
-            timeout=30,
-        )
+def _iter_invoice_pages_batched(ctx, specs, start_date, end_date, page_size=500):
+    """
+    Page many scopes at once: each round sends the next page of every unfinished
+    scope in one batch call (a short page ends that scope). specs are
+    (key, cust_id, updated_since). Yields (key, page, done, error);
+    ctx["toks"] tracks refreshed tokens.
+
+    Pages are keyed on LastUpdatedTime rather than offsets into a fixed order:
+    an invoice edited mid-run moves to the end instead of shifting an unread
+    one back past the page boundary (which the watermark would then skip for
+    good). Each page asks again from the newest stamp seen, so invoices sharing
+    that stamp come back and are dropped here; STARTPOSITION only steps through
+    a page-full of invoices that all share one stamp.
+    """
+    stamp = lambda inv: (inv.get("MetaData") or {}).get("LastUpdatedTime")
+    since = {key: s for key, _, s in specs}
+    skip = {key: 0 for key, _, _ in specs}
+    at_since = {key: set() for key, _, _ in specs}  # Ids already yielded with stamp == since
+    active = list(specs)
+    while active:
+        queries = [_invoice_query(cust_id, start_date, end_date, since[key], skip[key] + 1, page_size)
+                   for key, cust_id, _ in active]
+        results, ctx["toks"] = qbo_batch_query(ctx["toks"], queries)
+        still = []
+        for spec, res in zip(active, results):
+            key = spec[0]
+            if isinstance(res, Exception):
+                yield key, [], True, res
+                continue
+            page = res.get("Invoice", [])
+            done = len(page) < page_size
+            yield key, [inv for inv in page if not (stamp(inv) == since[key] and inv["Id"] in at_since[key])], done, None
+            if done:
+                continue
+            last = stamp(page[-1])
+            if last is None or (since[key] is not None and _ts(last) <= _ts(since[key])):
+                skip[key] += len(page)  # whole page on one stamp
+            else:
+                since[key], skip[key] = last, 0
+                at_since[key] = set()
+            at_since[key].update(inv["Id"] for inv in page if stamp(inv) == since[key])
+            still.append(spec)
+        active = still
+
+def get_deleted_invoice_ids(toks, since_iso):
+    """
+    Invoice Ids deleted since `since_iso`, via ChangeDataCapture (realm-wide).
+    Returns (None, toks) when `since_iso` is older than CDC's 30-day window;
+    the caller then can't see deletes and should fall back to a full resync.
+    """
+    since = _ts(since_iso)
+    if datetime.now(timezone.utc) - since > timedelta(days=CDC_MAX_DAYS):
+        return None, toks
 
-    r = _do_get(toks)
+    url = f"{API_BASE}/{toks['realmId']}/cdc"
+    params = {"entities": "Invoice", "changedSince": since_iso, "minorversion": "73"}
+    QBO_LIMITER.acquire(toks["realmId"])
+    r = requests.get(url, headers=api_headers(toks["access_token"]), params=params)
     if r.status_code == 401:
         toks = _refresh_tokens(toks)
-        r = _do_get(toks)
-
+        QBO_LIMITER.acquire(toks["realmId"])
+        r = requests.get(url, headers=api_headers(toks["access_token"]), params=params)
     if r.status_code >= 400:
         tid = r.headers.get("intuit_tid")
-        print(f"[QBO PDF ERROR] {r.status_code} tid={tid} invoice_id={invoice_id} body={r.text[:500]}")
+        print(f"[QBO CDC ERROR] {r.status_code} tid={tid} body={r.text[:2000]}")
         r.raise_for_status()
 
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    tmp_path = out_path.with_suffix(out_path.suffix + ".part")
-    with open(tmp_path, "wb") as f:
-        for chunk in r.iter_content(chunk_size=8192):
-            if chunk:
-                f.write(chunk)
-    tmp_path.replace(out_path)
-    return toks
+    deleted = set()
+    for block in r.json().get("CDCResponse", []):
+        for qr in block.get("QueryResponse", []):
+            for inv in qr.get("Invoice", []):
+                if inv.get("status") == "Deleted":
+                    deleted.add(inv["Id"])
+    return deleted, toks
+
+_pdf_local = threading.local()
+
+def _pdf_session() -> requests.Session:
+    # one keep-alive session per worker thread (Session is not thread-safe)
+    if not hasattr(_pdf_local, "session"):
+        _pdf_local.session = requests.Session()
+    return _pdf_local.session
+
+def _fetch_invoice_pdf(box: _SharedTokens, invoice_id, out_path: pathlib.Path) -> int:
+    """
+    One invoice PDF through the shared limiter/tokens; retries 429/5xx with
+    backoff (Retry-After when given). Writes atomically via `.part`; returns bytes written.
+    """
+    toks, gen = box.get()
+    url = f"{API_BASE}/{toks['realmId']}/invoice/{invoice_id}/pdf"
+    refreshed = False
+    for attempt in range(1, PDF_MAX_ATTEMPTS + 1):
+        QBO_LIMITER.acquire(toks["realmId"])
+        r = _pdf_session().get(url, headers=pdf_headers(toks["access_token"]), stream=True, timeout=30)
+
+        if r.status_code == 401 and not refreshed:
+            r.close()
+            toks, gen = box.refresh(gen)
+            refreshed = True
+            continue
+        if r.status_code == 429 or r.status_code >= 500:
+            try:
+                wait = float(r.headers.get("Retry-After") or 0) or min(2 ** attempt, 30)
+            except ValueError:
+                wait = min(2 ** attempt, 30)
+            r.close()
+            if r.status_code == 429:
+                QBO_LIMITER.back_off(toks["realmId"], wait)
+            if attempt < PDF_MAX_ATTEMPTS:
+                time.sleep(wait)
+                continue
+        if r.status_code >= 400:
+            tid = r.headers.get("intuit_tid")
+            print(f"[QBO PDF ERROR] {r.status_code} tid={tid} invoice_id={invoice_id} body={r.text[:500]}")
+            r.raise_for_status()
+
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = out_path.with_suffix(out_path.suffix + ".part")
+        n = 0
+        with open(tmp_path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=65536):
+                if chunk:
+                    f.write(chunk)
+                    n += len(chunk)
+        tmp_path.replace(out_path)
+        return n
+    raise RuntimeError(f"invoice {invoice_id}: gave up after {PDF_MAX_ATTEMPTS} attempts")
+
+def download_invoice_pdfs(toks, jobs, workers: int = PDF_WORKERS):
+    """
+    Concurrent PDF stage: `jobs` is [(invoice_id, out_path)]; existing files
+    are skipped. Failures are reported and left for the next run. Returns the
+    (possibly refreshed) tokens.
+    """
+    todo = [(i, p) for i, p in jobs if not p.exists()]
+    if not todo:
+        print(f"[pdf] all {len(jobs)} PDFs already present")
+        return toks
+
+    box = _SharedTokens(toks)
+    t0 = time.perf_counter()
+    done = failed = total_bytes = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="qbo-pdf") as ex:
+        futs = {ex.submit(_fetch_invoice_pdf, box, inv_id, path): inv_id for inv_id, path in todo}
+        for fut in as_completed(futs):
+            try:
+                total_bytes += fut.result()
+                done += 1
+            except Exception as e:
+                failed += 1
+                print(f"[pdf] invoice {futs[fut]} failed: {e}")
+            if (done + failed) % 100 == 0:
+                el = time.perf_counter() - t0
+                print(f"[pdf] {done + failed}/{len(todo)}  {done / el:.1f} PDFs/s")
+
+    el = max(time.perf_counter() - t0, 1e-9)
+    print(f"[pdf] downloaded {done} PDFs ({total_bytes / 1e6:.1f} MB) in {el:.1f}s "
+          f"→ {done / el:.1f} PDFs/s, {total_bytes / 1e6 / el:.2f} MB/s "
+          f"| skipped {len(jobs) - len(todo)} existing | failed {failed} | workers {workers}")
+    return box.get()[0]
 
 # ===== BRidge client =====
 def bridge_login(session: requests.Session) -> None:
@@ -1022,74 +1806,216 @@ def _material_source_text(item_name: str | None, line_desc: str | None, customer
         return s
     return (item_name or "").strip()
 
-def post_contract_to_bridge(session: requests.Session, row: dict, seller_name: str = "Winski Brothers"):
-    # derive tonnage & $/ton from the QBO line
-    qty = row.get("qty")
-    uom = (row.get("uom") or "").lower()
-    unit_price = row.get("unit_price")
-    if qty is None or unit_price is None:
-        return
+def _bridge_import_headers(inv_date) -> dict:
+    # historical imports carry the invoice date so BRidge backdates the contract
+    if os.getenv("BRIDGE_IMPORT_MODE", "historical").lower() != "historical":
+        return {}
+    headers = {"X-Import-Mode": "historical"}
+    if inv_date:
+        if isinstance(inv_date, str):
+            if len(inv_date) == 10 and inv_date[4] == "-" and inv_date[7] == "-":
+                headers["X-Import-Created-At"] = inv_date + "T00:00:00Z"
+            else:
+                headers["X-Import-Created-At"] = inv_date
+        elif isinstance(inv_date, datetime):
+            headers["X-Import-Created-At"] = inv_date.astimezone(timezone.utc).isoformat()
+    return headers
 
-    if uom in ("lb", "lbs", "pound", "pounds"):
-        weight_tons = float(qty) / 2000.0
-        price_per_ton = float(unit_price) * 2000.0
-    elif uom in ("ton", "tons", "t"):
-        weight_tons = float(qty)
-        price_per_ton = float(unit_price)
-    else:
-        weight_tons = float(qty) / 2000.0
-        price_per_ton = float(unit_price) * 2000.0
+def _bridge_contract_request(row: dict, seller_name: str = "Winski Brothers"):
+    """
+    (payload, headers) for POST /contracts from a harvested row; None if qty/price
+    are missing, "ignored" if the material maps to ignore.
+    """
+    if row.get("qty") is None or row.get("unit_price") is None:
+        return None
+    payload = _row_to_bridge_contract(row, seller_name)
+    if payload is None:
+        return "ignored"  # do not post
 
-    # canonical material + provenance (Description-first)
-    material_canon = normalize_material(
-        row.get("description") or row.get("item_original") or row.get("item") or "",
-        row.get("customer")
-    )
-    if material_canon is None:
-        return {"ok": True, "ignored": True}  # do not post
+    headers = {"Idempotency-Key": f"QBO:{payload['reference_symbol']}"}
+    headers.update(_bridge_import_headers(row.get("invoice_date")))
+    return payload, headers
 
-    payload = {
-        "buyer": row["customer"],
-        "seller": seller_name,
-        "material": material_canon,
-        "weight_tons": round(weight_tons, 6),
-        "price_per_ton": round(price_per_ton, 2),
-        "pricing_formula": None,
-        "reference_symbol": f"{row.get('invoice_number')}#{row.get('_line_index', 0)}",
-        "reference_price": None,
-        "reference_source": "QBO",
-        "reference_timestamp": row.get("invoice_date"),
-        "currency": "USD",
-    }
+def _bridge_post(session: requests.Session, url: str, **kw) -> requests.Response:
+    """
+    POST with exponential backoff + jitter on 429/5xx and connection errors.
+    The same headers (Idempotency-Key included) go out on every attempt, so a
+    retry after a lost response can't create a duplicate.
+    """
+    for attempt in range(1, BRIDGE_MAX_ATTEMPTS + 1):
+        try:
+            r = session.post(url, timeout=25, **kw)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == BRIDGE_MAX_ATTEMPTS:
+                raise
+            time.sleep(min(2 ** attempt, 30) * (0.5 + random.random() / 2))
+            continue
+        if (r.status_code == 429 or r.status_code >= 500) and attempt < BRIDGE_MAX_ATTEMPTS:
+            try:
+                wait = float(r.headers.get("Retry-After") or 0)
+            except ValueError:
+                wait = 0
+            time.sleep(wait or min(2 ** attempt, 30) * (0.5 + random.random() / 2))
+            continue
+        return r
+    return r
 
-    headers = {"Idempotency-Key": f"QBO:{payload['reference_symbol']}"}
-    if os.getenv("BRIDGE_IMPORT_MODE", "historical").lower() == "historical":
-        headers["X-Import-Mode"] = "historical"
-        inv_date = row.get("invoice_date")
-        if inv_date:
-            if isinstance(inv_date, str):
-                if len(inv_date) == 10 and inv_date[4] == "-" and inv_date[7] == "-":
-                    headers["X-Import-Created-At"] = inv_date + "T00:00:00Z"
-                else:
-                    headers["X-Import-Created-At"] = inv_date
-            else:
-                try:
-                    from datetime import datetime, timezone
-                    if isinstance(inv_date, datetime):
-                        headers["X-Import-Created-At"] = inv_date.astimezone(timezone.utc).isoformat()
-                except Exception:
-                    pass
+_bridge_local = threading.local()
+
+def _bridge_session(login_session: requests.Session, pool: int) -> requests.Session:
+    # per-thread keep-alive session carrying the login cookies
+    sess = getattr(_bridge_local, "session", None)
+    if sess is None:
+        sess = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool)
+        sess.mount("https://", adapter); sess.mount("http://", adapter)
+        sess.cookies.update(login_session.cookies)
+        _bridge_local.session = sess
+    return sess
+
+def _write_bridge_retries(failed: list[dict]):
+    if not failed:
+        BRIDGE_RETRY_PATH.unlink(missing_ok=True)
+        return
+    tmp = BRIDGE_RETRY_PATH.with_suffix(".ndjson.part")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for item in failed:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    tmp.replace(BRIDGE_RETRY_PATH)
+    print(f"[bridge] {len(failed)} failed → {BRIDGE_RETRY_PATH} (replayed next run)")
+
+def _load_bridge_retries() -> list[dict]:
+    if not BRIDGE_RETRY_PATH.exists():
+        return []
+    out = []
+    with open(BRIDGE_RETRY_PATH, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                out.append(json.loads(line))
+    return out
+
+def bridge_jobs(rows, seller_name: str = "Winski Brothers"):
+    # run on the harvesting thread: payloads come out of the normalization cache
+    for row in rows:
+        req = _bridge_contract_request(row, seller_name)
+        if req and req != "ignored":
+            yield {"payload": req[0], "headers": req[1]}
+
+def post_bridge_jobs(session: requests.Session, jobs, workers: int = BRIDGE_POST_WORKERS):
+    """
+    Posting stage: one POST /contracts per job over pooled per-thread sessions.
+    `jobs` may be any iterable (the harvester feeds a queue); at most
+    4×workers posts are in flight. Earlier failures from BRIDGE_RETRY_PATH go
+    out first; anything still failing is written back there.
+    """
+    if ENV in {"ci", "test"} or HARVESTER_DISABLED:
+        print("[bridge] Skipped (CI/test mode)")
+        for _ in jobs:  # drain so a feeding queue never blocks
+            pass
+        return
 
+    retries = [{"payload": it["payload"], "headers": it["headers"]} for it in _load_bridge_retries()]
+    retried = len(retries)
+
+    url = f"{_bridge_base_for_doc('invoice').rstrip('/')}/contracts"
+
+    def _one(job):
+        r = _bridge_post(_bridge_session(session, workers), url, json=job["payload"], headers=job["headers"])
+        if r.status_code not in (200, 201):
+            raise RuntimeError(f"[{r.status_code}] {r.text[:200]}")
+
+    t0 = time.perf_counter()
+    failed = []
+    total = 0
+
+    def _reap(futs, block):
+        done, _ = wait(futs, return_when=FIRST_COMPLETED) if block else (list(futs), None)
+        for fut in done:
+            job = futs.pop(fut)
+            try:
+                fut.result()
+            except Exception as e:
+                failed.append({**job, "error": str(e)})
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="bridge-post") as ex:
+        futs = {}
+        for job in itertools.chain(retries, jobs):
+            futs[ex.submit(_one, job)] = job
+            total += 1
+            if len(futs) >= 4 * max(1, workers):
+                _reap(futs, block=True)
+        _reap(futs, block=False)
+
+    if total:
+        el = max(time.perf_counter() - t0, 1e-9)
+        print(f"[bridge] posted {total - len(failed)}/{total} contracts "
+              f"({retried} from retry file) in {el:.1f}s → {total / el:.1f}/s")
+    _write_bridge_retries(failed)
+
+def post_contracts_bulk(session: requests.Session, jobs, batch_size: int = BRIDGE_BULK_BATCH):
+    """
+    Bulk mode: the same jobs as post_bridge_jobs (new/changed lines only), sent
+    to BRIDGE_BULK_PATH in NDJSON batches. Every line carries its own
+    reference_symbol for BRidge to dedupe on; the batch Idempotency-Key is
+    derived from those line keys, not from byte offsets in a file, so a
+    replayed batch keeps its key. Jobs are batched per set of X-Import-*
+    headers (one invoice date each in historical mode), so every batch is
+    backdated like its lines would be in rows mode. Failed lines land in
+    BRIDGE_RETRY_PATH with their per-line headers.
+    """
     if ENV in {"ci", "test"} or HARVESTER_DISABLED:
         print("[bridge] Skipped (CI/test mode)")
-        return {"ok": True, "stub": True}
+        for _ in jobs:  # drain so a feeding queue never blocks
+            pass
+        return
 
-    base = _bridge_base_for_doc("invoice")
-    url  = f"{base.rstrip('/')}/contracts"
-    r = session.post(url, json=payload, timeout=25, headers=headers)
-    if r.status_code not in (200, 201):
-        print(f"[bridge] POST /contracts failed [{r.status_code}] {r.text[:200]}")
-    return r
+    url = f"{_bridge_base_for_doc('invoice').rstrip('/')}{BRIDGE_BULK_PATH}"
+    retries = [{"payload": it["payload"], "headers": it["headers"]} for it in _load_bridge_retries()]
+    failed = []
+    sent = batches = 0
+    t0 = time.perf_counter()
+
+    def _flush(import_headers, batch):
+        nonlocal sent, batches
+        body = "".join(json.dumps(job["payload"], ensure_ascii=False) + "\n" for job in batch).encode("utf-8")
+        line_keys = "\n".join(job["headers"]["Idempotency-Key"] for job in batch)
+        headers = {
+            "Content-Type": "application/x-ndjson",
+            "Idempotency-Key": "QBO-BULK:" + hashlib.sha256(line_keys.encode("utf-8")).hexdigest(),
+        }
+        headers.update(import_headers)
+        try:
+            r = _bridge_post(session, url, data=body, headers=headers)
+            ok = r.status_code in (200, 201, 202)
+            err = None if ok else f"[{r.status_code}] {r.text[:200]}"
+        except Exception as e:
+            ok, err = False, str(e)
+        batches += 1
+        if ok:
+            sent += len(batch)
+        else:
+            print(f"[bridge] bulk batch {batches} failed {err}")
+            failed.extend({**job, "error": err} for job in batch)
+
+    groups = {}  # X-Import-* headers -> jobs waiting for a batch
+    buffered = 0
+    for job in itertools.chain(retries, jobs):
+        key = tuple(sorted((k, v) for k, v in job["headers"].items() if k.startswith("X-Import-")))
+        groups.setdefault(key, []).append(job)
+        buffered += 1
+        if len(groups[key]) < batch_size:
+            if buffered < 4 * batch_size:
+                continue
+            key = max(groups, key=lambda k: len(groups[k]))  # many dates in flight: ship the fullest
+        batch = groups.pop(key)
+        buffered -= len(batch)
+        _flush(dict(key), batch)
+    for key, batch in groups.items():
+        _flush(dict(key), batch)
+
+    el = max(time.perf_counter() - t0, 1e-9)
+    print(f"[bridge] bulk: {sent} contracts in {batches} batch(es) ({len(retries)} from retry file), {el:.1f}s")
+    _write_bridge_retries(failed)
 
 def _row_to_bridge_contract(row: dict, seller_name: str = "Winski Brothers") -> dict | None:
     """
@@ -1114,7 +2040,7 @@ def _row_to_bridge_contract(row: dict, seller_name: str = "Winski Brothers") ->
 
     material_canon = normalize_material(
         row.get("description") or row.get("item_original") or row.get("item") or "",
-        row.get("customer")
+        row.get("customer"), log=False  # already logged when the line was harvested
     )
     if material_canon is None:
         return None  # do not post
@@ -1133,80 +2059,6 @@ def _row_to_bridge_contract(row: dict, seller_name: str = "Winski Brothers") ->
         "currency": "USD",
     }
 
-# --- Dump all customers for visibility -------------------------------------------------
-def dump_customers_csv(toks, out_path="qbo_out/customers.csv"):
-    all_rows, startpos = [], 1
-    while True:
-        q = f"SELECT Id, DisplayName FROM Customer STARTPOSITION {startpos} MAXRESULTS 500"
-        data, toks = qbo_query(toks, q)
-        rows = data.get("QueryResponse", {}).get("Customer", [])
-        if not rows:
-            break
-        all_rows.extend(rows)
-        startpos += len(rows)
-
-    os.makedirs("qbo_out", exist_ok=True)
-    with open(out_path, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f); w.writerow(["Id","DisplayName"])
-        for r in all_rows:
-            w.writerow([r.get("Id",""), r.get("DisplayName","")])
-    print(f"Customers → {out_path}  (total: {len(all_rows)})")
-    return toks
-
-# --- Forgiving customer lookup: EXACT → LIKE → FUZZY -----------------------------------
-def get_customer_id_by_name(toks, display_name):
-    target = (display_name or "").strip()
-    safe = target.replace("'", "''")
-
-    # 1) Exact
-    q = f"SELECT Id, DisplayName FROM Customer WHERE DisplayName = '{safe}'"
-    data, toks = qbo_query(toks, q)
-    rows = data.get("QueryResponse", {}).get("Customer", [])
-    if rows:
-        print(f"[match:EXACT] '{target}' → '{rows[0]['DisplayName']}' (Id={rows[0]['Id']})")
-        return rows[0]["Id"], toks
-
-    # 2) LIKE (contains)
-    q_like = f"SELECT Id, DisplayName FROM Customer WHERE DisplayName LIKE '%{safe}%'"
-    data, toks = qbo_query(toks, q_like)
-    rows = data.get("QueryResponse", {}).get("Customer", [])
-    if rows:
-        names = [r["DisplayName"] for r in rows if r.get("DisplayName")]
-        best = difflib.get_close_matches(target, names, n=1, cutoff=0.6)
-        chosen = next((r for r in rows if best and r["DisplayName"] == best[0]), rows[0])
-        print(f"[match:LIKE]  '{target}' → '{chosen['DisplayName']}' (Id={chosen['Id']})")
-        return chosen["Id"], toks
-
-    # 3) FUZZY against first 1000
-    data, toks = qbo_query(toks, "SELECT Id, DisplayName FROM Customer MAXRESULTS 1000")
-    rows = data.get("QueryResponse", {}).get("Customer", [])
-    if rows:
-        names = [r["DisplayName"] for r in rows if r.get("DisplayName")]
-        best = difflib.get_close_matches(target, names, n=1, cutoff=0.6)
-        if best:
-            chosen = next(r for r in rows if r["DisplayName"] == best[0])
-            print(f"[match:FUZZY] '{target}' → '{chosen['DisplayName']}' (Id={chosen['Id']})")
-            return chosen["Id"], toks
-
-    print(f"[WARN] Customer not found (after fuzzy): {target}")
-    return None, toks
-
-# --- Fallback: pull ALL invoices without customer filter -------------------------------
-def get_invoices_all(toks, start_date, end_date):
-    all_invs, startpos = [], 1
-    while True:
-        q = (
-            "SELECT Id, DocNumber, TxnDate, TotalAmt, Balance, CustomerRef, ShipDate, "
-            "ShipMethodRef, Line "
-            f"FROM Invoice WHERE TxnDate >= '{start_date}' AND TxnDate <= '{end_date}' "
-            f"ORDER BY TxnDate STARTPOSITION {startpos} MAXRESULTS 500"
-        )
-        data, toks = qbo_query(toks, q)
-        invs = data.get("QueryResponse", {}).get("Invoice", [])
-        if not invs: break
-        all_invs.extend(invs); startpos += len(invs)
-    return all_invs, toks
-
 # ===== Main =====
 def get_tokens():
     if TOK_PATH.exists():
@@ -1219,259 +2071,601 @@ def get_tokens():
         return oauth_flow_via_relay()
     return oauth_flow()
 
-def main():
-    toks = get_tokens()
+def _ts(iso: str) -> datetime:
+    # QBO stamps carry the company's UTC offset, which moves with DST; compare as instants
+    return datetime.fromisoformat(iso.replace("Z", "+00:00"))
+
+class _HarvestStore:
+    """
+    Harvest state on disk: per-scope LastUpdatedTime watermarks and each
+    invoice's raw sales lines. Written page by page, so a crash keeps what was
+    already fetched; outputs are streamed back out of it in order.
+    """
+    def __init__(self, path: pathlib.Path, realm_id: str):
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            create table if not exists meta(key text primary key, value text);
+            create table if not exists watermarks(scope text primary key, ts text);
+            create table if not exists invoices(
+                scope text, invoice_id text, updated text, txn_date text, lines text,
+                pdf_path text, primary key (scope, invoice_id));
+            create table if not exists customers(
+                id text primary key, display_name text, active integer, updated text);
+            create table if not exists outbox(key text primary key, job text);
+        """)
+        row = self.db.execute("select value from meta where key='realm'").fetchone()
+        if row and row[0] != realm_id:
+            print("[state] different realm, starting over")
+            self.reset()
+        self.db.execute("insert or replace into meta values ('realm', ?)", (realm_id,))
+        self.db.commit()
+
+    def reset(self, customers: bool = True):
+        """Forget harvested invoices; `customers=False` keeps the customer directory."""
+        self.db.execute("delete from watermarks")
+        self.db.execute("delete from invoices")
+        if customers:
+            self.db.execute("delete from customers")
+            self.db.execute("delete from meta where key <> 'realm'")
+        else:
+            self.db.execute("delete from meta where key = 'cdc_checkpoint'")
+        self.db.commit()
+
+    def meta(self, key):
+        row = self.db.execute("select value from meta where key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        self.db.execute("insert or replace into meta values (?, ?)", (key, value))
+
+    def watermark(self, scope):
+        row = self.db.execute("select ts from watermarks where scope=?", (scope,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, scope, ts):
+        self.db.execute("insert or replace into watermarks values (?, ?)", (scope, ts))
+
+    def updated_of(self, scope, inv_id):
+        row = self.db.execute("select updated from invoices where scope=? and invoice_id=?",
+                              (scope, str(inv_id))).fetchone()
+        return row[0] if row else _MISS
+
+    def put(self, scope, inv_id, updated, txn_date, lines, pdf_path=None):
+        self.db.execute("insert or replace into invoices values (?,?,?,?,?,?)",
+                        (scope, str(inv_id), updated, txn_date, json.dumps(lines, ensure_ascii=False),
+                         str(pdf_path) if pdf_path else None))
+
+    def delete_invoices(self, inv_ids) -> int:
+        n = 0
+        for inv_id in inv_ids:
+            n += self.db.execute("delete from invoices where invoice_id=?", (str(inv_id),)).rowcount
+        self.db.commit()
+        return n
+
+    def count(self) -> int:
+        return self.db.execute("select count(*) from invoices").fetchone()[0]
+
+    def iter_scope(self, scope):
+        """(lines, pdf_path) per stored invoice of `scope`, by TxnDate then numeric Id."""
+        cur = self.db.execute(
+            "select lines, pdf_path from invoices where scope=? "
+            "order by coalesce(txn_date, ''), cast(invoice_id as integer)", (scope,))
+        for lines, pdf_path in cur:
+            yield json.loads(lines), pdf_path
+
+    def enqueue(self, jobs):
+        """Park BRidge jobs in the same transaction as their invoice; cleared once posted."""
+        self.db.executemany("insert or replace into outbox values (?, ?)",
+                            ((j["headers"]["Idempotency-Key"], json.dumps(j, ensure_ascii=False)) for j in jobs))
+
+    def outbox(self) -> list[dict]:
+        return [json.loads(j) for (j,) in self.db.execute("select job from outbox order by rowid")]
+
+    def clear_outbox(self):
+        self.db.execute("delete from outbox")
+        self.db.commit()
+
+    def pdf_jobs(self, scope):
+        """(invoice_id, pdf_path) for every stored invoice of `scope`."""
+        cur = self.db.execute("select invoice_id, pdf_path from invoices "
+                              "where scope=? and pdf_path is not null", (scope,))
+        for inv_id, path in cur:
+            yield inv_id, pathlib.Path(path)
+
+    def commit(self):
+        self.db.commit()
+
+_NAME_PUNCT_RX = re.compile(r"[^a-z0-9]+")
+
+def _norm_customer(name: str) -> str:
+    # "J. Solotken & Company" / "j solotken and company" → "j solotken and company"
+    return _NAME_PUNCT_RX.sub(" ", (name or "").lower().replace("&", " and ")).strip()
+
+class CustomerDirectory:
+    """
+    Every QBO customer (Id, DisplayName, Active) kept in the harvest store and
+    refreshed incrementally by MetaData.LastUpdatedTime; CUSTOMER_NAMES are then
+    resolved locally (EXACT → normalized → contains → FUZZY) with no API calls.
+    """
+    def __init__(self, store: _HarvestStore):
+        self.store = store
+        self._load()
+
+    def _load(self):
+        rows = self.store.db.execute(
+            "select id, display_name from customers where active=1 order by rowid").fetchall()
+        self.customers = [(cid, name) for cid, name in rows if name]
+        self.by_name = {}
+        self.by_lower = {}
+        self.by_norm = {}
+        for cid, name in self.customers:
+            self.by_name.setdefault(name, cid)
+            self.by_lower.setdefault(name.lower(), (cid, name))
+            self.by_norm.setdefault(_norm_customer(name), (cid, name))
+
+    def refresh(self, toks, full: bool = False):
+        """Pull customers changed since the stored watermark (all of them when empty or full=True)."""
+        since = None if full else self.store.meta("customers_wm")
+        cond = "WHERE Active IN (true, false)" + (f" AND MetaData.LastUpdatedTime >= '{since}'" if since else "")
+        wm, n, startpos = since, 0, 1
+        while True:
+            q = f"SELECT Id, DisplayName, Active, MetaData FROM Customer {cond} STARTPOSITION {startpos} MAXRESULTS 1000"
+            data, toks = qbo_query(toks, q)
+            rows = data.get("QueryResponse", {}).get("Customer", [])
+            if not rows:
+                break
+            for r in rows:
+                updated = (r.get("MetaData") or {}).get("LastUpdatedTime")
+                # upsert keeps rowid (QBO order) for customers we already know
+                self.store.db.execute(
+                    "insert into customers values (?,?,?,?) on conflict(id) do update set "
+                    "display_name=excluded.display_name, active=excluded.active, updated=excluded.updated",
+                    (r["Id"], r.get("DisplayName", ""), int(r.get("Active", True)), updated))
+                if updated and (wm is None or _ts(updated) > _ts(wm)):
+                    wm = updated
+            n += len(rows)
+            startpos += len(rows)
+        if wm:
+            self.store.set_meta("customers_wm", wm)
+        self.store.commit()
+        self._load()
+        print(f"Customer directory: {len(self.customers)} active"
+              + (f" ({n} changed since {since})" if since else f" (full refresh, {n} pulled)"))
+        return toks
+
+    def write_csv(self, out_path=CUSTOMERS_CSV_PATH):
+        with open(out_path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f); w.writerow(["Id","DisplayName"])
+            for cid, name in self.customers:
+                w.writerow([cid, name])
+        print(f"Customers → {out_path}  (total: {len(self.customers)})")
+
+    def resolve(self, display_name):
+        """Customer Id for `display_name` from the local directory (EXACT → NORM → LIKE → FUZZY), or None."""
+        target = (display_name or "").strip()
+
+        # 1) Exact (QBO string compares ignore case)
+        cid = self.by_name.get(target)
+        hit = (cid, target) if cid else self.by_lower.get(target.lower())
+        if hit:
+            print(f"[match:EXACT] '{target}' → '{hit[1]}' (Id={hit[0]})")
+            return hit[0]
+
+        # 2) Normalized (punctuation, spacing, & vs and)
+        hit = self.by_norm.get(_norm_customer(target))
+        if hit:
+            print(f"[match:NORM]  '{target}' → '{hit[1]}' (Id={hit[0]})")
+            return hit[0]
+
+        # 3) Contains (the old LIKE '%name%'), best of several by similarity
+        low = target.lower()
+        rows = [(cid, name) for cid, name in self.customers if low and low in name.lower()]
+        if rows:
+            best = difflib.get_close_matches(target, [n for _, n in rows], n=1, cutoff=0.6)
+            chosen = next((r for r in rows if best and r[1] == best[0]), rows[0])
+            print(f"[match:LIKE]  '{target}' → '{chosen[1]}' (Id={chosen[0]})")
+            return chosen[0]
+
+        # 4) Fuzzy against the whole directory
+        best = difflib.get_close_matches(target, [n for _, n in self.customers], n=1, cutoff=0.6)
+        if best:
+            cid = self.by_name[best[0]]
+            print(f"[match:FUZZY] '{target}' → '{best[0]}' (Id={cid})")
+            return cid
 
-    # Dump all customers (helps pick exact names later)
-    toks = dump_customers_csv(toks)
+        print(f"[WARN] Customer not found (after fuzzy): {target}")
+        return None
 
-    rows = []
-    nonmetal_rows = []
-    sess = requests.Session()
-    try:
-        bridge_login(sess)
-    except Exception as e:
-        print(f"[bridge] login skipped/failed: {e}")
+class _CsvSink:
+    """
+    Incremental CSV writer into `<path>.part`, renamed over `path` on commit().
+    lazy=True opens the file on the first row only (no rows → `path` untouched).
+    """
+    def __init__(self, path: pathlib.Path, headers, lazy: bool = False):
+        self.path, self.headers = path, headers
+        self.tmp = path.with_suffix(path.suffix + ".part")
+        self.f = self.w = None
+        self.n = 0
+        if not lazy:
+            self._open()
+
+    def _open(self):
+        self.f = open(self.tmp, "w", newline="", encoding="utf-8")
+        self.w = csv.DictWriter(self.f, fieldnames=self.headers)
+        self.w.writeheader()
+
+    def write(self, row: dict):
+        if self.w is None:
+            self._open()
+        self.w.writerow(row)
+        self.n += 1
+
+    def commit(self):
+        if self.f is not None:
+            self.f.close()
+            self.tmp.replace(self.path)
+
+    def abort(self):
+        if self.f is not None:
+            self.f.close()
+            self.tmp.unlink(missing_ok=True)
+
+class _NdjsonSink:
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self.tmp = path.with_suffix(path.suffix + ".part")
+        self.f = open(self.tmp, "w", encoding="utf-8")
+
+    def write(self, obj: dict):
+        self.f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+
+    def commit(self):
+        self.f.close()
+        self.tmp.replace(self.path)
+
+    def abort(self):
+        self.f.close()
+        self.tmp.unlink(missing_ok=True)
+
+INVOICE_HEADERS = [
+    "customer","invoice_id","invoice_number","invoice_date","service_date",
+    "product_service","qbo_item","description",
+    "ship_date","ship_via",
+    "item","item_original","qty","uom","unit_price","line_amount","invoice_total",
+    "invoice_balance","pdf_path"
+]
+# exact schema BRidge expects
+CONTRACT_HEADERS = [
+    "buyer","seller","material","weight_tons","price_per_ton",
+    "pricing_formula","reference_symbol","reference_price",
+    "reference_source","reference_timestamp","currency"
+]
+NONMETAL_HEADERS = [
+    "customer","description","suggested",
+    "invoice_id","invoice_number","invoice_date",
+    "qty","uom","line_amount","pdf_path"
+]
+
+def _harvest_invoice(inv, cdir: pathlib.Path):
+    """
+    One QBO invoice as (raw sales lines, pdf_path). Lines are stored as QBO
+    sent them; material classification happens in _split_lines.
+    """
+    lines = []
+
+    inv_id   = inv["Id"]
+    doc_no   = inv.get("DocNumber")
+    inv_date = inv.get("TxnDate")
+    total    = inv.get("TotalAmt")
+    balance  = inv.get("Balance")
+    custname = (inv.get("CustomerRef") or {}).get("name")
+    ship_dt  = inv.get("ShipDate")
+    ship_m   = (inv.get("ShipMethodRef") or {}).get("name")
 
-    matched_any = False
+    pdf_path = cdir / f"INV-{inv_id}.pdf"
 
-    # ---- Per-customer loop ----
+    for idx, L in enumerate(inv.get("Line", [])):
+        if L.get("DetailType") != "SalesItemLineDetail":
+            continue
+        d = L.get("SalesItemLineDetail", {})
+
+        item_name   = (d.get("ItemRef") or {}).get("name")
+        line_desc   = L.get("Description")  # <-- often the true material text
+        svc_date    = d.get("ServiceDate")  # optional; fallback to invoice date later
+
+        lines.append({
+            "customer": custname,
+            "invoice_id": inv_id,
+            "invoice_number": doc_no,
+            "invoice_date": inv_date,
+            "service_date": svc_date or inv_date,
+            "product_service": item_name,       # QBO Item (Product/Service)
+            "description": line_desc,           # raw Description from QBO
+            "ship_date": ship_dt,
+            "ship_via": ship_m,
+            "source": _material_source_text(item_name, line_desc, custname),  # Desc-first
+            "qty": d.get("Qty"),
+            "uom": d.get("UnitOfMeasure"),
+            "unit_price": d.get("UnitPrice"),   # aka Rate
+            "line_amount": L.get("Amount"),     # Amount
+            "invoice_total": total,
+            "invoice_balance": balance,
+            "line_index": idx,
+        })
+
+    return lines, pdf_path
+
+def _split_lines(lines, pdf_path, fallback_customer=None, log: bool = True):
+    """
+    Classify stored invoice lines into (metal rows, nonmetal rows) under the
+    current maps. Runs again on every output pass, so an edit to the map CSVs
+    reaches invoices harvested in earlier runs. log=True only for a fresh harvest.
+    """
+    rows, nonmetal_rows = [], []
+    for L in lines:
+        custname = L["customer"]
+        source_for_material = L["source"]
+        nonmetal, material_canon = classify_material(source_for_material, custname,
+                                                     invoice=L["invoice_number"] or L["invoice_id"], log=log)
+        # --- route non-metal into its own file ---
+        if nonmetal:
+            nonmetal_rows.append({
+                "customer": custname,
+                "description": source_for_material,
+                "suggested": material_canon,
+                "invoice_id": L["invoice_id"],
+                "invoice_number": L["invoice_number"],
+                "invoice_date": L["invoice_date"],
+                "qty": L["qty"],
+                "uom": L["uom"],
+                "line_amount": L["line_amount"],
+                "pdf_path": str(pdf_path),
+            })
+            continue  # keep it OUT of metal flow
+
+        rows.append({
+            "customer": custname or fallback_customer,
+            "invoice_id": L["invoice_id"],
+            "invoice_number": L["invoice_number"],
+            "invoice_date": L["invoice_date"],
+            "service_date": L["service_date"],
+            "product_service": L["product_service"],
+            "qbo_item": L["product_service"],   # audit copy
+            "description": L["description"],
+            "ship_date": L["ship_date"],
+            "ship_via": L["ship_via"],
+            "item": material_canon,             # canonical material
+            "item_original": source_for_material,  # exact text normalized (Desc-first)
+            "qty": L["qty"],
+            "uom": L["uom"],
+            "unit_price": L["unit_price"],
+            "line_amount": L["line_amount"],
+            "invoice_total": L["invoice_total"],
+            "invoice_balance": L["invoice_balance"],
+            "pdf_path": str(pdf_path),
+            "_line_index": L["line_index"],
+        })
+
+    return rows, nonmetal_rows
+
+def _fetch(ctx: dict, scopes: list, store: _HarvestStore, directory: CustomerDirectory):
+    """
+    Stage 1: resolve scopes locally, then page through new/changed invoices of
+    all of them together via batch calls, yielding (scope, cdir,
+    fallback_customer, invoice). ctx["toks"] always holds the latest tokens.
+    """
+    plan = {}  # scope -> (cdir, fallback_customer)
+    specs = []
     for name in CUSTOMER_NAMES:
-        cust_id, toks = get_customer_id_by_name(toks, name)
+        cust_id = directory.resolve(name)
         if not cust_id:
             continue  # keep going; we’ll fallback if none match
-
-        matched_any = True
-        invs, toks = get_invoices_for_customer(toks, cust_id, START.isoformat(), END.isoformat())
-        print(f"[{name}] {len(invs)} invoices")
-
+        scopes.append(name)
         cdir = PDFS_DIR / name.replace(" ", "_"); cdir.mkdir(parents=True, exist_ok=True)
-
-        for inv in invs:
-            inv_id   = inv["Id"]
-            doc_no   = inv.get("DocNumber")
-            inv_date = inv.get("TxnDate")
-            total    = inv.get("TotalAmt")
-            balance  = inv.get("Balance")
-            ship_dt  = inv.get("ShipDate")
-            ship_m   = (inv.get("ShipMethodRef") or {}).get("name")
-
-            pdf_path = cdir / f"INV-{inv_id}.pdf"
-            if not pdf_path.exists():
-                toks = download_invoice_pdf(toks, inv_id, pdf_path)
-
-            for idx, L in enumerate(inv.get("Line", [])):
-                if L.get("DetailType") != "SalesItemLineDetail":
-                    continue
-                d = L.get("SalesItemLineDetail", {})
-
-                item_name   = (d.get("ItemRef") or {}).get("name")
-                line_desc   = L.get("Description")  # <-- often the true material text
-                svc_date    = d.get("ServiceDate")  # optional; fallback to invoice date later
-                qty         = d.get("Qty")
-                unitprice   = d.get("UnitPrice")
-                amount      = L.get("Amount")
-                uom         = d.get("UnitOfMeasure")
-
-                # Description-first source text
-                source_for_material = _material_source_text(item_name, line_desc, (inv.get("CustomerRef") or {}).get("name"))
-                # --- route non-metal into its own file ---
-                if _is_nonmetal_hit(source_for_material, (inv.get("CustomerRef") or {}).get("name")):
-                    nonmetal_rows.append({
-                        "customer": (inv.get("CustomerRef") or {}).get("name"),
-                        "description": source_for_material,
-                        "suggested": normalize_material(source_for_material, (inv.get("CustomerRef") or {}).get("name")),
-                        "invoice_id": inv_id,
-                        "invoice_number": doc_no,
-                        "invoice_date": inv_date,
-                        "qty": qty,
-                        "uom": uom,
-                        "line_amount": amount,
-                        "pdf_path": str(pdf_path),
-                     })
-                    continue  # keep it OUT of metal flow
-
-                material_canon = normalize_material(source_for_material, customer_name=(inv.get("CustomerRef") or {}).get("name"))
-
-                row = {
-                    "customer": (inv.get("CustomerRef") or {}).get("name") or name if 'name' in locals() else (inv.get("CustomerRef") or {}).get("name"),
-                    "invoice_id": inv_id,
-                    "invoice_number": doc_no,
-                    "invoice_date": inv_date,
-                    "service_date": svc_date or inv_date,
-                    "product_service": item_name,       # QBO Item (Product/Service)
-                    "qbo_item": item_name,              # audit copy
-                    "description": line_desc,           # raw Description from QBO
-                    "ship_date": ship_dt,
-                    "ship_via": ship_m,
-                    "item": material_canon,             # canonical material
-                    "item_original": source_for_material,  # exact text normalized (Desc-first)
-                    "qty": qty,
-                    "uom": uom,
-                    "unit_price": unitprice,            # aka Rate
-                    "line_amount": amount,              # Amount
-                    "invoice_total": total,
-                    "invoice_balance": balance,
-                    "pdf_path": str(pdf_path),
-                    "_line_index": idx,
-                }
-                rows.append(row)
-
-                if POST_TO_BRIDGE:
-                    try:
-                        post_contract_to_bridge(sess, row, seller_name=BRIDGE_SELLER)
-                    except Exception as e:
-                        print(f"[bridge] post error: {e}")
+        plan[name] = (cdir, name)
+        specs.append((name, cust_id, store.watermark(name)))
 
     # ---- Fallback: ALL customers if none matched ----
-    if not matched_any:
+    if not scopes:
         print("[fallback] No CUSTOMER_NAMES matched. Pulling ALL invoices in date window…")
-        invs, toks = get_invoices_all(toks, START.isoformat(), END.isoformat())
-        print(f"[ALL CUSTOMERS] {len(invs)} invoices")
-
+        scopes.append("_ALL")
         cdir = PDFS_DIR / "_ALL"; cdir.mkdir(parents=True, exist_ok=True)
+        plan["_ALL"] = (cdir, None)
+        specs.append(("_ALL", None, store.watermark("_ALL")))
+
+    since = {scope: s for scope, _, s in specs}
+    wm = dict(since)
+    seen = collections.Counter()
+    for scope, page, done, err in _iter_invoice_pages_batched(ctx, specs, START.isoformat(), END.isoformat()):
+        cdir, fallback_customer = plan[scope]
+        for inv in page:
+            seen[scope] += 1
+            updated = (inv.get("MetaData") or {}).get("LastUpdatedTime")
+            if updated and (wm[scope] is None or _ts(updated) > _ts(wm[scope])):
+                wm[scope] = updated
+            yield scope, cdir, fallback_customer, inv
+        store.commit()  # page boundary: everything fetched so far survives a crash
+        if not done:
+            continue
+        label = "ALL CUSTOMERS" if scope == "_ALL" else scope
+        if err is not None:
+            # watermark stays put, so the next run asks for the same window again
+            print(f"[{label}] fetch failed after {seen[scope]} invoices: {err}")
+            continue
+        print(f"[{label}] {seen[scope]} invoices" + (f" changed since {since[scope]}" if since[scope] else ""))
+        if wm[scope]:
+            store.set_watermark(scope, wm[scope])
+            store.commit()
+
+def _feed(post_q: queue.Queue, posting, item) -> bool:
+    # bounded put that gives up once the posting stage has died instead of blocking forever
+    while True:
+        try:
+            post_q.put(item, timeout=1.0)
+            return True
+        except queue.Full:
+            if posting.done():
+                return False
+
+def main(full_resync: bool = FULL_RESYNC):
+    """
+    Streaming pipeline: fetch pages → raw invoice lines → harvest store →
+    output sinks, which re-split every stored line (normalize + route
+    metal/nonmetal) under the current maps. Memory stays at one QBO page plus
+    one invoice's rows; outputs are written as `.part` files and swapped in
+    at the end.
+    """
+    toks = get_tokens()
+
+    store = _HarvestStore(STATE_PATH, toks["realmId"])
+    if full_resync:
+        print("[state] full resync requested")
+        store.reset()
+
+    # Deletes never show up in a LastUpdatedTime query; CDC reports them (last 30 days only).
+    # Asked realm-wide from the start of the last completed run, not from the scope watermarks:
+    # a quiet customer's watermark can sit months back while the realm is checked every day.
+    run_start = datetime.now(timezone.utc) - timedelta(minutes=5)  # slack for clock skew vs QBO
+    checkpoint = store.meta("cdc_checkpoint")
+    if checkpoint:
+        deleted, toks = get_deleted_invoice_ids(toks, checkpoint)
+        if deleted is None:
+            print(f"[state] last run older than {CDC_MAX_DAYS} days, deletes can't be tracked → full resync")
+            store.reset(customers=False)
+        elif deleted:
+            print(f"[state] dropped {store.delete_invoices(deleted)} deleted invoice row(s)")
+    elif store.count():
+        print("[state] no CDC checkpoint on file, deletes can't be tracked → full resync")
+        store.reset(customers=False)
+
+    # Customer directory: incremental refresh, dumped for visibility (helps pick exact names)
+    directory = CustomerDirectory(store)
+    toks = directory.refresh(toks)
+    directory.write_csv()
+
+    # ---- BRidge posting (own stage; fed while harvesting, runs alongside the PDF downloads) ----
+    sess = requests.Session()
+    posting = None
+    post_q = None
+    poster = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bridge")
+    if POST_TO_BRIDGE:
+        try:
+            bridge_login(sess)
+        except Exception as e:
+            print(f"[bridge] login skipped/failed: {e}")
+        # jobs parked by a run that died before posting finished go out first
+        pending = store.outbox()
+        if pending:
+            print(f"[bridge] {len(pending)} job(s) left in the outbox by an earlier run")
+        post_q = queue.Queue(maxsize=1000)
+        post = post_contracts_bulk if BRIDGE_POST_MODE == "bulk" else post_bridge_jobs
+        posting = poster.submit(post, sess, itertools.chain(pending, iter(post_q.get, None)))
+
+    scopes = []    # scopes harvested this run, in output order
+    changed = 0
+    try:
+        # ---- fetch → split/normalize/route → store ----
+        ctx = {"toks": toks}
+        for scope, cdir, fallback_customer, inv in _fetch(ctx, scopes, store, directory):
+            updated = (inv.get("MetaData") or {}).get("LastUpdatedTime")
+            prev = store.updated_of(scope, inv["Id"])
+            if prev is not _MISS and prev == updated:
+                continue  # boundary invoice re-returned by the inclusive watermark
+            lines, pdf_path = _harvest_invoice(inv, cdir)
+            if prev is not _MISS:
+                pdf_path.unlink(missing_ok=True)  # invoice changed; its PDF is stale
+            inv_rows, _ = _split_lines(lines, pdf_path, fallback_customer)  # logs unmapped terms
+            jobs = list(bridge_jobs(inv_rows, BRIDGE_SELLER)) if POST_TO_BRIDGE else []
+            store.enqueue(jobs)  # committed with the invoice, so a crash can't drop its posts
+            store.put(scope, inv["Id"], updated, inv.get("TxnDate"), lines, pdf_path)
+            changed += 1
+            if post_q is not None:
+                for job in jobs:
+                    if not _feed(post_q, posting, job):
+                        print("[bridge] posting stage stopped early; the rest stays in the outbox")
+                        post_q = None
+                        break
+        toks = ctx["toks"]
+        store.set_meta("cdc_checkpoint", run_start.isoformat(timespec="seconds"))
+    finally:
+        store.commit()
+        if post_q is not None:
+            _feed(post_q, posting, None)
+    print(f"[state] {changed} new/changed invoice(s) merged; {store.count()} on file")
+
+    # ---- Invoice PDFs (concurrent, rate limited per realm) ----
+    # Every stored invoice is a candidate, not just this run's changes: a download that
+    # failed or was cut off last time has no file, so it is fetched again here.
+    pdf_jobs = [job for sc in scopes for job in store.pdf_jobs(sc)]
+    toks = download_invoice_pdfs(toks, pdf_jobs)
+
+    # ---- Outputs: every stored invoice of the scopes harvested this run, re-split under the
+    #      current maps and streamed to sinks ----
+    invoices_out = _CsvSink(CSV_PATH, INVOICE_HEADERS)
+    contracts_csv = _CsvSink(CONTRACTS_CSV_PATH, CONTRACT_HEADERS)
+    contracts_nd = _NdjsonSink(CONTRACTS_JSONL_PATH)  # for manual import / debugging
+    nonmetal_out = _CsvSink(NONMETAL_OUT_PATH, NONMETAL_HEADERS, lazy=True)
+    sinks = (invoices_out, contracts_csv, contracts_nd, nonmetal_out)
+    try:
+        for sc in scopes:
+            fallback_customer = None if sc == "_ALL" else sc
+            for lines, pdf_path in store.iter_scope(sc):
+                inv_rows, inv_nonmetal = _split_lines(lines, pdf_path, fallback_customer, log=False)
+                for r in inv_rows:
+                    c = _row_to_bridge_contract(r, seller_name=BRIDGE_SELLER)
+                    if c:
+                        contracts_csv.write(c)
+                        contracts_nd.write(c)
+                    r.pop("_line_index", None)
+                    invoices_out.write(r)
+                for r in inv_nonmetal:
+                    nonmetal_out.write(r)
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        raise
+    for sink in sinks:
+        sink.commit()
+    if nonmetal_out.n:
+        print(f"Nonmetal → {NONMETAL_OUT_PATH}  (total: {nonmetal_out.n})")
+
+    if posting is not None:
+        try:
+            posting.result()
+        except Exception as e:
+            print(f"[bridge] posting stage failed: {e}")  # outbox kept; replayed next run
+        else:
+            store.clear_outbox()  # every job was posted or moved to the retry file
+    poster.shutdown()
 
-        for inv in invs:
-            inv_id   = inv["Id"]
-            doc_no   = inv.get("DocNumber")
-            inv_date = inv.get("TxnDate")
-            total    = inv.get("TotalAmt")
-            balance  = inv.get("Balance")
-            custname = (inv.get("CustomerRef") or {}).get("name")
-            ship_dt  = inv.get("ShipDate")
-            ship_m   = (inv.get("ShipMethodRef") or {}).get("name")
-
-            pdf_path = cdir / f"INV-{inv_id}.pdf"
-            if not pdf_path.exists():
-                toks = download_invoice_pdf(toks, inv_id, pdf_path)
-
-            for idx, L in enumerate(inv.get("Line", [])):
-                if L.get("DetailType") != "SalesItemLineDetail":
-                    continue
-                d = L.get("SalesItemLineDetail", {})
-
-                item_name = (d.get("ItemRef") or {}).get("name")
-                line_desc = L.get("Description")
-                svc_date  = d.get("ServiceDate")
-                qty       = d.get("Qty")
-                unitprice = d.get("UnitPrice")
-                amount    = L.get("Amount")
-                uom       = d.get("UnitOfMeasure")
-
-                # Description-first here too
-                source_for_material = _material_source_text(item_name, line_desc, custname)
-                # --- route non-metal into its own file ---
-                if _is_nonmetal_hit(source_for_material, custname):
-                    nonmetal_rows.append({
-                        "customer": custname,
-                        "description": source_for_material,
-                        "suggested": normalize_material(source_for_material, custname),
-                        "invoice_id": inv_id,
-                        "invoice_number": doc_no,
-                        "invoice_date": inv_date,
-                        "qty": qty,
-                        "uom": uom,
-                        "line_amount": amount,
-                        "pdf_path": str(pdf_path),
-                    })
-                    continue  # keep it OUT of metal flow
-
-                material_canon = normalize_material(source_for_material, customer_name=custname)
-
-                row = {
-                    "customer": custname,
-                    "invoice_id": inv_id,
-                    "invoice_number": doc_no,
-                    "invoice_date": inv_date,
-                    "service_date": svc_date or inv_date,
-                    "product_service": item_name,
-                    "qbo_item": item_name,
-                    "description": line_desc,
-                    "ship_date": ship_dt,
-                    "ship_via": ship_m,
-                    "item": material_canon,
-                    "item_original": source_for_material,
-                    "qty": qty,
-                    "uom": uom,
-                    "unit_price": unitprice,
-                    "line_amount": amount,
-                    "invoice_total": total,
-                    "invoice_balance": balance,
-                    "pdf_path": str(pdf_path),
-                    "_line_index": idx,
-                }
-                rows.append(row)
-
-                if POST_TO_BRIDGE:
-                    try:
-                        post_contract_to_bridge(sess, row, seller_name=BRIDGE_SELLER)
-                    except Exception as e:
-                        print(f"[bridge] post error: {e}")
-
-    # ---- Build BRidge-ready contracts from harvested rows ----
-    contracts = []
-    for r in rows:
-        c = _row_to_bridge_contract(r, seller_name=BRIDGE_SELLER)
-        if c:
-            contracts.append(c)
-
-    # Write contracts CSV (exact schema BRidge expects)
-    contract_headers = [
-        "buyer","seller","material","weight_tons","price_per_ton",
-        "pricing_formula","reference_symbol","reference_price",
-        "reference_source","reference_timestamp","currency"
-    ]
-    with open(CONTRACTS_CSV_PATH, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=contract_headers)
-        w.writeheader()
-        w.writerows(contracts)
-
-    # Also write NDJSON (for bulk import / debugging)
-    with open(CONTRACTS_JSONL_PATH, "w", encoding="utf-8") as f:
-        for c in contracts:
-            f.write(json.dumps(c, ensure_ascii=False) + "\n")
-
-    # ---- Final CSV write (raw line export) ----
-    headers = [
-        "customer","invoice_id","invoice_number","invoice_date","service_date",
-        "product_service","qbo_item","description",
-        "ship_date","ship_via",
-        "item","item_original","qty","uom","unit_price","line_amount","invoice_total",
-        "invoice_balance","pdf_path"
-    ]
-
-    for r in rows:
-        r.pop("_line_index", None)
-
-    with open(CSV_PATH, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=headers)
-        w.writeheader()
-        w.writerows(rows)
-
-    # --- Nonmetal output ---
-    if nonmetal_rows:
-        nonmetal_headers = [
-            "customer","description","suggested",
-            "invoice_id","invoice_number","invoice_date",
-            "qty","uom","line_amount","pdf_path"
-        ]
-        with open(NONMETAL_OUT_PATH, "w", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(f, fieldnames=nonmetal_headers)
-            w.writeheader()
-            w.writerows(nonmetal_rows)
-        print(f"Nonmetal → {NONMETAL_OUT_PATH}  (total: {len(nonmetal_rows)})")
+    NORM_CACHE.flush()
+    UNMAPPED.flush()
 
     # Run summary
-    print(f"Contracts built: {len(contracts)} | Lines harvested: {len(rows)}")
+    print(f"Contracts built: {contracts_csv.n} | Lines harvested: {invoices_out.n}")
+    print(NORM_CACHE.summary())
     if os.path.exists(UNMAPPED_LOG):
         try:
             with open(UNMAPPED_LOG, encoding="utf-8") as _f:
                 # count lines excluding header
                 unmapped_count = max(0, sum(1 for _ in _f) - 1)
-            print(f"Unmapped terms logged: {unmapped_count} → {UNMAPPED_LOG}")
+            print(f"Unmapped terms: {unmapped_count} distinct ({UNMAPPED.new_terms} new this run) → {UNMAPPED_LOG}")
         except Exception:
             pass
     print(f"Done → {CSV_PATH}  | PDFs under {PDFS_DIR}")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    ap = argparse.ArgumentParser(description="Harvest QBO invoices into BRidge contracts")
+    ap.add_argument("--full-resync", action="store_true", help="ignore saved watermarks and re-read everything")
+    ap.add_argument("--check-matcher", action="store_true",
+                    help="compare compiled vs reference material matching over the harvested CSVs, then exit")
+    ap.add_argument("--repeat", type=int, default=1, help="benchmark passes for --check-matcher")
+    ap.add_argument("--bench-fuzzy", type=int, metavar="N", nargs="?", const=100_000,
+                    help="benchmark the fuzzy index on N synthetic unmapped lines, then exit")
+    args = ap.parse_args()
+    if args.check_matcher:
+        sys.exit(1 if check_matcher(repeat=args.repeat) else 0)
+    if args.bench_fuzzy:
+        sys.exit(1 if bench_fuzzy(args.bench_fuzzy) else 0)
+    main(full_resync=FULL_RESYNC or args.full_resync)
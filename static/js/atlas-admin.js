@@ -21,6 +21,8 @@ function showTab(name){
   if(name==="docs") renderDocs();
 }
 
+let obRows = [], vaultRows = [], docRows = [];
+
 async function renderOnboarding(){
   const el = document.getElementById("tab_onboarding");
   el.innerHTML = `<h4>Onboarding Submissions</h4>
@@ -32,17 +34,24 @@ async function renderOnboarding(){
         <option value="rejected">rejected</option>
         <option value="all">all</option>
       </select>
+      <button class="btn btn-outline-warning btn-sm" onclick="claimOnboarding()">Claim next 10</button>
+      <span id="ob_claim_msg" class="muted align-self-center"></span>
     </div>
     <div id="ob_table"></div>
     <div id="ob_detail" class="mt-3"></div>
   `;
   const status = document.getElementById("ob_status").value;
   const data = await api(`/api/admin/onboarding?status=${encodeURIComponent(status)}&limit=50`);
-  const rows = data.items || [];
+  obRows = data.items || [];
+  drawOnboardingTable();
+}
+
+function drawOnboardingTable(){
+  const rows = obRows;
   const table = `
     <table class="table table-dark table-sm">
       <thead><tr>
-        <th>Created</th><th>Status</th><th>Owner</th><th>Email</th><th>Assets</th><th></th>
+        <th>Created</th><th>Status</th><th>Owner</th><th>Email</th><th>Assets</th><th>Claimed</th><th></th>
       </tr></thead>
       <tbody>
         ${rows.map(r=>`
@@ -52,6 +61,7 @@ async function renderOnboarding(){
             <td>${r.owner_name||""}</td>
             <td>${r.owner_email||""}</td>
             <td>${r.ip_assets_count}</td>
+            <td class="muted">${r.claimed_by||""}</td>
             <td><button class="btn btn-outline-light btn-sm" onclick="openOnboarding('${r.id}')">Open</button></td>
           </tr>
         `).join("")}
@@ -63,7 +73,7 @@ async function renderOnboarding(){
 async function openOnboarding(id){
   const el = document.getElementById("ob_detail");
   el.innerHTML = `<div class="text-secondary">Loading…</div>`;
-  const data = await api(`/api/admin/onboarding/${id}`);
+  const data = await api(`/api/admin/onboarding/${id}?include=all`);
   const s = data.submission;
 
   el.innerHTML = `
@@ -79,12 +89,30 @@ async function openOnboarding(id){
       <input id="set_notes" class="form-control form-control-sm" placeholder="notes (optional)" value="${(s.notes||"").replaceAll('"','&quot;')}"/>
       <button class="btn btn-success btn-sm" onclick="setOnboardingStatus('${id}')">Update</button>
       <button class="btn btn-warning btn-sm" onclick="approveOnboarding('${id}')">Approve + Create Login</button>
+      <button class="btn btn-outline-secondary btn-sm" onclick="releaseOnboarding('${id}')">Release</button>
     </div>
 
     <pre class="mono p-3 mt-3" style="background:#0d1522;border:1px solid #2a3a52;border-radius:8px;max-height:380px;overflow:auto">${JSON.stringify(s, null, 2)}</pre>
   `;
 }
 
+async function claimOnboarding(){
+  const status = document.getElementById("ob_status").value;
+  const j = await api(`/api/admin/onboarding/claim`, {
+    method:"POST",
+    headers:{ "Content-Type":"application/json" },
+    body: JSON.stringify({n: 10, status: status === "needs_more" ? "needs_more" : "submitted"})
+  });
+  await renderOnboarding();
+  document.getElementById("ob_claim_msg").textContent =
+    `${j.items.length} claimed for ${Math.round(j.lease_s/60)} min`;
+}
+
+async function releaseOnboarding(id){
+  await api(`/api/admin/onboarding/${id}/release`, { method:"POST" });
+  await renderOnboarding();
+}
+
 async function approveOnboarding(id){
   if(!confirm("Approve this onboarding and create Owner + Assets + Owner login?")) return;
   const j = await api(`/api/admin/onboarding/${id}/approve`, { method:"POST" });
@@ -158,7 +186,12 @@ async function vaultUpload(){
 
 async function refreshVaultList(){
   const data = await api(`/api/admin/vault/objects?source_key=all&limit=50`);
-  const rows = data.items || [];
+  vaultRows = data.items || [];
+  drawVaultTable();
+}
+
+function drawVaultTable(){
+  const rows = vaultRows;
   const table = `
     <table class="table table-dark table-sm">
       <thead><tr>
@@ -333,7 +366,12 @@ async function refreshDocs(){
   const ownerId = (document.getElementById("docs_owner_id")?.value || "").trim();
   const q = ownerId ? `?owner_id=${encodeURIComponent(ownerId)}&limit=200` : `?limit=200`;
   const data = await api(`/api/admin/docs${q}`);
-  const rows = data.items || [];
+  docRows = data.items || [];
+  drawDocsTable();
+}
+
+function drawDocsTable(){
+  const rows = docRows;
   document.getElementById("docs_table").innerHTML = rows.length ? `
     <table class="table table-dark table-sm">
       <thead><tr>
@@ -352,3 +390,57 @@ async function refreshDocs(){
     </table>
   ` : `<div class="muted">No documents yet.</div>`;
 }
+
+// ----------------------------
+// Live updates: /api/admin/events pushes list-sized rows; merge them into the
+// loaded lists instead of re-fetching. 'resync' means events may have been
+// missed, so the open tab reloads once.
+// ----------------------------
+
+function upsertRow(rows, row, keep, limit){
+  const out = rows.filter(r => r.id !== row.id);
+  if(keep) out.push(row);
+  out.sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
+  return out.slice(0, limit);
+}
+
+function tabVisible(name){
+  const el = document.getElementById("tab_" + name);
+  return el && el.style.display !== "none";
+}
+
+function connectEvents(){
+  const es = new EventSource("/api/admin/events");
+
+  es.addEventListener("onboarding", ev => {
+    const {row} = JSON.parse(ev.data);
+    const sel = document.getElementById("ob_status");
+    if(!sel || !document.getElementById("ob_table")) return;
+    const keep = sel.value === "all" || sel.value === row.status;
+    obRows = upsertRow(obRows, row, keep, 50);
+    drawOnboardingTable();
+  });
+
+  es.addEventListener("vault_object", ev => {
+    const {row} = JSON.parse(ev.data);
+    if(!document.getElementById("v_table")) return;
+    vaultRows = upsertRow(vaultRows, row, true, 50);
+    drawVaultTable();
+  });
+
+  es.addEventListener("document", ev => {
+    const {row} = JSON.parse(ev.data);
+    if(!document.getElementById("docs_table")) return;
+    const ownerId = (document.getElementById("docs_owner_id")?.value || "").trim();
+    docRows = upsertRow(docRows, row, !ownerId || ownerId === row.owner_id, 200);
+    drawDocsTable();
+  });
+
+  es.addEventListener("resync", () => {
+    if(tabVisible("onboarding")) renderOnboarding();
+    if(tabVisible("vault")) refreshVaultList();
+    if(tabVisible("docs")) refreshDocs();
+  });
+}
+
+connectEvents();